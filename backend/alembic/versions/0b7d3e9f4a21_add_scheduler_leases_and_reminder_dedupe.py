@@ -0,0 +1,53 @@
+"""Add scheduler_leases and one-reminder-per-day key on notifications
+
+Revision ID: 0b7d3e9f4a21
+Revises: f2a6b8c1d934
+Create Date: 2026-10-18 14:21:08.903355
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7d3e9f4a21'
+down_revision: Union[str, Sequence[str], None] = 'f2a6b8c1d934'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Existing notifications get reminder_date = date(sent_at) on the oldest
+    row per session and day only; duplicates already sent by concurrent
+    workers keep NULL so the unique key can be created.
+    """
+    op.create_table('scheduler_leases',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('holder', sa.String(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.add_column('notifications', sa.Column('reminder_date', sa.Date(), nullable=True))
+    op.execute("""
+        UPDATE notifications SET reminder_date = CAST(sent_at AS DATE)
+        WHERE id IN (
+            SELECT MIN(id) FROM notifications
+            WHERE sent_at IS NOT NULL
+            GROUP BY session_id, CAST(sent_at AS DATE)
+        )
+    """)
+    op.drop_index('ix_notifications_session_sent', table_name='notifications')
+    op.create_unique_constraint('uq_notifications_session_day', 'notifications', ['session_id', 'reminder_date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_notifications_session_day', 'notifications', type_='unique')
+    op.create_index('ix_notifications_session_sent', 'notifications', ['session_id', 'sent_at'], unique=False)
+    op.drop_column('notifications', 'reminder_date')
+    op.drop_table('scheduler_leases')
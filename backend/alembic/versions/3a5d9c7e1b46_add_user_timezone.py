@@ -0,0 +1,30 @@
+"""Add users.timezone
+
+Revision ID: 3a5d9c7e1b46
+Revises: 1c8e4f2a7b95
+Create Date: 2026-10-18 17:10:31.084626
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a5d9c7e1b46'
+down_revision: Union[str, Sequence[str], None] = '1c8e4f2a7b95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('timezone', sa.String(), server_default='UTC', nullable=False))
+    op.create_index('ix_users_timezone_id', 'users', ['timezone', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_timezone_id', table_name='users')
+    op.drop_column('users', 'timezone')
@@ -0,0 +1,36 @@
+"""Add SM-2 state to topics and unique (topic_id, day_index) on sessions
+
+Revision ID: 5e2b8d4f6c13
+Revises: 3a5d9c7e1b46
+Create Date: 2026-10-18 18:03:52.661470
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b8d4f6c13'
+down_revision: Union[str, Sequence[str], None] = '3a5d9c7e1b46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('topics', sa.Column('ease', sa.Float(), server_default='2.5', nullable=False))
+    op.add_column('topics', sa.Column('interval_days', sa.Integer(), server_default='4', nullable=False))
+    op.add_column('topics', sa.Column('repetitions', sa.Integer(), server_default='2', nullable=False))
+    op.add_column('topics', sa.Column('reviewed_session_id', sa.Integer(), nullable=True))
+    op.create_unique_constraint('uq_sessions_topic_day', 'sessions', ['topic_id', 'day_index'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_sessions_topic_day', 'sessions', type_='unique')
+    op.drop_column('topics', 'reviewed_session_id')
+    op.drop_column('topics', 'repetitions')
+    op.drop_column('topics', 'interval_days')
+    op.drop_column('topics', 'ease')
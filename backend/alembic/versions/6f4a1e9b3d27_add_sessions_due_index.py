@@ -0,0 +1,29 @@
+"""Add partial index on scheduled sessions by date
+
+Revision ID: 6f4a1e9b3d27
+Revises: 5e2b8d4f6c13
+Create Date: 2026-10-18 18:41:17.290518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f4a1e9b3d27'
+down_revision: Union[str, Sequence[str], None] = '5e2b8d4f6c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_sessions_due', 'sessions', ['scheduled_for', 'topic_id'], unique=False,
+                    postgresql_where=sa.text("status = 'scheduled'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sessions_due', table_name='sessions')
@@ -0,0 +1,29 @@
+"""Add claimed_at to notifications
+
+Revision ID: 7a3c5e2d9f41
+Revises: 6f4a1e9b3d27
+Create Date: 2026-10-18 20:12:04.518332
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3c5e2d9f41'
+down_revision: Union[str, Sequence[str], None] = '6f4a1e9b3d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notifications', sa.Column('claimed_at', sa.DateTime(timezone=True),
+                                             server_default=sa.text('now()'), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('notifications', 'claimed_at')
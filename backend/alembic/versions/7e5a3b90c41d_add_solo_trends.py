@@ -0,0 +1,42 @@
+"""Add solo_trends rollup table
+
+Revision ID: 7e5a3b90c41d
+Revises: 4c2d8e1f9a07
+Create Date: 2026-10-18 10:03:27.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e5a3b90c41d'
+down_revision: Union[str, Sequence[str], None] = '4c2d8e1f9a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Rollups are seeded lazily on the next metric for each topic; run
+    `python -m app.rollups backfill` to build them all up front.
+    """
+    op.create_table('solo_trends',
+    sa.Column('topic_id', sa.Integer(), nullable=False),
+    sa.Column('metric_count', sa.Integer(), nullable=False),
+    sa.Column('sum_covered', sa.Float(), nullable=False),
+    sa.Column('sum_remembered', sa.Float(), nullable=False),
+    sa.Column('ewma_remembered', sa.Float(), nullable=True),
+    sa.Column('recent', sa.JSON(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['topic_id'], ['topics.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('topic_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('solo_trends')
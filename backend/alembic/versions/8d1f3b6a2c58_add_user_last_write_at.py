@@ -0,0 +1,28 @@
+"""Add last_write_at to users
+
+Revision ID: 8d1f3b6a2c58
+Revises: 7a3c5e2d9f41
+Create Date: 2026-10-18 21:03:52.740916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d1f3b6a2c58'
+down_revision: Union[str, Sequence[str], None] = '7a3c5e2d9f41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('last_write_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'last_write_at')
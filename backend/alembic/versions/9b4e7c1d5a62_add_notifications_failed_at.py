@@ -0,0 +1,28 @@
+"""Add failed_at to notifications
+
+Revision ID: 9b4e7c1d5a62
+Revises: 8d1f3b6a2c58
+Create Date: 2026-10-19 09:14:26.381054
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4e7c1d5a62'
+down_revision: Union[str, Sequence[str], None] = '8d1f3b6a2c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notifications', sa.Column('failed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('notifications', 'failed_at')
@@ -0,0 +1,34 @@
+"""Add covering index on comparisons (session_id, created_at DESC)
+
+Revision ID: a8f4c26d1e53
+Revises: 7e5a3b90c41d
+Create Date: 2026-10-18 10:41:55.302176
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8f4c26d1e53'
+down_revision: Union[str, Sequence[str], None] = '7e5a3b90c41d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_comparisons_session_created',
+        'comparisons',
+        ['session_id', sa.text('created_at DESC')],
+        unique=False,
+        postgresql_include=['recall_score'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_comparisons_session_created', table_name='comparisons')
@@ -0,0 +1,34 @@
+"""Index topics by user; key the due-sessions index by topic first
+
+Revision ID: ab27d5e8f193
+Revises: 9b4e7c1d5a62
+Create Date: 2026-10-19 10:02:47.615230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ab27d5e8f193'
+down_revision: Union[str, Sequence[str], None] = '9b4e7c1d5a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_topics_user_id'), 'topics', ['user_id'], unique=False)
+    op.create_index('ix_sessions_topic_due', 'sessions', ['topic_id', 'scheduled_for'], unique=False,
+                    postgresql_where=sa.text("status = 'scheduled'"))
+    op.drop_index('ix_sessions_due', table_name='sessions')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_sessions_due', 'sessions', ['scheduled_for', 'topic_id'], unique=False,
+                    postgresql_where=sa.text("status = 'scheduled'"))
+    op.drop_index('ix_sessions_topic_due', table_name='sessions')
+    op.drop_index(op.f('ix_topics_user_id'), table_name='topics')
@@ -0,0 +1,126 @@
+"""Store comparison missed points as note_points ids
+
+Revision ID: c3b9d7e2f615
+Revises: a8f4c26d1e53
+Create Date: 2026-10-18 11:26:09.874412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3b9d7e2f615'
+down_revision: Union[str, Sequence[str], None] = 'a8f4c26d1e53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+comparisons = sa.table(
+    'comparisons',
+    sa.column('id', sa.Integer),
+    sa.column('compared_to_session_id', sa.Integer),
+    sa.column('missed_point_ids', sa.JSON),
+    sa.column('missed_points', sa.JSON),
+)
+note_points = sa.table(
+    'note_points',
+    sa.column('id', sa.Integer),
+    sa.column('session_id', sa.Integer),
+    sa.column('point_text', sa.Text),
+)
+
+
+def _match_ids(missed, prev_notes):
+    """Map missed text copies to ids of the previous session's points, or None."""
+    available = {}
+    for note_id, text in prev_notes:
+        available.setdefault(text, []).append(note_id)
+    ids = []
+    for point in missed:
+        if point.get('prev_point_id') is not None:
+            ids.append(point['prev_point_id'])
+            continue
+        candidates = available.get(point.get('text'))
+        if not candidates:
+            return None
+        ids.append(candidates.pop(0))
+    return ids
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Existing text copies are converted to ids by matching them against the
+    compared-to session's note points. Rows that cannot be matched fully
+    keep their text copies.
+    """
+    op.add_column('comparisons', sa.Column('missed_point_ids', sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(comparisons.c.id, comparisons.c.compared_to_session_id, comparisons.c.missed_points)
+            .where(comparisons.c.id > last_id)
+            .where(comparisons.c.missed_points.isnot(None))
+            .order_by(comparisons.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        session_ids = {r.compared_to_session_id for r in rows if r.compared_to_session_id}
+        notes_by_session = {}
+        if session_ids:
+            for note_id, session_id, text in conn.execute(
+                sa.select(note_points.c.id, note_points.c.session_id, note_points.c.point_text)
+                .where(note_points.c.session_id.in_(session_ids))
+                .order_by(note_points.c.id)
+            ):
+                notes_by_session.setdefault(session_id, []).append((note_id, text))
+
+        for row in rows:
+            ids = _match_ids(row.missed_points or [], notes_by_session.get(row.compared_to_session_id, []))
+            if ids is not None:
+                conn.execute(
+                    comparisons.update()
+                    .where(comparisons.c.id == row.id)
+                    .values(missed_point_ids=ids, missed_points=sa.null())
+                )
+
+
+def downgrade() -> None:
+    """Downgrade schema (re-materializes text copies before dropping the ids)."""
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(comparisons.c.id, comparisons.c.missed_point_ids)
+            .where(comparisons.c.id > last_id)
+            .where(comparisons.c.missed_point_ids.isnot(None))
+            .order_by(comparisons.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        all_ids = {i for r in rows for i in r.missed_point_ids}
+        texts = dict(conn.execute(
+            sa.select(note_points.c.id, note_points.c.point_text).where(note_points.c.id.in_(all_ids))
+        ).all()) if all_ids else {}
+        for row in rows:
+            missed = [
+                {'text': texts[i], 'prev_point_id': i}
+                for i in row.missed_point_ids if i in texts
+            ]
+            conn.execute(
+                comparisons.update().where(comparisons.c.id == row.id).values(missed_points=missed)
+            )
+
+    op.drop_column('comparisons', 'missed_point_ids')
@@ -0,0 +1,43 @@
+"""Add comparison_states table for incremental compares
+
+Revision ID: d5e1f8a3b742
+Revises: c3b9d7e2f615
+Create Date: 2026-10-18 12:14:52.301877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e1f8a3b742'
+down_revision: Union[str, Sequence[str], None] = 'c3b9d7e2f615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    States are built by the next full compare of each session pair.
+    """
+    op.create_table('comparison_states',
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('compared_to_session_id', sa.Integer(), nullable=False),
+    sa.Column('prev_fingerprint', sa.String(length=40), nullable=False),
+    sa.Column('prev_point_ids', sa.JSON(), nullable=False),
+    sa.Column('best_similarities', sa.JSON(), nullable=False),
+    sa.Column('best_match_ids', sa.JSON(), nullable=False),
+    sa.Column('curr_point_ids', sa.JSON(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['compared_to_session_id'], ['sessions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('session_id', 'compared_to_session_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('comparison_states')
@@ -0,0 +1,30 @@
+"""Add topics.compare_engine and comparisons.engine
+
+Revision ID: e8c4a7d2f019
+Revises: d5e1f8a3b742
+Create Date: 2026-10-18 13:02:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4a7d2f019'
+down_revision: Union[str, Sequence[str], None] = 'd5e1f8a3b742'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('topics', sa.Column('compare_engine', sa.String(), server_default='semantic', nullable=False))
+    op.add_column('comparisons', sa.Column('engine', sa.String(), server_default='semantic', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('comparisons', 'engine')
+    op.drop_column('topics', 'compare_engine')
@@ -0,0 +1,33 @@
+"""Add notifications (session_id, sent_at) index
+
+Revision ID: f2a6b8c1d934
+Revises: e8c4a7d2f019
+Create Date: 2026-10-18 13:40:17.552093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6b8c1d934'
+down_revision: Union[str, Sequence[str], None] = 'e8c4a7d2f019'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_notifications_session_sent',
+        'notifications',
+        ['session_id', 'sent_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_session_sent', table_name='notifications')
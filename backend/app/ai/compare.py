@@ -1,7 +1,17 @@
+import hashlib
 import numpy as np
-from typing import List
+from typing import List, Optional, Tuple
+from app.ai.quantized import best_matches_prefiltered
+from app import metrics
 
-def compare_notes(prev_points: List[dict], curr_points: List[dict], threshold: float = 0.80) -> dict:
+def _missed(point: dict) -> dict:
+    missed = {"text": point["text"]}
+    if point.get("id") is not None:
+        missed["prev_point_id"] = point["id"]
+    return missed
+
+def compare_notes(prev_points: List[dict], curr_points: List[dict], threshold: float = 0.80,
+                  include_matches: bool = False, shortlist: Optional[int] = None) -> dict:
     """
     Compare previous session notes with current session notes.
     
@@ -9,9 +19,15 @@ def compare_notes(prev_points: List[dict], curr_points: List[dict], threshold: f
         prev_points: List of dicts with {text, embedding}
         curr_points: List of dicts with {text, embedding}
         threshold: Similarity threshold for matching (default 0.80)
+        include_matches: Also return `best_similarities` and `best_match_indices`
+            per previous point, for seeding compare_notes_incremental
+        shortlist: If set and smaller than the number of current points, use
+            the binary-quantized prefilter and rerank only this many candidates
+            per previous point (approximate; see app.ai.quantized)
     
     Returns:
         dict with {recall_score: float (0-100), missed_points: List[dict with text]}
+        Missed points also carry `prev_point_id` when the previous points have an `id`.
     
     Note:
         Embeddings should be normalized vectors for accurate cosine similarity.
@@ -23,33 +39,92 @@ def compare_notes(prev_points: List[dict], curr_points: List[dict], threshold: f
     if not curr_points:
         return {
             "recall_score": 0.0,
-            "missed_points": [{"text": point["text"]} for point in prev_points]
+            "missed_points": [_missed(point) for point in prev_points]
         }
     
-    try:
-        prev_embeddings = np.array([point["embedding"] for point in prev_points])
-        curr_embeddings = np.array([point["embedding"] for point in curr_points])
-    except KeyError as e:
-        raise ValueError(f"Point dictionary missing required key: {e}")
-    
-    # Compute cosine similarity matrix
+    mode = "prefilter" if shortlist and shortlist < len(curr_points) else "exact"
+    metrics.COMPARE_CELLS.observe(len(prev_points) * len(curr_points), mode=mode)
+    with metrics.COMPARE_SECONDS.time(mode=mode):
+        try:
+            prev_embeddings = np.array([point["embedding"] for point in prev_points])
+            curr_embeddings = np.array([point["embedding"] for point in curr_points])
+        except KeyError as e:
+            raise ValueError(f"Point dictionary missing required key: {e}")
+        
+        best_sims, best_idx = best_matches(prev_embeddings, curr_embeddings, shortlist)
+        result = summarize(prev_points, best_sims, threshold)
+    if include_matches:
+        result["best_similarities"] = best_sims.tolist()
+        result["best_match_indices"] = best_idx.tolist()
+    return result
+
+def best_matches(prev_embeddings: np.ndarray, curr_embeddings: np.ndarray,
+                 shortlist: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For each previous point, the best cosine similarity against the current
+    points and the index of the current point that achieves it.
+    """
+    if shortlist and shortlist < len(curr_embeddings):
+        return best_matches_prefiltered(prev_embeddings, curr_embeddings, shortlist)
     # Since embeddings are normalized, dot product gives cosine similarity
     similarity_matrix = np.dot(prev_embeddings, curr_embeddings.T)
-    
-    # For each previous point, find best match in current points
-    best_matches = np.max(similarity_matrix, axis=1)
-    
-    # Identify missed points (below threshold)
-    missed_points = []
-    for i, best_sim in enumerate(best_matches):
-        if best_sim < threshold:
-            missed_points.append({"text": prev_points[i]["text"]})
-    
-    # Calculate recall score
+    best_idx = np.argmax(similarity_matrix, axis=1)
+    best_sims = similarity_matrix[np.arange(len(prev_embeddings)), best_idx]
+    return best_sims, best_idx
+
+def summarize(prev_points: List[dict], best_sims, threshold: float) -> dict:
+    """Recall score and missed points from each previous point's best similarity."""
+    missed_points = [
+        _missed(prev_points[i]) for i, best_sim in enumerate(best_sims) if best_sim < threshold
+    ]
     num_recalled = len(prev_points) - len(missed_points)
     recall_score = (num_recalled / len(prev_points)) * 100.0
-    
     return {
         "recall_score": recall_score,
         "missed_points": missed_points
     }
+
+def compare_notes_incremental(prev_points: List[dict], new_points: List[dict],
+                              best_similarities: List[float], best_match_ids: List[Optional[int]],
+                              threshold: float = 0.80, shortlist: Optional[int] = None) -> dict:
+    """
+    Update a previous comparison with current points added since it ran.
+    
+    Only the `prev x new` similarities are computed; each previous point's
+    stored best similarity is replaced where a new point scores higher.
+    
+    Args:
+        prev_points: List of dicts with {id, text, embedding}, in the same order as the stored state
+        new_points: List of dicts with {id, text, embedding} not seen by the stored state
+        best_similarities: Stored best similarity per previous point
+        best_match_ids: Stored id of the current point achieving it
+    
+    Returns:
+        Same shape as compare_notes(..., include_matches=True), with
+        `best_match_ids` in place of `best_match_indices`.
+    """
+    metrics.COMPARE_CELLS.observe(len(prev_points) * len(new_points), mode="incremental")
+    with metrics.COMPARE_SECONDS.time(mode="incremental"):
+        best_sims = np.array(best_similarities, dtype=float)
+        best_ids = list(best_match_ids)
+        if new_points:
+            prev_embeddings = np.array([point["embedding"] for point in prev_points])
+            new_embeddings = np.array([point["embedding"] for point in new_points])
+            new_sims, new_idx = best_matches(prev_embeddings, new_embeddings, shortlist)
+            better = new_sims > best_sims
+            best_sims = np.where(better, new_sims, best_sims)
+            for i in np.flatnonzero(better):
+                best_ids[i] = new_points[new_idx[i]]["id"]
+        
+        result = summarize(prev_points, best_sims, threshold)
+    result["best_similarities"] = best_sims.tolist()
+    result["best_match_ids"] = best_ids
+    return result
+
+def points_fingerprint(points: List[dict]) -> str:
+    """Digest of point ids and embeddings; changes whenever a point is added, removed or re-embedded."""
+    digest = hashlib.sha1()
+    for point in points:
+        digest.update(str(point.get("id")).encode())
+        digest.update(np.asarray(point["embedding"], dtype=np.float32).tobytes())
+    return digest.hexdigest()
@@ -1,5 +1,14 @@
 from sentence_transformers import SentenceTransformer
 import numpy as np
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from app.config import settings
+from app import metrics
+
+logger = logging.getLogger(__name__)
 
 _model = None
 
@@ -11,5 +20,103 @@ def get_model():
 
 def get_embedding(text: str) -> list:
     model = get_model()
-    embedding = model.encode(text, normalize_embeddings=True)
+    metrics.EMBEDDING_BATCH_SIZE.observe(1, call="single")
+    with metrics.EMBEDDING_SECONDS.time(call="single"):
+        embedding = model.encode(text, normalize_embeddings=True)
     return embedding.tolist()
+
+def get_embeddings(texts: List[str], batch_size: int = 32) -> List[list]:
+    """Embed many texts in model batches of `batch_size` (one forward pass per batch)."""
+    if not texts:
+        return []
+    model = get_model()
+    metrics.EMBEDDING_BATCH_SIZE.observe(len(texts), call="batch")
+    with metrics.EMBEDDING_SECONDS.time(call="batch"):
+        embeddings = model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    return embeddings.tolist()
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the embedding backend while the breaker is open."""
+
+class CircuitBreaker:
+    """
+    Stops calling a failing or stalling backend for a while.
+
+    Errors and calls slower than `slow_seconds` count as failures. With
+    `timeout_seconds`, calls run on a small worker pool and the caller stops
+    waiting after that long (TimeoutError, also a failure), so a stalled
+    backend can't hold requests until it returns. After `failure_threshold`
+    consecutive failures the breaker opens and calls fail fast with
+    CircuitOpenError; after `reset_seconds` a single trial call is let through
+    (half-open), which closes the breaker on success or reopens it on failure.
+    """
+    def __init__(self, failure_threshold: int, reset_seconds: float, slow_seconds: float,
+                 timeout_seconds: Optional[float] = None, max_workers: int = 4):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.slow_seconds = slow_seconds
+        self.timeout_seconds = timeout_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embedding") \
+            if timeout_seconds else None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def _allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def _record(self, ok: bool):
+        with self._lock:
+            self._trial_running = False
+            if ok:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Embedding backend circuit opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+
+    def call(self, fn, *args, **kwargs):
+        if not self._allow():
+            raise CircuitOpenError("embedding backend unavailable")
+        start = time.monotonic()
+        try:
+            if self._pool is None:
+                result = fn(*args, **kwargs)
+            else:
+                # a timed-out call keeps its worker until it returns; the pool bounds how many
+                result = self._pool.submit(fn, *args, **kwargs).result(timeout=self.timeout_seconds)
+        except Exception:
+            self._record(False)
+            raise
+        self._record(time.monotonic() - start <= self.slow_seconds)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._failures, self._opened_at, self._trial_running = 0, None, False
+
+embedding_breaker = CircuitBreaker(
+    settings.EMBEDDING_FAILURE_THRESHOLD,
+    settings.EMBEDDING_CIRCUIT_RESET_SECONDS,
+    settings.EMBEDDING_SLOW_SECONDS,
+    settings.EMBEDDING_TIMEOUT_SECONDS,
+)
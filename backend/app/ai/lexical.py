@@ -0,0 +1,44 @@
+"""
+Lexical comparison engine: hashed term-frequency vectors computed in NumPy.
+
+Each note point is turned into words, word bigrams and character trigrams
+(so "recursion" still overlaps "recursive"), hashed with a sign bit into a
+fixed number of dimensions, weighted by sublinear term frequency and
+L2-normalized. Cosine similarity between these vectors is a cheap stand-in
+for embedding similarity that needs no model, so it is used when a topic
+selects it or when the embedding backend is unavailable.
+
+No IDF weighting is applied: a point's vector must not depend on the other
+points it is compared with, so that incremental comparison state
+(comparison_states) stays valid as notes are appended.
+"""
+import re
+import zlib
+import numpy as np
+from collections import Counter
+from typing import List
+
+LEXICAL_DIM = 1024
+
+_WORD = re.compile(r"\w+")
+
+def _features(text: str) -> Counter:
+    words = _WORD.findall(text.lower())
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"#{word}#"
+        features.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+def lexical_vectors(texts: List[str], dim: int = LEXICAL_DIM) -> np.ndarray:
+    """Normalized hashed TF vectors, one row per text."""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature, count in _features(text).items():
+            h = zlib.crc32(feature.encode())
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vectors[row, h % dim] += sign * (1.0 + np.log(count))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
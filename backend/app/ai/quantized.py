@@ -0,0 +1,100 @@
+"""
+Two-stage matcher for large note sets: sign-bit prefilter, exact rerank.
+
+Each embedding is reduced to the signs of its components, packed into uint64
+words (384 dims -> 6 words). The Hamming distance between two codes
+approximates the angle between the vectors, so for every previous point the
+`shortlist` current points with the smallest distance are kept and only
+those are scored with the exact cosine similarity.
+
+The shortlist can miss the true best match, so a previous point may be
+reported as missed when the exact path would have recalled it.
+`recall_error` measures that against the exact path for a given shortlist
+size; `python -m benchmarks.bench_prefilter` reports it on synthetic data.
+"""
+import numpy as np
+from typing import Tuple
+
+# Bound each chunk's largest buffer, the (rows x curr) XOR words or the
+# (rows x shortlist x dim) gathered candidates, to roughly this many bytes
+_CHUNK_BYTES = 32 * 1024 * 1024
+
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(words)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].reshape(*words.shape, 8).sum(axis=-1, dtype=np.uint16)
+
+def pack_signs(embeddings: np.ndarray) -> np.ndarray:
+    """Pack the sign bits of each row into uint64 words, shape (n, ceil(dim / 64))."""
+    bits = np.packbits(np.asarray(embeddings) > 0, axis=1, bitorder="little")
+    pad = -bits.shape[1] % 8
+    if pad:
+        bits = np.pad(bits, ((0, 0), (0, pad)))
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+def hamming(prev_codes: np.ndarray, curr_codes: np.ndarray) -> np.ndarray:
+    """Hamming distance matrix between two sets of packed codes."""
+    distances = np.zeros((len(prev_codes), len(curr_codes)), dtype=np.uint16)
+    xor = np.empty(distances.shape, dtype=np.uint64)
+    # One word at a time keeps temporaries 2-D instead of (prev, curr, words)
+    for w in range(prev_codes.shape[1]):
+        np.bitwise_xor(prev_codes[:, w, None], curr_codes[None, :, w], out=xor)
+        distances += _popcount(xor).astype(np.uint16, copy=False)
+    return distances
+
+def best_matches_prefiltered(prev_embeddings: np.ndarray, curr_embeddings: np.ndarray,
+                             shortlist: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Approximate compare.best_matches: best cosine similarity and its index
+    per previous point, searching only each point's Hamming shortlist.
+    """
+    prev_embeddings = np.asarray(prev_embeddings, dtype=np.float32)
+    curr_embeddings = np.asarray(curr_embeddings, dtype=np.float32)
+    n_prev, n_curr = len(prev_embeddings), len(curr_embeddings)
+    k = min(shortlist, n_curr)
+    prev_codes, curr_codes = pack_signs(prev_embeddings), pack_signs(curr_embeddings)
+
+    best_sims = np.empty(n_prev, dtype=np.float32)
+    best_idx = np.empty(n_prev, dtype=np.int64)
+    rows = max(1, _CHUNK_BYTES // max(n_curr * 8, k * curr_embeddings.shape[1] * 4))
+    for start in range(0, n_prev, rows):
+        stop = min(start + rows, n_prev)
+        distances = hamming(prev_codes[start:stop], curr_codes)
+        if k < n_curr:
+            candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(n_curr), (stop - start, n_curr))
+        # Exact rerank: (rows, k, dim) . (rows, dim) -> (rows, k)
+        sims = np.einsum("rkd,rd->rk", curr_embeddings[candidates], prev_embeddings[start:stop])
+        top = np.argmax(sims, axis=1)
+        best_sims[start:stop] = sims[np.arange(stop - start), top]
+        best_idx[start:stop] = candidates[np.arange(stop - start), top]
+    return best_sims, best_idx
+
+def recall_error(prev_embeddings: np.ndarray, curr_embeddings: np.ndarray,
+                 shortlist: int, threshold: float = 0.80) -> dict:
+    """
+    Compare the prefiltered matcher with the exact path on the same data.
+
+    Returns the number and rate of previous points whose recalled/missed
+    decision differs, the resulting recall score error in percentage points,
+    and the largest best-similarity shortfall.
+    """
+    from app.ai.compare import best_matches
+
+    exact, _ = best_matches(np.asarray(prev_embeddings), np.asarray(curr_embeddings))
+    approx, _ = best_matches_prefiltered(prev_embeddings, curr_embeddings, shortlist)
+    mismatches = int(np.count_nonzero((exact >= threshold) != (approx >= threshold)))
+    n = len(exact)
+    return {
+        "shortlist": shortlist,
+        "points": n,
+        "decision_mismatches": mismatches,
+        "decision_error_rate": mismatches / n if n else 0.0,
+        "recall_score_error": abs(
+            np.count_nonzero(exact >= threshold) - np.count_nonzero(approx >= threshold)
+        ) * 100.0 / n if n else 0.0,
+        "max_similarity_gap": float(np.max(exact - approx)) if n else 0.0,
+    }
@@ -9,18 +9,98 @@ class Settings:
     AUTH0_AUDIENCE = os.getenv("AUTH0_AUDIENCE", "")
     AUTH0_ISSUER = f"https://{AUTH0_DOMAIN}/" if os.getenv("AUTH0_DOMAIN") else ""
     SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "")
+    SENDGRID_API_HOST = os.getenv("SENDGRID_API_HOST", "https://api.sendgrid.com")
+    EMAIL_FROM = os.getenv("EMAIL_FROM", "no-reply@example.com")
     FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
     COMPARE_THRESHOLD = float(os.getenv("COMPARE_THRESHOLD", "0.80"))
+    # Binary-quantized prefilter for large comparisons: used when prev x curr
+    # points reach COMPARE_PREFILTER_MIN_PAIRS; 0 shortlist disables it
+    COMPARE_PREFILTER_SHORTLIST = int(os.getenv("COMPARE_PREFILTER_SHORTLIST", "0"))
+    COMPARE_PREFILTER_MIN_PAIRS = int(os.getenv("COMPARE_PREFILTER_MIN_PAIRS", "250000"))
+    # Lexical engine (per-topic, or fallback when embeddings are unavailable)
+    LEXICAL_COMPARE_THRESHOLD = float(os.getenv("LEXICAL_COMPARE_THRESHOLD", "0.50"))
+    # Embedding circuit breaker: consecutive errors/slow calls before falling
+    # back to the lexical engine, and how long to wait before retrying
+    EMBEDDING_FAILURE_THRESHOLD = int(os.getenv("EMBEDDING_FAILURE_THRESHOLD", "3"))
+    EMBEDDING_CIRCUIT_RESET_SECONDS = float(os.getenv("EMBEDDING_CIRCUIT_RESET_SECONDS", "30"))
+    EMBEDDING_SLOW_SECONDS = float(os.getenv("EMBEDDING_SLOW_SECONDS", "2"))
+    EMBEDDING_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_TIMEOUT_SECONDS", "10"))  # per notes batch; 0 waits
     MAX_NOTES_PER_SESSION = int(os.getenv("MAX_NOTES_PER_SESSION", "200"))
     SOLO_HIGH_RETENTION_THRESHOLD = float(os.getenv("SOLO_HIGH_RETENTION_THRESHOLD", "85"))
     SOLO_LOW_RETENTION_THRESHOLD = float(os.getenv("SOLO_LOW_RETENTION_THRESHOLD", "60"))
+    SOLO_TREND_WINDOW = int(os.getenv("SOLO_TREND_WINDOW", "10"))  # metrics kept in the trend rollup
+    SOLO_EWMA_ALPHA = float(os.getenv("SOLO_EWMA_ALPHA", "0.3"))  # weight of the newest percent_remembered
     
     # Database connection pool settings
     DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
     DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
     DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
     
+    # Read replicas (comma-separated URLs); empty means all reads use DB_URL
+    DB_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+    # Keep a user's reads on the primary for this long after they write
+    REPLICA_READ_YOUR_WRITES_SECONDS = float(os.getenv("REPLICA_READ_YOUR_WRITES_SECONDS", "5"))
+    
+    # Expose process metrics at /metrics (Prometheus text format)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("true", "1", "yes")
+    # Per-request SQL counts: X-DB-Query-Count / X-DB-Time-Ms response headers, and
+    # warnings for slow requests, query-heavy requests and repeated (N+1) statements
+    QUERY_DEBUG_HEADERS = os.getenv("QUERY_DEBUG_HEADERS", "false").lower() in ("true", "1", "yes")
+    SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+    QUERY_COUNT_WARN = int(os.getenv("QUERY_COUNT_WARN", "30"))
+    QUERY_REPEAT_WARN = int(os.getenv("QUERY_REPEAT_WARN", "5"))
+    
+    # Profile single requests sent with `X-Profile: <PROFILING_TOKEN>` (sampled stacks
+    # written to PROFILING_DIR); off unless enabled and a token is set
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("true", "1", "yes")
+    PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+    PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+    PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    
+    # Serve list/comparison endpoints from lightweight row queries + orjson
+    FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "true").lower() in ("true", "1", "yes")
+    
+    # Bulk topic import settings
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+    IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+    
     # Scheduler settings
     ENABLE_SCHEDULER = os.getenv("ENABLE_SCHEDULER", "true").lower() in ("true", "1", "yes")
+    # Every process runs the scheduler; a lease row makes one of them run each job
+    SCHEDULER_LEASE_SECONDS = float(os.getenv("SCHEDULER_LEASE_SECONDS", "120"))
+    # Reminders run hourly and go to the users whose local time is this hour
+    REMINDER_LOCAL_HOUR = int(os.getenv("REMINDER_LOCAL_HOUR", "8"))
+    REMINDER_CHUNK_SIZE = int(os.getenv("REMINDER_CHUNK_SIZE", "500"))  # sessions (or digest users) per batch/commit
+    # Unsettled claims this old were left by a run that died; they're marked failed, not resent
+    REMINDER_CLAIM_TIMEOUT_SECONDS = float(os.getenv("REMINDER_CLAIM_TIMEOUT_SECONDS", "3600"))
+    # One email per user listing all of their due sessions, instead of one per session
+    REMINDER_DIGEST = os.getenv("REMINDER_DIGEST", "false").lower() in ("true", "1", "yes")
+    # Queue reminders in reminder_outbox and deliver them from worker pools (app.outbox)
+    REMINDER_OUTBOX = os.getenv("REMINDER_OUTBOX", "false").lower() in ("true", "1", "yes")
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))  # rows claimed per worker round
+    OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+    OUTBOX_RETRY_SECONDS = float(os.getenv("OUTBOX_RETRY_SECONDS", "60"))  # doubled after each failed attempt
+    OUTBOX_CLAIM_TIMEOUT_SECONDS = float(os.getenv("OUTBOX_CLAIM_TIMEOUT_SECONDS", "600"))
+    OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+    
+    # Email dispatch: concurrent sends, provider-wide rate limit, retries
+    EMAIL_MAX_WORKERS = int(os.getenv("EMAIL_MAX_WORKERS", "8"))
+    EMAIL_RATE_PER_SECOND = float(os.getenv("EMAIL_RATE_PER_SECOND", "10"))  # 0 disables the limit
+    EMAIL_BURST = float(os.getenv("EMAIL_BURST", "20"))
+    EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "3"))
+    EMAIL_BACKOFF_SECONDS = float(os.getenv("EMAIL_BACKOFF_SECONDS", "0.5"))
+    EMAIL_MAX_BACKOFF_SECONDS = float(os.getenv("EMAIL_MAX_BACKOFF_SECONDS", "30"))  # caps Retry-After too
+    EMAIL_TIMEOUT_SECONDS = float(os.getenv("EMAIL_TIMEOUT_SECONDS", "10"))
+    
+    # Adaptive scheduling (SM-2), run nightly for topics with no session left
+    SPACING_BATCH_SIZE = int(os.getenv("SPACING_BATCH_SIZE", "1000"))  # topics per chunk/commit
+    SPACING_MAX_INTERVAL_DAYS = int(os.getenv("SPACING_MAX_INTERVAL_DAYS", "365"))
+    SPACING_MISSING_SCORE = float(os.getenv("SPACING_MISSING_SCORE", "60"))  # grade of sessions completed without a score
+    
+    # Comparison retention (0 disables a rule); compaction runs nightly
+    COMPARISON_KEEP_LATEST = int(os.getenv("COMPARISON_KEEP_LATEST", "5"))
+    COMPARISON_RETENTION_DAYS = int(os.getenv("COMPARISON_RETENTION_DAYS", "0"))
+    COMPACTION_BATCH_SIZE = int(os.getenv("COMPACTION_BATCH_SIZE", "1000"))
 
 settings = Settings()
\ No newline at end of file
@@ -1,13 +1,52 @@
+from sqlalchemy import Date, cast, func, insert, literal, select, union_all, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import date, datetime, timedelta, timezone
 from typing import List, Optional
 import logging
-from app.models import User, Topic, Session as SessionModel, NotePoint, Comparison, SoloMetric, ModeEnum
+from app.models import User, Topic, Session as SessionModel, NotePoint, Comparison, ComparisonState, SoloMetric, SoloTrend, ModeEnum
 from app.ai.embeddings import get_embedding
+from app import rollups
 
 logger = logging.getLogger(__name__)
 
+# Spaced repetition offsets (in days) for the sessions created with each topic
+SESSION_DAYS = (1, 3, 7)
+
+def _initial_sessions(topic_id: int, today: date) -> List[dict]:
+    """Build the day 1/3/7 session rows for a new topic."""
+    return [
+        {
+            "topic_id": topic_id,
+            "day_index": day_index,
+            "scheduled_for": today + timedelta(days=day_index),
+            "status": "scheduled",
+        }
+        for day_index in SESSION_DAYS
+    ]
+
+def _bump_user_version(db: Session, user_id: int):
+    """Increment the user's data_version and stamp last_write_at in the current transaction."""
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(data_version=User.data_version + 1, last_write_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+
+def _bump_version_for_session(db: Session, session_id: int):
+    """Increment data_version and stamp last_write_at for the user owning a session."""
+    owner_id = select(Topic.user_id)\
+        .join(SessionModel, SessionModel.topic_id == Topic.id)\
+        .where(SessionModel.id == session_id)\
+        .scalar_subquery()
+    db.execute(
+        update(User)
+        .where(User.id == owner_id)
+        .values(data_version=User.data_version + 1, last_write_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+
 def get_or_create_user(db: Session, auth0_sub: str, email: str) -> User:
     """Get existing user or create new one."""
     try:
@@ -24,36 +63,39 @@ def get_or_create_user(db: Session, auth0_sub: str, email: str) -> User:
         logger.error(f"Error creating user: {e}")
         raise
 
-def create_topic(db: Session, user_id: int, title: str, description: str, mode: str) -> Topic:
-    """Create topic and auto-create 3 sessions for days 1, 3, 7."""
+def update_user_settings(db: Session, user: User, timezone: str) -> User:
+    """Update the user's settings (currently the timezone)."""
+    try:
+        user.timezone = timezone
+        _bump_user_version(db, user.id)
+        db.commit()
+        db.refresh(user)
+        return user
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error updating user settings: {e}")
+        raise
+
+def create_topic(db: Session, user_id: int, title: str, description: str, mode: str,
+                 compare_engine: str = "semantic", today: Optional[date] = None) -> Topic:
+    """Create topic and auto-create 3 sessions for days 1, 3, 7 after `today` (the user's local date)."""
     try:
         mode_enum = ModeEnum.automated if mode == "automated" else ModeEnum.solo
         topic = Topic(
             user_id=user_id,
             title=title,
             description=description,
-            mode=mode_enum
+            mode=mode_enum,
+            compare_engine=compare_engine
         )
         db.add(topic)
         db.flush()  # Get topic.id
         
         # Auto-create 3 sessions
-        today = date.today()
-        sessions_data = [
-            (1, today + timedelta(days=1)),
-            (3, today + timedelta(days=3)),
-            (7, today + timedelta(days=7))
-        ]
-        
-        for day_index, scheduled_for in sessions_data:
-            session = SessionModel(
-                topic_id=topic.id,
-                day_index=day_index,
-                scheduled_for=scheduled_for,
-                status="scheduled"
-            )
-            db.add(session)
+        for session_data in _initial_sessions(topic.id, today or date.today()):
+            db.add(SessionModel(**session_data))
         
+        _bump_user_version(db, user_id)
         db.commit()
         db.refresh(topic)
         logger.info(f"Created topic '{title}' with 3 sessions")
@@ -63,19 +105,123 @@ def create_topic(db: Session, user_id: int, title: str, description: str, mode:
         logger.error(f"Error creating topic: {e}")
         raise
 
+def bulk_create_topics(db: Session, user_id: int, rows: List[dict],
+                       today: Optional[date] = None) -> List[int]:
+    """Create many topics and their sessions with multi-row inserts.
+
+    Each row is a dict with title, description and mode. Sessions are dated
+    from `today` (the user's local date). Returns the new topic ids in row
+    order. The whole batch is committed (or rolled back) together.
+    """
+    if not rows:
+        return []
+    try:
+        topic_ids = db.execute(
+            insert(Topic).returning(Topic.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": user_id,
+                    "title": row["title"],
+                    "description": row.get("description", ""),
+                    "mode": ModeEnum(row["mode"]),
+                    "compare_engine": row.get("compare_engine", "semantic"),
+                }
+                for row in rows
+            ],
+        ).scalars().all()
+
+        today = today or date.today()
+        db.execute(
+            insert(SessionModel),
+            [s for topic_id in topic_ids for s in _initial_sessions(topic_id, today)],
+        )
+        _bump_user_version(db, user_id)
+        db.commit()
+        logger.info(f"Imported {len(topic_ids)} topics for user {user_id}")
+        return list(topic_ids)
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error importing topics: {e}")
+        raise
+
+def update_topic_engine(db: Session, topic: Topic, compare_engine: str) -> Topic:
+    """Switch the engine a topic's comparisons use."""
+    topic.compare_engine = compare_engine
+    _bump_user_version(db, topic.user_id)
+    db.commit()
+    db.refresh(topic)
+    return topic
+
 def get_user_topics(db: Session, user_id: int) -> List[Topic]:
     """Get all topics for a user."""
     return db.query(Topic).filter(Topic.user_id == user_id).all()
 
+def get_user_topic_rows(db: Session, user_id: int) -> List[dict]:
+    """Get a user's topics as plain dicts shaped like schemas.TopicOut."""
+    stmt = select(Topic.id, Topic.title, Topic.description, Topic.mode, Topic.compare_engine)\
+        .where(Topic.user_id == user_id)\
+        .order_by(Topic.id)
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+def get_topic_session_rows(db: Session, topic_id: int) -> List[dict]:
+    """Get a topic's sessions as plain dicts shaped like schemas.SessionOut."""
+    stmt = select(SessionModel.id, SessionModel.day_index, SessionModel.scheduled_for, SessionModel.status)\
+        .where(SessionModel.topic_id == topic_id)\
+        .order_by(SessionModel.id)
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+DUE_WINDOWS = ("overdue", "today", "upcoming")
+
+def get_due_sessions(db: Session, user_id: int, today: date, windows=DUE_WINDOWS,
+                     limit: int = 50, upcoming_days: int = 7) -> dict:
+    """
+    The user's scheduled sessions that are overdue, due `today` or due in the
+    next `upcoming_days` days, at most `limit` per window, as dicts shaped
+    like schemas.DueSessionOut. All windows are read in one UNION ALL query.
+    Each branch starts from the user's topics (ix_topics_user_id) and range
+    scans each topic's scheduled sessions on the partial index
+    ix_sessions_topic_due, so its cost follows this user's data only.
+    """
+    bounds = {
+        "overdue": SessionModel.scheduled_for < today,
+        "today": SessionModel.scheduled_for == today,
+        "upcoming": SessionModel.scheduled_for.between(
+            today + timedelta(days=1), today + timedelta(days=upcoming_days)
+        ),
+    }
+    branches = []
+    for window in windows:
+        branch = select(
+            literal(window).label("window"),
+            SessionModel.id, SessionModel.topic_id, Topic.title.label("topic_title"), Topic.mode,
+            SessionModel.day_index, SessionModel.scheduled_for,
+        ).select_from(Topic)\
+            .join(SessionModel, SessionModel.topic_id == Topic.id)\
+            .where(Topic.user_id == user_id, SessionModel.status == "scheduled", bounds[window])\
+            .order_by(SessionModel.scheduled_for, SessionModel.id)\
+            .limit(limit)\
+            .subquery()  # keeps each branch's ORDER BY/LIMIT inside the UNION
+        branches.append(select(*branch.c))
+
+    due = {window: [] for window in DUE_WINDOWS}
+    if branches:
+        for row in db.execute(union_all(*branches)).mappings():
+            row = {str(key): value for key, value in row.items()}  # subquery keys are quoted_name
+            due[row.pop("window")].append(row)
+    for rows in due.values():
+        rows.sort(key=lambda r: (r["scheduled_for"], r["id"]))  # UNION ALL doesn't keep branch order
+    return due
+
 def get_session_by_id(db: Session, session_id: int) -> Optional[SessionModel]:
-    """Get session by ID."""
-    return db.query(SessionModel).filter(SessionModel.id == session_id).first()
+    """Get session by ID (from the identity map when this db session already loaded it)."""
+    return db.get(SessionModel, session_id)
 
 def reschedule_session(db: Session, session_id: int, new_date: date):
     """Reschedule a session to a new date."""
     session = get_session_by_id(db, session_id)
     if session:
         session.scheduled_for = new_date
+        _bump_version_for_session(db, session_id)
         db.commit()
         db.refresh(session)
     return session
@@ -86,6 +232,7 @@ def complete_session(db: Session, session_id: int):
     if session:
         session.status = "completed"
         session.completed_at = datetime.now(timezone.utc)
+        _bump_version_for_session(db, session_id)
         db.commit()
         db.refresh(session)
     return session
@@ -95,6 +242,7 @@ def skip_session(db: Session, session_id: int):
     session = get_session_by_id(db, session_id)
     if session:
         session.status = "skipped"
+        _bump_version_for_session(db, session_id)
         db.commit()
         db.refresh(session)
     return session
@@ -108,8 +256,29 @@ def add_note_points(db: Session, session_id: int, points_with_embeddings: List[d
             embedding=point_data["embedding"]
         )
         db.add(note_point)
+    _bump_version_for_session(db, session_id)
     db.commit()
 
+def set_note_embeddings(db: Session, embeddings: dict):
+    """Fill in embeddings ({note_point_id: embedding}) for points stored without one."""
+    if not embeddings:
+        return
+    try:
+        db.execute(
+            update(NotePoint),
+            [{"id": point_id, "embedding": embedding} for point_id, embedding in embeddings.items()],
+        )
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error storing note embeddings: {e}")
+        raise
+
+def get_comparison_state(db: Session, session_id: int,
+                         compared_to_session_id: int) -> Optional[ComparisonState]:
+    """Get the stored match state for a (session, previous session) pair."""
+    return db.get(ComparisonState, (session_id, compared_to_session_id))
+
 def get_latest_comparison(db: Session, session_id: int) -> Optional[Comparison]:
     """Get the latest comparison for a session."""
     return db.query(Comparison)\
@@ -117,32 +286,159 @@ def get_latest_comparison(db: Session, session_id: int) -> Optional[Comparison]:
         .order_by(Comparison.created_at.desc())\
         .first()
 
+def get_latest_comparison_row(db: Session, session_id: int) -> Optional[dict]:
+    """Get the latest comparison as a plain dict shaped like schemas.ComparisonOut."""
+    stmt = select(Comparison.recall_score, Comparison.engine, Comparison.missed_point_ids,
+                  Comparison.missed_points, Comparison.created_at)\
+        .where(Comparison.session_id == session_id)\
+        .order_by(Comparison.created_at.desc())\
+        .limit(1)
+    row = db.execute(stmt).mappings().first()
+    if not row:
+        return None
+    return {
+        "recall_score": row["recall_score"],
+        "missed_points": hydrate_missed_points(db, row["missed_point_ids"], row["missed_points"]),
+        "engine": row["engine"],
+        "created_at": row["created_at"],
+    }
+
+def hydrate_missed_points(db: Session, missed_point_ids: Optional[list],
+                          missed_points: Optional[list]) -> list:
+    """
+    Expand stored note_points ids into [{text, prev_point_id}], preserving order.
+    Falls back to the legacy text copies for rows without ids. Points that
+    have since been deleted are dropped.
+    """
+    if missed_point_ids is None:
+        return missed_points or []
+    if not missed_point_ids:
+        return []
+    texts = dict(db.execute(
+        select(NotePoint.id, NotePoint.point_text).where(NotePoint.id.in_(missed_point_ids))
+    ).all())
+    return [
+        {"text": texts[point_id], "prev_point_id": point_id}
+        for point_id in missed_point_ids if point_id in texts
+    ]
+
+def _date_bucket(db: Session, column, bucket: str):
+    """SQL expression truncating a timestamp to the start of its day/week/month."""
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.date_trunc(bucket, column), Date)
+    # SQLite fallback (used by the test suite); weeks start on Monday like date_trunc
+    if bucket == "week":
+        return func.date(column, "weekday 0", "-6 days")
+    if bucket == "month":
+        return func.date(column, "start of month")
+    return func.date(column)
+
+def get_recall_history(db: Session, user_id: int, topic_id: Optional[int] = None,
+                       bucket: Optional[str] = None, since: Optional[date] = None,
+                       until: Optional[date] = None) -> List[dict]:
+    """
+    Recall over time from each session's latest comparison, in one query.
+
+    Latest-per-session is picked with row_number() over
+    ix_comparisons_session_created. Without `bucket`, returns one row per
+    session; with bucket ("day", "week" or "month"), returns the average
+    recall and session count per bucket.
+    """
+    ranked = select(
+        Comparison.session_id,
+        Comparison.recall_score,
+        Comparison.created_at,
+        SessionModel.topic_id,
+        SessionModel.day_index,
+        func.row_number().over(
+            partition_by=Comparison.session_id,
+            order_by=(Comparison.created_at.desc(), Comparison.id.desc()),
+        ).label("rn"),
+    )\
+        .join(SessionModel, Comparison.session_id == SessionModel.id)\
+        .join(Topic, SessionModel.topic_id == Topic.id)\
+        .where(Topic.user_id == user_id)
+    if topic_id is not None:
+        ranked = ranked.where(SessionModel.topic_id == topic_id)
+    ranked = ranked.subquery()
+
+    filters = [ranked.c.rn == 1]
+    if since is not None:
+        filters.append(ranked.c.created_at >= since)
+    if until is not None:
+        filters.append(ranked.c.created_at < until + timedelta(days=1))
+
+    if bucket:
+        bucket_col = _date_bucket(db, ranked.c.created_at, bucket).label("bucket")
+        stmt = select(
+            bucket_col,
+            func.avg(ranked.c.recall_score).label("avg_recall"),
+            func.count().label("sessions"),
+        ).where(*filters).group_by(bucket_col).order_by(bucket_col)
+    else:
+        stmt = select(
+            ranked.c.session_id, ranked.c.topic_id, ranked.c.day_index,
+            ranked.c.recall_score, ranked.c.created_at,
+        ).where(*filters).order_by(ranked.c.created_at, ranked.c.session_id)
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
 def save_comparison(db: Session, session_id: int, compared_to_session_id: int, 
-                   recall_score: float, missed_points: list) -> Comparison:
-    """Save a comparison result."""
+                   recall_score: float, missed_points: list,
+                   state: Optional[dict] = None, engine: str = "semantic") -> Comparison:
+    """
+    Save a comparison result, storing missed points as note_points ids when
+    possible. `state` (ComparisonState columns) replaces the pair's match
+    state in the same transaction.
+    """
+    if all(p.get("prev_point_id") is not None for p in missed_points):
+        missed_point_ids, missed_points = [p["prev_point_id"] for p in missed_points], None
+    else:
+        missed_point_ids = None
     comparison = Comparison(
         session_id=session_id,
         compared_to_session_id=compared_to_session_id,
         recall_score=recall_score,
+        engine=engine,
+        missed_point_ids=missed_point_ids,
         missed_points=missed_points
     )
     db.add(comparison)
+    if state is not None:
+        db.merge(ComparisonState(
+            session_id=session_id, compared_to_session_id=compared_to_session_id, **state
+        ))
+    _bump_version_for_session(db, session_id)
     db.commit()
     db.refresh(comparison)
     return comparison
 
 def add_solo_metric(db: Session, session_id: int, percent_covered: float, 
                    percent_remembered: float):
-    """Add solo mode metrics for a session."""
-    metric = SoloMetric(
-        session_id=session_id,
-        percent_covered=percent_covered,
-        percent_remembered=percent_remembered
-    )
-    db.add(metric)
-    db.commit()
-    db.refresh(metric)
-    return metric
+    """Add solo mode metrics for a session and update the topic's trend rollup."""
+    try:
+        metric = SoloMetric(
+            session_id=session_id,
+            percent_covered=percent_covered,
+            percent_remembered=percent_remembered
+        )
+        db.add(metric)
+        db.flush()
+        db.refresh(metric, ["created_at"])  # server default, needed for the rollup window
+        
+        topic_id = db.query(SessionModel.topic_id).filter(SessionModel.id == session_id).scalar()
+        rollups.apply_solo_metric(db, topic_id, metric)
+        _bump_version_for_session(db, session_id)
+        db.commit()
+        db.refresh(metric)
+        return metric
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error adding solo metric: {e}")
+        raise
+
+def get_solo_trend(db: Session, topic_id: int) -> Optional[SoloTrend]:
+    """Get the solo-trend rollup for a topic, if one has been built."""
+    return db.get(SoloTrend, topic_id)
 
 def get_solo_metrics(db: Session, topic_id: int, limit: int = 10) -> List[SoloMetric]:
     """Get solo metrics for a topic, most recent first."""
@@ -1,21 +1,54 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.config import settings
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import itertools
 import logging
+import time
+from app.config import settings
+from app import metrics
 
 logger = logging.getLogger(__name__)
 
-# Configure connection pool for production
-engine = create_engine(
-    settings.DB_URL,
-    pool_pre_ping=True,  # Verify connections before using them
-    pool_size=settings.DB_POOL_SIZE,  # Maximum number of connections to keep open
-    max_overflow=settings.DB_MAX_OVERFLOW,  # Maximum overflow connections
-    pool_recycle=settings.DB_POOL_RECYCLE,  # Recycle connections after N seconds
-)
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+    metrics_name = "primary"
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start, engine=self.metrics_name)
+
+def _create_engine(url: str, name: str = "primary"):
+    # Configure connection pool for production
+    engine = create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_pre_ping=True,  # Verify connections before using them
+        pool_size=settings.DB_POOL_SIZE,  # Maximum number of connections to keep open
+        max_overflow=settings.DB_MAX_OVERFLOW,  # Maximum overflow connections
+        pool_recycle=settings.DB_POOL_RECYCLE,  # Recycle connections after N seconds
+    )
+    engine.pool.metrics_name = name
+    return engine
+
+engine = _create_engine(settings.DB_URL)
+# Optional read replicas; read-only endpoints are routed here via get_read_db
+replica_engines = [_create_engine(url, f"replica-{i}") for i, url in enumerate(settings.DB_REPLICA_URLS)]
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReplicaSessionLocals = [
+    sessionmaker(autocommit=False, autoflush=False, bind=e) for e in replica_engines
+]
 Base = declarative_base()
 
 def get_db():
@@ -33,3 +66,58 @@ def init_db():
     except Exception as e:
         logger.error(f"Failed to create tables: {e}")
         raise
+
+_replica_counter = itertools.count()
+
+def wrote_recently(user) -> bool:
+    """
+    Whether the user wrote within REPLICA_READ_YOUR_WRITES_SECONDS. Every crud
+    write stamps users.last_write_at along with data_version, and the user row
+    is loaded from the primary on each request, so this holds across workers.
+    """
+    last = user.last_write_at
+    if last is None:
+        return False
+    if last.tzinfo is None:  # SQLite drops the offset; stored values are UTC
+        last = last.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - last < timedelta(seconds=settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+
+def replica_session_for(user) -> Optional[Session]:
+    """
+    Return a new replica session for a read-only request, or None when the
+    request should use the primary (no replicas configured, or the user wrote
+    within the last REPLICA_READ_YOUR_WRITES_SECONDS).
+    """
+    if not ReplicaSessionLocals or wrote_recently(user):
+        return None
+    factory = ReplicaSessionLocals[next(_replica_counter) % len(ReplicaSessionLocals)]
+    session = factory()
+    session.info["replica"] = True
+    return session
+
+def _pool_stats(pool) -> dict:
+    stats = {"status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+def pool_stats() -> dict:
+    """Connection pool statistics for the primary and each replica engine."""
+    stats = {"primary": _pool_stats(engine.pool)}
+    for i, replica in enumerate(replica_engines):
+        stats[f"replica-{i}"] = _pool_stats(replica.pool)
+    return stats
+
+def _pool_connections() -> dict:
+    return {
+        (name, state): value
+        for name, stats in pool_stats().items()
+        for state, value in stats.items() if state != "status"
+    }
+
+metrics.gauge(
+    "db_pool_connections", "Pool size and checked-in/checked-out/overflow connections.",
+    ("engine", "state"), callback=_pool_connections,
+)
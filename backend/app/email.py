@@ -1,16 +1,189 @@
-import sendgrid
+import html
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError
 from sendgrid.helpers.mail import Mail
 from app.config import settings
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class EmailError(Exception):
+    """
+    A send that failed; `retryable` sends may succeed if tried again. A send
+    that may have reached the provider (`delivered_maybe`) is never retried,
+    since /v3/mail/send isn't idempotent.
+    """
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None,
+                 delivered_maybe: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.delivered_maybe = delivered_maybe
+
+    @property
+    def retryable(self) -> bool:
+        if self.delivered_maybe:
+            return False
+        return self.status is None or self.status in RETRYABLE_STATUSES
+
+def _maybe_delivered(e: requests.RequestException) -> bool:
+    """Whether the request may have reached the provider before failing with `e`."""
+    if isinstance(e, requests.ConnectTimeout):
+        return False
+    if isinstance(e, requests.Timeout):
+        return True  # read timeout: the provider may have accepted it
+    # connection dropped mid-request rather than while connecting
+    return bool(e.args) and isinstance(e.args[0], ProtocolError)
+
+_http = None
+_http_lock = threading.Lock()
+
+def _http_session() -> requests.Session:
+    """Process-wide HTTP session so connections to the provider are kept alive and reused."""
+    global _http
+    if _http is None:
+        with _http_lock:
+            if _http is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(settings.EMAIL_MAX_WORKERS, 1))
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http = session
+    return _http
 
 def send_email(to: str, subject: str, body: str):
+    """Send one email through the SendGrid v3 API (a single attempt; raises EmailError)."""
     if not settings.SENDGRID_API_KEY:
         print(f"[DEV] Email -> {to}: {subject}\n{body}")
         return
-    sg = sendgrid.SendGridAPIClient(api_key=settings.SENDGRID_API_KEY)
     msg = Mail(
-        from_email="no-reply@example.com",
+        from_email=settings.EMAIL_FROM,
         to_emails=to,
         subject=subject,
-        html_content=f"<p>{body}</p>",
+        html_content=f"<p>{html.escape(body)}</p>".replace("\n", "<br>"),
     )
-    sg.send(msg)
\ No newline at end of file
+    try:
+        response = _http_session().post(
+            f"{settings.SENDGRID_API_HOST.rstrip('/')}/v3/mail/send",
+            json=msg.get(),
+            headers={"Authorization": f"Bearer {settings.SENDGRID_API_KEY}"},
+            timeout=settings.EMAIL_TIMEOUT_SECONDS,
+        )
+    except (requests.ConnectionError, requests.Timeout) as e:
+        raise EmailError(f"Email request failed: {e}", delivered_maybe=_maybe_delivered(e)) from e
+    if response.status_code >= 300:
+        retry_after = response.headers.get("Retry-After")
+        raise EmailError(
+            f"Email provider returned {response.status_code}: {response.text[:200]}",
+            status=response.status_code,
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+        )
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` banked."""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class EmailDispatcher:
+    """
+    Sends batches of emails concurrently on a bounded thread pool.
+
+    Every attempt (including retries) takes a token from a shared bucket, so
+    the provider sees at most `rate_per_second` requests per second across
+    all workers. Retryable failures (429, 5xx, failures to connect) are
+    retried up to `max_retries` times with jittered exponential backoff,
+    honoring Retry-After when the provider sends it. Every wait is capped at
+    `max_backoff_seconds` so one slow provider can't stall a run. Read
+    timeouts and dropped connections aren't retried: the provider may already
+    have accepted the email.
+    """
+    def __init__(self, max_workers: int, rate_per_second: float, burst: float,
+                 max_retries: int, backoff_seconds: float, send: Optional[Callable] = None,
+                 max_backoff_seconds: float = 30):
+        self.max_workers = max(max_workers, 1)
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._send = send
+
+    def _deliver(self, message: dict) -> bool:
+        delivered = self._attempts(message)
+        metrics.EMAILS.inc(outcome="sent" if delivered else "failed")
+        return delivered
+
+    def _attempts(self, message: dict) -> bool:
+        send = self._send or send_email  # looked up per call so tests can patch it
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            start = time.perf_counter()
+            try:
+                send(**message)
+                metrics.EMAIL_SEND_SECONDS.observe(time.perf_counter() - start, outcome="ok")
+                return True
+            except EmailError as e:
+                metrics.EMAIL_SEND_SECONDS.observe(
+                    time.perf_counter() - start, outcome="retryable" if e.retryable else "rejected")
+                if not e.retryable or attempt == self.max_retries:
+                    logger.error(f"Giving up on email to {message['to']}: {e}")
+                    return False
+                delay = e.retry_after if e.retry_after is not None \
+                    else self.backoff_seconds * 2 ** attempt * (0.5 + random.random() / 2)
+                delay = min(delay, self.max_backoff_seconds)
+                logger.warning(f"Email to {message['to']} failed ({e}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+            except Exception as e:
+                metrics.EMAIL_SEND_SECONDS.observe(time.perf_counter() - start, outcome="error")
+                logger.error(f"Failed to send email to {message['to']}: {e}")
+                return False
+        return False
+
+    def send_many(self, messages: List[dict]) -> List[bool]:
+        """Send messages ({to, subject, body}); returns per-message success in input order."""
+        if not messages:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(messages))) as pool:
+            return list(pool.map(self._deliver, messages))
+
+_dispatcher = None
+
+def get_dispatcher() -> EmailDispatcher:
+    """Shared dispatcher configured from settings."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = EmailDispatcher(
+            settings.EMAIL_MAX_WORKERS,
+            settings.EMAIL_RATE_PER_SECOND,
+            settings.EMAIL_BURST,
+            settings.EMAIL_MAX_RETRIES,
+            settings.EMAIL_BACKOFF_SECONDS,
+            max_backoff_seconds=settings.EMAIL_MAX_BACKOFF_SECONDS,
+        )
+    return _dispatcher
@@ -0,0 +1,97 @@
+"""
+Streaming NDJSON export of a user's full study history.
+
+Each line is a JSON object tagged with a "type" (user, topic, session,
+note_point, comparison, solo_metric). Rows are read with server-side cursors
+(`yield_per`) as plain column tuples, so memory stays flat regardless of how
+much history a user has. Embeddings are omitted unless requested.
+
+CLI usage:
+
+    python -m app.export --user-id 42 [--embeddings] [-o history.ndjson]
+"""
+import argparse
+import sys
+from typing import Iterator
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import User, Topic, Session as SessionModel, NotePoint, Comparison, SoloMetric
+from app.responses import dumps
+
+EXPORT_BATCH_SIZE = 500
+
+def _line(record_type: str, row: dict) -> bytes:
+    return dumps({"type": record_type, **row}) + b"\n"
+
+def _stream(db: Session, record_type: str, stmt, batch_size: int) -> Iterator[bytes]:
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    for row in result.mappings():
+        row = dict(row)
+        embedding = row.get("embedding")
+        if embedding is not None and not isinstance(embedding, list):
+            row["embedding"] = [float(x) for x in embedding]  # pgvector returns numpy arrays
+        yield _line(record_type, row)
+
+def export_user_history(db: Session, user_id: int, include_embeddings: bool = False,
+                        batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Yield the user's data as NDJSON lines, one table at a time."""
+    user = db.execute(
+        select(User.id, User.email, User.created_at).where(User.id == user_id)
+    ).mappings().first()
+    if user is None:
+        return
+    yield _line("user", dict(user))
+
+    topic_ids = select(Topic.id).where(Topic.user_id == user_id)
+    session_ids = select(SessionModel.id).where(SessionModel.topic_id.in_(topic_ids))
+
+    yield from _stream(db, "topic", select(
+        Topic.id, Topic.title, Topic.description, Topic.mode, Topic.compare_engine,
+        Topic.ease, Topic.interval_days, Topic.repetitions, Topic.reviewed_session_id,
+        Topic.created_at,
+    ).where(Topic.user_id == user_id).order_by(Topic.id), batch_size)
+
+    yield from _stream(db, "session", select(
+        SessionModel.id, SessionModel.topic_id, SessionModel.day_index,
+        SessionModel.scheduled_for, SessionModel.status, SessionModel.completed_at,
+    ).where(SessionModel.topic_id.in_(topic_ids)).order_by(SessionModel.id), batch_size)
+
+    note_columns = [NotePoint.id, NotePoint.session_id, NotePoint.point_text, NotePoint.created_at]
+    if include_embeddings:
+        note_columns.append(NotePoint.embedding)
+    yield from _stream(db, "note_point", select(*note_columns)
+                       .where(NotePoint.session_id.in_(session_ids))
+                       .order_by(NotePoint.id), batch_size)
+
+    yield from _stream(db, "comparison", select(
+        Comparison.id, Comparison.session_id, Comparison.compared_to_session_id,
+        Comparison.recall_score, Comparison.engine, Comparison.missed_point_ids,
+        Comparison.missed_points, Comparison.created_at,
+    ).where(Comparison.session_id.in_(session_ids)).order_by(Comparison.id), batch_size)
+
+    yield from _stream(db, "solo_metric", select(
+        SoloMetric.id, SoloMetric.session_id, SoloMetric.percent_covered,
+        SoloMetric.percent_remembered, SoloMetric.created_at,
+    ).where(SoloMetric.session_id.in_(session_ids)).order_by(SoloMetric.id), batch_size)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a user's study history as NDJSON")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--embeddings", action="store_true", help="include note embeddings")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from app.db import SessionLocal
+    db = SessionLocal()
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for line in export_user_history(db, args.user_id, args.embeddings, args.batch_size):
+            out.write(line)
+    finally:
+        if args.output:
+            out.close()
+        db.close()
+
+if __name__ == "__main__":
+    main()
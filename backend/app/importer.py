@@ -0,0 +1,240 @@
+import codecs
+import csv
+import json
+import logging
+from datetime import date
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app import crud, schemas
+
+logger = logging.getLogger(__name__)
+
+# Content types accepted by the import endpoint
+FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+# (line number, validated row, error message) - exactly one of row/error is set
+ParsedRow = Tuple[int, Optional[dict], Optional[str]]
+
+# Longest line, or CSV record (a quoted field spanning lines included), held in memory
+MAX_RECORD_CHARS = 1024 * 1024
+
+class LineTooLong(ValueError):
+    """A line ran past MAX_RECORD_CHARS without a newline; the upload is rejected."""
+
+class ImportAborted(Exception):
+    """The import stopped part-way. Batches before it are already committed."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+class TopicRowParser:
+    """
+    Incremental parser for CSV / NDJSON topic imports.
+
+    Bytes are fed in as they arrive from the request body and complete rows are
+    yielded as soon as their terminating newline is seen, so memory use is
+    bounded by the longest row rather than the size of the upload.
+
+    CSV input must start with a header row containing at least `title` and
+    `mode` (`description` is optional). Quoted fields may span lines.
+    """
+
+    def __init__(self, fmt: str):
+        if fmt not in ("csv", "ndjson"):
+            raise ValueError(f"Unsupported import format: {fmt}")
+        self.fmt = fmt
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer = ""
+        self._line_no = 0
+        self._header: Optional[List[str]] = None
+        # CSV records whose quoted field continues on the next line
+        self._pending = ""
+        self._pending_start = 0
+        self._in_quotes = False
+
+    def feed(self, chunk: bytes) -> Iterator[ParsedRow]:
+        self._buffer += self._decoder.decode(chunk)
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            yield from self._parse_line(line)
+        if len(self._buffer) > MAX_RECORD_CHARS:
+            raise LineTooLong(f"Line {self._line_no + 1} is longer than {MAX_RECORD_CHARS} characters")
+
+    def close(self) -> Iterator[ParsedRow]:
+        self._buffer += self._decoder.decode(b"", final=True)
+        if self._buffer:
+            yield from self._parse_line(self._buffer)
+            self._buffer = ""
+        if self._pending:
+            yield (self._pending_start, None, "Unterminated quoted field")
+            self._pending = ""
+            self._in_quotes = False
+
+    def _parse_line(self, line: str) -> Iterator[ParsedRow]:
+        self._line_no += 1
+        line = line.rstrip("\r")
+        if self.fmt == "ndjson":
+            if line.strip():
+                yield self._parse_json(self._line_no, line)
+            return
+
+        if self._pending:
+            record, start = self._pending + "\n" + line, self._pending_start
+        else:
+            record, start = line, self._line_no
+        self._in_quotes = self._quote_open(line, self._in_quotes)
+        if self._in_quotes:
+            if len(record) > MAX_RECORD_CHARS:
+                # Most likely a stray opening quote; resync at the next line
+                self._pending, self._in_quotes = "", False
+                yield (start, None, f"Quoted field longer than {MAX_RECORD_CHARS} characters")
+                return
+            self._pending, self._pending_start = record, start
+            return
+        self._pending = ""
+        if record.strip():
+            parsed = self._parse_csv(start, record)
+            if parsed is not None:
+                yield parsed
+
+    @staticmethod
+    def _quote_open(line: str, in_quotes: bool) -> bool:
+        """
+        Whether a quoted field is still open at the end of `line`, following
+        csv's default dialect: a quote only opens a field at its start, and
+        inside one, "" is an escaped quote. A quote anywhere else (12" ruler)
+        is a literal character.
+        """
+        at_field_start = True
+        i = 0
+        while i < len(line):
+            char = line[i]
+            if in_quotes:
+                if char == '"':
+                    if line[i + 1:i + 2] == '"':
+                        i += 1
+                    else:
+                        in_quotes = False
+                at_field_start = False
+            elif char == '"' and at_field_start:
+                in_quotes, at_field_start = True, False
+            else:
+                at_field_start = char == ","
+            i += 1
+        return in_quotes
+
+    def _parse_json(self, line_no: int, line: str) -> ParsedRow:
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            return (line_no, None, f"Invalid JSON: {e}")
+        if not isinstance(data, dict):
+            return (line_no, None, "Expected a JSON object")
+        return self._validate(line_no, data)
+
+    def _parse_csv(self, line_no: int, record: str) -> Optional[ParsedRow]:
+        try:
+            values = next(csv.reader([record]))
+        except csv.Error as e:
+            return (line_no, None, f"Invalid CSV: {e}")
+        if self._header is None:
+            self._header = [v.strip().lower() for v in values]
+            return None
+        if len(values) != len(self._header):
+            return (line_no, None, f"Expected {len(self._header)} columns, got {len(values)}")
+        return self._validate(line_no, dict(zip(self._header, values)))
+
+    def _validate(self, line_no: int, data: dict) -> ParsedRow:
+        try:
+            topic = schemas.TopicCreate(**data)
+        except ValidationError as e:
+            err = e.errors()[0]
+            field = ".".join(str(loc) for loc in err["loc"])
+            return (line_no, None, f"{field}: {err['msg']}" if field else err["msg"])
+        if not topic.title.strip():
+            return (line_no, None, "title: must not be empty")
+        row = topic.model_dump()
+        for field, value in row.items():
+            if isinstance(value, str) and "\x00" in value:
+                # Postgres text can't hold NUL; the driver would raise outside SQLAlchemyError
+                return (line_no, None, f"{field}: must not contain NUL characters")
+        return (line_no, row, None)
+
+async def import_topics(db: Session, user_id: int, fmt: str,
+                        chunks: AsyncIterator[bytes], today: Optional[date] = None) -> dict:
+    """
+    Stream topics from `chunks` into the database.
+
+    Valid rows are inserted in batches of IMPORT_CHUNK_SIZE via
+    crud.bulk_create_topics. A batch the database rejects (IntegrityError,
+    DataError) is split in half and retried until the failing rows are
+    isolated, so only those are reported. Invalid rows are reported
+    individually without aborting the import.
+
+    Raises ImportAborted if a line exceeds MAX_RECORD_CHARS or the database
+    fails for any other reason (e.g. a dropped connection); batches inserted
+    before that stay committed.
+    """
+    parser = TopicRowParser(fmt)
+    result = {"imported": 0, "failed": 0, "errors": []}
+    batch: List[Tuple[int, dict]] = []
+
+    def record_error(line_no: int, error: str):
+        result["failed"] += 1
+        if len(result["errors"]) < settings.IMPORT_MAX_ERRORS:
+            result["errors"].append({"line": line_no, "error": error})
+
+    async def insert(rows: List[Tuple[int, dict]]):
+        try:
+            # DB work is blocking; keep it off the event loop
+            await run_in_threadpool(crud.bulk_create_topics, db, user_id, [row for _, row in rows], today)
+            result["imported"] += len(rows)
+        except (IntegrityError, DataError):
+            if len(rows) == 1:
+                record_error(rows[0][0], "Database error while inserting row")
+                return
+            middle = len(rows) // 2
+            await insert(rows[:middle])
+            await insert(rows[middle:])
+
+    async def flush():
+        await insert(list(batch))
+        batch.clear()
+
+    async def consume(parsed: Iterator[ParsedRow]):
+        for line_no, row, error in parsed:
+            if error:
+                record_error(line_no, error)
+                continue
+            batch.append((line_no, row))
+            if len(batch) >= settings.IMPORT_CHUNK_SIZE:
+                await flush()
+
+    try:
+        async for chunk in chunks:
+            await consume(parser.feed(chunk))
+        await consume(parser.close())
+        if batch:
+            await flush()
+    except LineTooLong as e:
+        raise ImportAborted(f"{e}; {result['imported']} topics were imported before it", 413) from e
+    except SQLAlchemyError as e:
+        logger.error(f"Topic import for user {user_id} aborted: {e}")
+        raise ImportAborted(
+            f"Database unavailable; import aborted after {result['imported']} topics", 503
+        ) from e
+
+    logger.info(
+        f"Topic import for user {user_id}: {result['imported']} imported, {result['failed']} failed"
+    )
+    return result
@@ -0,0 +1,142 @@
+"""
+Leader election for scheduled jobs across processes.
+
+Every worker process starts the APScheduler, so each cron job first takes a
+named lease row in `scheduler_leases`. Only the holder runs the job; the
+others skip it. While the job runs, a heartbeat thread extends the lease
+every third of its TTL; if a holder dies, its lease expires and the next
+run can take it over. Jobs check `Lease.lost` between batches so a holder
+that failed to renew (and may have been replaced) stops early.
+
+A job that finishes keeps its lease until the end of its time slot (see
+`hold(until=...)`), so a process whose tick for the same slot fires late
+skips the run instead of repeating it.
+
+Lease times come from the application clock, so hosts must keep clocks in
+sync to well within SCHEDULER_LEASE_SECONDS.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from app.models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+def default_holder() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class Lease:
+    def __init__(self, name: str, ttl_seconds: float, session_factory: Callable,
+                 holder: Optional[str] = None):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.session_factory = session_factory
+        self.holder = holder or default_holder()
+        self._lost = threading.Event()
+
+    @property
+    def lost(self) -> bool:
+        return self._lost.is_set()
+
+    def _claim(self, takeover: bool) -> bool:
+        now = datetime.now(timezone.utc)
+        condition = SchedulerLease.holder == self.holder
+        if takeover:
+            condition = or_(condition, SchedulerLease.expires_at < now)
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name, condition)
+                .values(holder=self.holder, expires_at=now + self.ttl, heartbeat_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                db.commit()
+                return True
+            if not takeover:
+                db.rollback()
+                return False
+            try:
+                db.execute(insert(SchedulerLease).values(
+                    name=self.name, holder=self.holder, expires_at=now + self.ttl, heartbeat_at=now,
+                ))
+                db.commit()
+                return True
+            except IntegrityError:
+                db.rollback()  # another process holds (or just created) the lease
+                return False
+        finally:
+            db.close()
+
+    def acquire(self) -> bool:
+        """Take the lease if it is free, expired or already ours."""
+        acquired = self._claim(takeover=True)
+        if acquired:
+            self._lost.clear()
+        return acquired
+
+    def renew(self) -> bool:
+        """Extend a lease we hold; marks it lost if someone else has it."""
+        renewed = self._claim(takeover=False)
+        if not renewed:
+            self._lost.set()
+        return renewed
+
+    def release(self, until: Optional[datetime] = None):
+        """Let the lease expire at `until` (default: now)."""
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name, SchedulerLease.holder == self.holder)
+                .values(expires_at=until or datetime.now(timezone.utc))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    @contextmanager
+    def hold(self, until: Optional[datetime] = None):
+        """
+        Yield True with the lease held and heartbeating, or False if another
+        process has it. If the block completes, the lease is kept until
+        `until`; if it raises, the lease is released at once.
+        """
+        if not self.acquire():
+            yield False
+            return
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(self.ttl.total_seconds() / 3):
+                try:
+                    if not self.renew():
+                        logger.warning(f"Lost scheduler lease '{self.name}'")
+                        return
+                except Exception as e:
+                    # can't tell whether we still hold it, so assume we don't
+                    logger.error(f"Failed to renew scheduler lease '{self.name}': {e}")
+                    self._lost.set()
+                    return
+
+        thread = threading.Thread(target=heartbeat, name=f"lease-{self.name}", daemon=True)
+        thread.start()
+        try:
+            yield True
+        except BaseException:
+            until = None
+            raise
+        finally:
+            stop.set()
+            thread.join()
+            if not self.lost:
+                self.release(until)
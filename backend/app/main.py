@@ -1,19 +1,25 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 from datetime import date
 import logging
+import os
+import time
 from contextlib import asynccontextmanager
 
 from app.config import settings
-from app.db import get_db, init_db
+from app.db import get_db, init_db, pool_stats, replica_session_for
 from app.auth import get_current_token
 from app.models import User, Topic, Session as SessionModel, NotePoint
-from app import schemas, crud
-from app.ai.embeddings import get_embedding
-from app.ai.compare import compare_notes
+from app import schemas, crud, importer, export, metrics, profiling, querystats
+from app.responses import FastJSONResponse, cache_headers, not_modified, user_etag
+from app.ai.embeddings import CircuitOpenError, embedding_breaker, get_embeddings
+from app.ai.lexical import lexical_vectors
+from app.ai.compare import compare_notes, compare_notes_incremental, points_fingerprint
 from app.scheduler import start_scheduler
+from app.timezones import local_today
 
 # Configure logging
 logging.basicConfig(
@@ -76,6 +82,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Observe request latency per route template (time to response start for streams)."""
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),  # templates keep label cardinality bounded
+            status=status_code,
+        )
+
+@app.middleware("http")
+async def record_query_stats(request: Request, call_next):
+    """Count the request's SQL statements; log slow or query-heavy requests and likely N+1s."""
+    start = time.perf_counter()
+    with querystats.track() as stats:
+        response = await call_next(request)
+    route = request.scope.get("route")
+    querystats.report(
+        f"{request.method} {getattr(route, 'path', request.url.path)}", time.perf_counter() - start, stats
+    )
+    if settings.QUERY_DEBUG_HEADERS:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = f"{stats.seconds * 1000:.1f}"
+    return response
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """Sample the stacks of a request sent with a valid X-Profile header (see app.profiling)."""
+    if not profiling.requested(request.headers.get("X-Profile")):
+        return await call_next(request)
+    with profiling.Sampler() as sampler:
+        response = await call_next(request)
+    route = request.scope.get("route")
+    path = profiling.write_profile(f"{request.method} {getattr(route, 'path', request.url.path)}", sampler)
+    logger.info(f"Profiled {request.method} {request.url.path} ({sampler.elapsed * 1000:.0f}ms): {path}")
+    response.headers["X-Profile-File"] = os.path.basename(path)
+    return response
+
 # Auth dependency
 def get_current_user(
     token: dict = Depends(get_current_token),
@@ -88,6 +140,45 @@ def get_current_user(
         raise HTTPException(status_code=401, detail="Invalid token: missing sub")
     return crud.get_or_create_user(db, auth0_sub, email)
 
+def get_read_db(
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Session for read-only endpoints: a replica when available, else the primary."""
+    replica = replica_session_for(user)
+    if replica is None:
+        yield db
+        return
+    try:
+        yield replica
+    finally:
+        replica.close()
+
+def _etag(db: Session, user: User, *scope) -> str:
+    """
+    The user's ETag as of the session serving the response. A lagging replica
+    must not tag its older rows with the primary's newer data_version, so it is
+    read from the replica, before the rows: rows newer than their tag only
+    cost the client a refetch.
+    """
+    if not db.info.get("replica"):
+        return user_etag(user.id, user.data_version, *scope)  # user was loaded from the primary
+    version = db.query(User.data_version).filter(User.id == user.id).scalar()
+    return user_etag(user.id, version, *scope)
+
+def _owned_session(db: Session, session_id: int, user: User):
+    """The session and its topic in one query; 404 if missing, 403 if not the user's."""
+    row = db.query(SessionModel, Topic)\
+        .join(Topic, SessionModel.topic_id == Topic.id)\
+        .filter(SessionModel.id == session_id)\
+        .first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    session, topic = row
+    if topic.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return session, topic
+
 @app.get("/")
 def root():
     return {"message": "123tracker API", "version": "1.0.0"}
@@ -101,6 +192,18 @@ def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Process metrics in the Prometheus text exposition format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/health/db")
+def db_health():
+    """Connection pool statistics for the primary and replica engines."""
+    return {"pools": pool_stats()}
+
 # Topics endpoints
 @app.post("/topics", response_model=schemas.TopicOut, status_code=status.HTTP_201_CREATED)
 def create_topic(
@@ -110,16 +213,45 @@ def create_topic(
 ):
     """Create a new topic with auto-generated sessions."""
     topic = crud.create_topic(
-        db, user.id, topic_in.title, topic_in.description, topic_in.mode
+        db, user.id, topic_in.title, topic_in.description, topic_in.mode,
+        topic_in.compare_engine, today=local_today(user.timezone)
     )
     return topic
 
+@app.post("/topics/import", response_model=schemas.TopicImportOut)
+async def import_topics(
+    request: Request,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Bulk-import topics from a streamed CSV or NDJSON body."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = importer.FORMATS.get(content_type)
+    if not fmt:
+        raise HTTPException(
+            status_code=415,
+            detail="Content-Type must be text/csv or application/x-ndjson"
+        )
+    try:
+        return await importer.import_topics(db, user.id, fmt, request.stream(), local_today(user.timezone))
+    except importer.ImportAborted as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
 @app.get("/topics", response_model=List[schemas.TopicOut])
 def list_topics(
+    request: Request,
+    response: Response,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """List all topics for the current user."""
+    etag = _etag(db, user)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(crud.get_user_topic_rows(db, user.id), headers=cache_headers(etag))
+    response.headers.update(cache_headers(etag))
     topics = crud.get_user_topics(db, user.id)
     return topics
 
@@ -127,7 +259,7 @@ def list_topics(
 def get_topic(
     topic_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get topic details."""
     topic = db.query(Topic).filter(Topic.id == topic_id).first()
@@ -137,12 +269,29 @@ def get_topic(
         raise HTTPException(status_code=403, detail="Not authorized")
     return topic
 
+@app.patch("/topics/{topic_id}", response_model=schemas.TopicOut)
+def update_topic(
+    topic_id: int,
+    topic_in: schemas.TopicUpdate,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Update topic settings (currently the comparison engine)."""
+    topic = db.query(Topic).filter(Topic.id == topic_id).first()
+    if not topic:
+        raise HTTPException(status_code=404, detail="Topic not found")
+    if topic.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return crud.update_topic_engine(db, topic, topic_in.compare_engine)
+
 # Sessions endpoints
 @app.get("/topics/{topic_id}/sessions", response_model=List[schemas.SessionOut])
 def list_sessions(
     topic_id: int,
+    request: Request,
+    response: Response,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """List all sessions for a topic."""
     topic = db.query(Topic).filter(Topic.id == topic_id).first()
@@ -151,6 +300,13 @@ def list_sessions(
     if topic.user_id != user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    etag = _etag(db, user)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(crud.get_topic_session_rows(db, topic_id), headers=cache_headers(etag))
+    response.headers.update(cache_headers(etag))
     sessions = db.query(SessionModel).filter(SessionModel.topic_id == topic_id).all()
     return sessions
 
@@ -162,17 +318,10 @@ def reschedule_session(
     db: Session = Depends(get_db)
 ):
     """Reschedule a session."""
-    session = crud.get_session_by_id(db, session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Check ownership
-    topic = db.query(Topic).filter(Topic.id == session.topic_id).first()
-    if not topic or topic.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    session, _ = _owned_session(db, session_id, user)  # keeps it in the identity map for crud
     
     # Validate date
-    if reschedule_data.scheduled_for < date.today():
+    if reschedule_data.scheduled_for < local_today(user.timezone):
         raise HTTPException(status_code=400, detail="Cannot schedule in the past")
     
     session = crud.reschedule_session(db, session_id, reschedule_data.scheduled_for)
@@ -185,14 +334,7 @@ def complete_session(
     db: Session = Depends(get_db)
 ):
     """Mark a session as completed."""
-    session = crud.get_session_by_id(db, session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Check ownership
-    topic = db.query(Topic).filter(Topic.id == session.topic_id).first()
-    if not topic or topic.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    session, _ = _owned_session(db, session_id, user)  # keeps it in the identity map for crud
     
     session = crud.complete_session(db, session_id)
     return session
@@ -204,19 +346,43 @@ def skip_session(
     db: Session = Depends(get_db)
 ):
     """Mark a session as skipped."""
-    session = crud.get_session_by_id(db, session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Check ownership
-    topic = db.query(Topic).filter(Topic.id == session.topic_id).first()
-    if not topic or topic.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    session, _ = _owned_session(db, session_id, user)  # keeps it in the identity map for crud
     
     session = crud.skip_session(db, session_id)
     return session
 
 # Automated mode endpoints
+def _embed_texts(texts: List[str]) -> List[Optional[list]]:
+    """
+    Embed texts in one batch through the circuit breaker (bounded by
+    EMBEDDING_TIMEOUT_SECONDS); all None if the backend failed, timed out or is open.
+    """
+    if not texts:
+        return []
+    try:
+        return embedding_breaker.call(get_embeddings, texts)
+    except CircuitOpenError:
+        pass
+    except Exception as e:
+        logger.warning(f"Embedding failed, points will be compared lexically: {e!r}")
+    return [None] * len(texts)
+
+def _fill_embeddings(db: Session, notes: List[NotePoint]) -> bool:
+    """Embed and store points saved without an embedding. Returns True if all now have one."""
+    if embedding_breaker.state == "open":
+        return False
+    embeddings = _embed_texts([n.point_text for n in notes])
+    if any(e is None for e in embeddings):
+        return False
+    crud.set_note_embeddings(db, {n.id: e for n, e in zip(notes, embeddings)})
+    return True
+
+def _compare_points(notes: List[NotePoint], engine: str) -> List[dict]:
+    if engine == "lexical":
+        vectors = lexical_vectors([n.point_text for n in notes])
+        return [{"id": n.id, "text": n.point_text, "embedding": v} for n, v in zip(notes, vectors)]
+    return [{"id": n.id, "text": n.point_text, "embedding": n.embedding} for n in notes]
+
 @app.post("/sessions/{session_id}/notes", status_code=status.HTTP_201_CREATED)
 def add_notes(
     session_id: int,
@@ -225,14 +391,7 @@ def add_notes(
     db: Session = Depends(get_db)
 ):
     """Add notes to a session with embeddings."""
-    session = crud.get_session_by_id(db, session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Check ownership
-    topic = db.query(Topic).filter(Topic.id == session.topic_id).first()
-    if not topic or topic.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    session, topic = _owned_session(db, session_id, user)
     
     # Validate max 200 points
     if len(notes_in.points) > settings.MAX_NOTES_PER_SESSION:
@@ -241,10 +400,14 @@ def add_notes(
             detail=f"Maximum {settings.MAX_NOTES_PER_SESSION} bullet points allowed"
         )
     
-    # Generate embeddings
+    # Generate embeddings (lexical topics don't need them; points the backend
+    # can't embed are stored without one and compared lexically)
+    if topic.compare_engine == "lexical":
+        embeddings = [None] * len(notes_in.points)
+    else:
+        embeddings = _embed_texts(notes_in.points)
     points_with_embeddings = []
-    for point_text in notes_in.points:
-        embedding = get_embedding(point_text)
+    for point_text, embedding in zip(notes_in.points, embeddings):
         points_with_embeddings.append({
             "text": point_text,
             "embedding": embedding
@@ -255,6 +418,12 @@ def add_notes(
     
     return {"message": "Notes added successfully", "count": len(notes_in.points)}
 
+def _compare_shortlist(n_prev: int, n_curr: int) -> Optional[int]:
+    """Prefilter shortlist size for a comparison of this size, or None for the exact path."""
+    if settings.COMPARE_PREFILTER_SHORTLIST and n_prev * n_curr >= settings.COMPARE_PREFILTER_MIN_PAIRS:
+        return settings.COMPARE_PREFILTER_SHORTLIST
+    return None
+
 @app.post("/sessions/{session_id}/compare", response_model=schemas.CompareOut)
 def compare_session(
     session_id: int,
@@ -262,22 +431,18 @@ def compare_session(
     db: Session = Depends(get_db)
 ):
     """Compare current session with previous session."""
-    session = crud.get_session_by_id(db, session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Check ownership
-    topic = db.query(Topic).filter(Topic.id == session.topic_id).first()
-    if not topic or topic.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
-    # Get current session notes
-    curr_notes = db.query(NotePoint).filter(NotePoint.session_id == session_id).all()
-    if not curr_notes:
+    session, topic = _owned_session(db, session_id, user)
+    
+    # Current note ids only (and whether each has an embedding); full rows are
+    # loaded for the points that need scoring
+    curr_rows = db.query(NotePoint.id, NotePoint.embedding.is_(None))\
+        .filter(NotePoint.session_id == session_id)\
+        .order_by(NotePoint.id)\
+        .all()
+    curr_ids = [note_id for note_id, _ in curr_rows]
+    if not curr_ids:
         raise HTTPException(status_code=400, detail="No notes found for current session")
     
-    curr_points = [{"text": n.point_text, "embedding": n.embedding} for n in curr_notes]
-    
     # Find previous session
     prev_session = db.query(SessionModel)\
         .filter(SessionModel.topic_id == session.topic_id)\
@@ -289,44 +454,213 @@ def compare_session(
         raise HTTPException(status_code=400, detail="No previous session found")
     
     # Get previous session notes
-    prev_notes = db.query(NotePoint).filter(NotePoint.session_id == prev_session.id).all()
+    prev_notes = db.query(NotePoint)\
+        .filter(NotePoint.session_id == prev_session.id)\
+        .order_by(NotePoint.id)\
+        .all()
     if not prev_notes:
         raise HTTPException(status_code=400, detail="No notes found for previous session")
     
-    prev_points = [{"text": n.point_text, "embedding": n.embedding} for n in prev_notes]
-    
-    # Compare
-    result = compare_notes(prev_points, curr_points, settings.COMPARE_THRESHOLD)
+    # Semantic comparison needs every point embedded; points stored while the
+    # embedding backend was down are embedded now, or the lexical engine is used
+    engine = topic.compare_engine
+    if engine == "semantic":
+        unembedded = [n for n in prev_notes if n.embedding is None]
+        missing_ids = [note_id for note_id, missing in curr_rows if missing]
+        if missing_ids:
+            unembedded += db.query(NotePoint).filter(NotePoint.id.in_(missing_ids)).all()
+        if unembedded and not _fill_embeddings(db, unembedded):
+            engine = "lexical"
+    threshold = settings.COMPARE_THRESHOLD if engine == "semantic" else settings.LEXICAL_COMPARE_THRESHOLD
+    
+    prev_points = _compare_points(prev_notes, engine)
+    fingerprint = points_fingerprint(prev_points)
+    
+    # Reuse the last compare's matches if the previous notes are unchanged and
+    # current notes were only appended since; then only new points are scored
+    state = crud.get_comparison_state(db, session_id, prev_session.id)
+    if state is not None and state.prev_fingerprint == fingerprint \
+            and set(state.curr_point_ids) <= set(curr_ids):
+        seen = set(state.curr_point_ids)
+        new_ids = [note_id for note_id in curr_ids if note_id not in seen]
+        new_notes = db.query(NotePoint)\
+            .filter(NotePoint.id.in_(new_ids))\
+            .order_by(NotePoint.id)\
+            .all() if new_ids else []
+        new_points = _compare_points(new_notes, engine)
+        result = compare_notes_incremental(
+            prev_points, new_points, state.best_similarities, state.best_match_ids,
+            threshold, shortlist=_compare_shortlist(len(prev_points), len(new_points)),
+        )
+        curr_ids = list(state.curr_point_ids) + [p["id"] for p in new_points]
+    else:
+        curr_notes = db.query(NotePoint)\
+            .filter(NotePoint.session_id == session_id)\
+            .order_by(NotePoint.id)\
+            .all()
+        curr_points = _compare_points(curr_notes, engine)
+        curr_ids = [p["id"] for p in curr_points]
+        result = compare_notes(
+            prev_points, curr_points, threshold, include_matches=True,
+            shortlist=_compare_shortlist(len(prev_points), len(curr_points)),
+        )
+        if "best_match_indices" in result:
+            result["best_match_ids"] = [curr_ids[i] for i in result.pop("best_match_indices")]
+    
+    match_state = None
+    if "best_similarities" in result:
+        match_state = {
+            "prev_fingerprint": fingerprint,
+            "prev_point_ids": [p["id"] for p in prev_points],
+            "best_similarities": result.pop("best_similarities"),
+            "best_match_ids": result.pop("best_match_ids"),
+            "curr_point_ids": curr_ids,
+        }
     
     # Save comparison
     crud.save_comparison(
         db, session_id, prev_session.id,
-        result["recall_score"], result["missed_points"]
+        result["recall_score"], result["missed_points"],
+        state=match_state, engine=engine,
     )
     
+    result["engine"] = engine
     return result
 
 @app.get("/sessions/{session_id}/comparison", response_model=schemas.ComparisonOut)
 def get_comparison(
     session_id: int,
+    request: Request,
+    response: Response,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get latest comparison result for a session."""
-    session = crud.get_session_by_id(db, session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Check ownership
-    topic = db.query(Topic).filter(Topic.id == session.topic_id).first()
-    if not topic or topic.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
+    _owned_session(db, session_id, user)
+    
+    etag = _etag(db, user)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    if settings.FAST_JSON_RESPONSES:
+        comparison = crud.get_latest_comparison_row(db, session_id)
+        if not comparison:
+            raise HTTPException(status_code=404, detail="No comparison found")
+        return FastJSONResponse(comparison, headers=cache_headers(etag))
+    
+    response.headers.update(cache_headers(etag))
     comparison = crud.get_latest_comparison(db, session_id)
     if not comparison:
         raise HTTPException(status_code=404, detail="No comparison found")
     
-    return comparison
+    return {
+        "recall_score": comparison.recall_score,
+        "missed_points": crud.hydrate_missed_points(db, comparison.missed_point_ids, comparison.missed_points),
+        "engine": comparison.engine,
+        "created_at": comparison.created_at
+    }
+
+def _recall_history_response(request: Request, response: Response, db: Session,
+                             user: User, topic_id: Optional[int], bucket: Optional[str],
+                             since: Optional[date], until: Optional[date]):
+    etag = _etag(db, user)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    rows = crud.get_recall_history(db, user.id, topic_id, bucket, since, until)
+    content = {"points": [], "buckets": rows} if bucket else {"points": rows, "buckets": []}
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(content, headers=cache_headers(etag))
+    response.headers.update(cache_headers(etag))
+    return content
+
+@app.get("/topics/{topic_id}/recall-history", response_model=schemas.RecallHistoryOut)
+def get_topic_recall_history(
+    topic_id: int,
+    request: Request,
+    response: Response,
+    bucket: Optional[Literal["day", "week", "month"]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Recall over time for a topic (latest comparison per session), optionally bucketed."""
+    topic = db.query(Topic).filter(Topic.id == topic_id).first()
+    if not topic:
+        raise HTTPException(status_code=404, detail="Topic not found")
+    if topic.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return _recall_history_response(request, response, db, user, topic_id, bucket, since, until)
+
+@app.get("/me/recall-history", response_model=schemas.RecallHistoryOut)
+def get_user_recall_history(
+    request: Request,
+    response: Response,
+    bucket: Optional[Literal["day", "week", "month"]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Recall over time across all of the user's topics, optionally bucketed."""
+    return _recall_history_response(request, response, db, user, None, bucket, since, until)
+
+@app.get("/me/due", response_model=schemas.DueOut)
+def get_due_sessions(
+    request: Request,
+    response: Response,
+    window: Optional[Literal["overdue", "today", "upcoming"]] = None,
+    limit: int = Query(50, ge=1, le=200),
+    days: int = Query(7, ge=1, le=90),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Scheduled sessions across all topics that are overdue, due today or due
+    in the next `days` days (in the user's timezone), at most `limit` per
+    window; `window` returns only one of them.
+    """
+    today = local_today(user.timezone)
+    etag = _etag(db, user, today, window, limit, days)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    due = crud.get_due_sessions(
+        db, user.id, today, (window,) if window else crud.DUE_WINDOWS, limit, days
+    )
+    content = {"as_of": today, **due}
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(content, headers=cache_headers(etag))
+    response.headers.update(cache_headers(etag))
+    return content
+
+@app.get("/me/settings", response_model=schemas.UserSettingsOut)
+def get_user_settings(user: User = Depends(get_current_user)):
+    """The user's settings."""
+    return user
+
+@app.patch("/me/settings", response_model=schemas.UserSettingsOut)
+def update_user_settings(
+    settings_in: schemas.UserSettingsUpdate,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Update the user's settings. Existing session dates are not shifted."""
+    return crud.update_user_settings(db, user, settings_in.timezone)
+
+@app.get("/me/export")
+def export_history(
+    embeddings: bool = False,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Stream the user's full study history as NDJSON (embeddings optional)."""
+    return StreamingResponse(
+        export.export_user_history(db, user.id, include_embeddings=embeddings),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="123tracker-export-{user.id}.ndjson"'}
+    )
 
 # Solo mode endpoints
 @app.post("/sessions/{session_id}/solo", status_code=status.HTTP_201_CREATED)
@@ -337,14 +671,7 @@ def add_solo_metrics(
     db: Session = Depends(get_db)
 ):
     """Add solo mode metrics for a session."""
-    session = crud.get_session_by_id(db, session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Check ownership
-    topic = db.query(Topic).filter(Topic.id == session.topic_id).first()
-    if not topic or topic.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    _owned_session(db, session_id, user)
     
     crud.add_solo_metric(
         db, session_id,
@@ -358,7 +685,7 @@ def add_solo_metrics(
 def get_solo_trend(
     topic_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get solo mode trend with suggestion."""
     topic = db.query(Topic).filter(Topic.id == topic_id).first()
@@ -367,13 +694,28 @@ def get_solo_trend(
     if topic.user_id != user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    metrics = crud.get_solo_metrics(db, topic_id, limit=10)
+    # Single-row read from the rollup; topics whose rollup has not been built
+    # yet (see app.rollups) fall back to aggregating the raw metrics.
+    trend = crud.get_solo_trend(db, topic_id)
+    if trend is not None:
+        metrics = trend.recent
+        count, ewma_remembered = trend.metric_count, trend.ewma_remembered
+    else:
+        metrics = [
+            {
+                "percent_covered": m.percent_covered,
+                "percent_remembered": m.percent_remembered,
+                "created_at": m.created_at,
+            }
+            for m in crud.get_solo_metrics(db, topic_id, limit=settings.SOLO_TREND_WINDOW)
+        ]
+        count, ewma_remembered = None, None
     
     # Calculate suggestion
     if not metrics:
         suggestion = "No data yet. Complete sessions to see trends."
     else:
-        avg_remembered = sum(m.percent_remembered for m in metrics) / len(metrics)
+        avg_remembered = sum(m["percent_remembered"] for m in metrics) / len(metrics)
         if avg_remembered >= settings.SOLO_HIGH_RETENTION_THRESHOLD:
             suggestion = "Great retention! Consider increasing intervals."
         elif avg_remembered < settings.SOLO_LOW_RETENTION_THRESHOLD:
@@ -383,5 +725,7 @@ def get_solo_trend(
     
     return {
         "metrics": metrics,
-        "suggestion": suggestion
+        "suggestion": suggestion,
+        "count": count,
+        "ewma_remembered": ewma_remembered
     }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float, JSON, Date
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float, JSON, Date, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from pgvector.sqlalchemy import Vector
@@ -14,15 +14,30 @@ class User(Base):
     id = Column(Integer, primary_key=True)
     auth0_sub = Column(String, unique=True, index=True)  # sub from Auth0
     email = Column(String, index=True)
+    # Bumped by every crud write to the user's data; drives ETags on GET endpoints
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Set with data_version; keeps the user's reads off the replicas for a few seconds (app.db)
+    last_write_at = Column(DateTime(timezone=True))
+    # IANA zone name; session dates and reminder times are in this zone
+    timezone = Column(String, nullable=False, default="UTC", server_default="UTC")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # The hourly reminder job selects the users of the zones currently at 08:00
+    __table_args__ = (Index("ix_users_timezone_id", "timezone", "id"),)
 
 class Topic(Base):
     __tablename__ = "topics"
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     title = Column(String, nullable=False)
     description = Column(Text, default="")
     mode = Column(Enum(ModeEnum), nullable=False)
+    # "semantic" (embeddings) or "lexical" (app.ai.lexical, no model needed)
+    compare_engine = Column(String, nullable=False, default="semantic", server_default="semantic")
+    # SM-2 state (app.spacing); the fixed day 1/3/7 schedule counts as two reviews
+    ease = Column(Float, nullable=False, default=2.5, server_default="2.5")
+    interval_days = Column(Integer, nullable=False, default=4, server_default="4")
+    repetitions = Column(Integer, nullable=False, default=2, server_default="2")
+    reviewed_session_id = Column(Integer)  # latest session folded into the state
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     user = relationship("User", backref="topics")
 
@@ -31,17 +46,28 @@ class Session(Base):
     id = Column(Integer, primary_key=True)
     topic_id = Column(Integer, ForeignKey("topics.id", ondelete="CASCADE"))
     scheduled_for = Column(Date, nullable=False)
-    day_index = Column(Integer)  # 1, 3, 7
+    day_index = Column(Integer)  # days after the topic started: 1, 3, 7, then adaptive (app.spacing)
     status = Column(String, default="scheduled")  # scheduled, completed, skipped
     completed_at = Column(DateTime(timezone=True), nullable=True)
     topic = relationship("Topic", backref="sessions")
+    __table_args__ = (
+        # Upsert target for adaptive scheduling
+        UniqueConstraint("topic_id", "day_index", name="uq_sessions_topic_day"),
+        # Only scheduled sessions are ever looked up by date, always through a
+        # user's topics (/me/due; reminders reach users by timezone first)
+        Index(
+            "ix_sessions_topic_due", "topic_id", "scheduled_for",
+            postgresql_where=(status == "scheduled"),
+            sqlite_where=(status == "scheduled"),
+        ),
+    )
 
 class NotePoint(Base):
     __tablename__ = "note_points"
     id = Column(Integer, primary_key=True)
     session_id = Column(Integer, ForeignKey("sessions.id", ondelete="CASCADE"))
     point_text = Column(Text, nullable=False)
-    embedding = Column(Vector(384))  # adjust dim to model
+    embedding = Column(Vector(384))  # adjust dim to model; NULL if the embedding backend was unavailable
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Comparison(Base):
@@ -50,8 +76,36 @@ class Comparison(Base):
     session_id = Column(Integer, ForeignKey("sessions.id", ondelete="CASCADE"))
     compared_to_session_id = Column(Integer, ForeignKey("sessions.id", ondelete="SET NULL"))
     recall_score = Column(Float)
-    missed_points = Column(JSON)  # [{text, prev_point_id}]
+    engine = Column(String, nullable=False, default="semantic", server_default="semantic")  # engine that produced the score
+    # Missed previous-session points, stored as note_points ids and hydrated on
+    # read (crud.hydrate_missed_points). missed_points holds text copies only for
+    # legacy rows / points without an id.
+    missed_point_ids = Column(JSON(none_as_null=True))  # [note_points.id]
+    missed_points = Column(JSON(none_as_null=True))  # [{text, prev_point_id}]
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    __table_args__ = (
+        # Latest-per-session lookups; covers recall_score for history queries
+        Index(
+            "ix_comparisons_session_created",
+            "session_id", created_at.desc(),
+            postgresql_include=["recall_score"],
+        ),
+    )
+
+class ComparisonState(Base):
+    """
+    Per-pair match state from the last compare, so notes appended to the
+    current session are only scored against the previous points.
+    """
+    __tablename__ = "comparison_states"
+    session_id = Column(Integer, ForeignKey("sessions.id", ondelete="CASCADE"), primary_key=True)
+    compared_to_session_id = Column(Integer, ForeignKey("sessions.id", ondelete="CASCADE"), primary_key=True)
+    prev_fingerprint = Column(String(40), nullable=False)  # compare.points_fingerprint of previous points
+    prev_point_ids = Column(JSON, nullable=False)  # previous points, in state order
+    best_similarities = Column(JSON, nullable=False)  # best similarity per previous point
+    best_match_ids = Column(JSON, nullable=False)  # current note_points.id achieving it
+    curr_point_ids = Column(JSON, nullable=False)  # current points already scored
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 class SoloMetric(Base):
     __tablename__ = "solo_metrics"
@@ -61,6 +115,17 @@ class SoloMetric(Base):
     percent_remembered = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class SoloTrend(Base):
+    """Per-topic rollup of solo metrics, maintained by crud.add_solo_metric."""
+    __tablename__ = "solo_trends"
+    topic_id = Column(Integer, ForeignKey("topics.id", ondelete="CASCADE"), primary_key=True)
+    metric_count = Column(Integer, nullable=False, default=0)
+    sum_covered = Column(Float, nullable=False, default=0.0)
+    sum_remembered = Column(Float, nullable=False, default=0.0)
+    ewma_remembered = Column(Float)
+    recent = Column(JSON, nullable=False, default=list)  # last N metrics, newest first
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class Notification(Base):
     __tablename__ = "notifications"
     id = Column(Integer, primary_key=True)
@@ -68,4 +133,49 @@ class Notification(Base):
     topic_id = Column(Integer, ForeignKey("topics.id", ondelete="CASCADE"))
     session_id = Column(Integer, ForeignKey("sessions.id", ondelete="CASCADE"))
     method = Column(String, default="email")
-    sent_at = Column(DateTime(timezone=True))
\ No newline at end of file
+    # Day the reminder is for. Claimed before sending; sent_at is set once delivered
+    reminder_date = Column(Date)
+    claimed_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True))
+    # Set on claims whose run died before settling them; those are never resent
+    failed_at = Column(DateTime(timezone=True))
+    # At most one reminder per session per day, however many runs or workers try
+    __table_args__ = (UniqueConstraint("session_id", "reminder_date", name="uq_notifications_session_day"),)
+
+class ReminderOutbox(Base):
+    """
+    One reminder email waiting for (or past) delivery. Filled by the daily job
+    and drained by app.outbox delivery workers.
+    """
+    __tablename__ = "reminder_outbox"
+    id = Column(Integer, primary_key=True)
+    # "session:<id>:<date>" or "digest:<user id>:<date>"; enqueueing twice is a no-op
+    dedupe_key = Column(String, nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    recipient = Column(String, nullable=False)
+    kind = Column(String, nullable=False)  # reminder, digest
+    sessions = Column(JSON, nullable=False)  # [{session_id, topic_id, title, day_index}]
+    reminder_date = Column(Date, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    claimed_at = Column(DateTime(timezone=True))
+    sent_at = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    __table_args__ = (
+        # Claim queries only look at pending rows that are due
+        Index(
+            "ix_reminder_outbox_pending", "available_at", "id",
+            postgresql_where=(status == "pending"),
+            sqlite_where=(status == "pending"),
+        ),
+    )
+
+class SchedulerLease(Base):
+    """Named lease held by the process currently running a scheduled job (app.leader)."""
+    __tablename__ = "scheduler_leases"
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    heartbeat_at = Column(DateTime(timezone=True))
\ No newline at end of file
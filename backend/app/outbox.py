@@ -0,0 +1,239 @@
+"""
+Reminder outbox: decouples generating reminders from delivering them.
+
+The daily job (`enqueue_due_reminders`) fills `reminder_outbox` with a
+single set-based INSERT ... SELECT: one row per due session, or per user in
+digest mode. Any number of delivery workers, in any process, drain it:
+each claims a batch with SELECT ... FOR UPDATE SKIP LOCKED (so workers never
+wait on or double-claim each other's rows), commits the claim, sends the
+batch concurrently outside any transaction, and marks each row sent or
+schedules a retry. A slow or failing email only delays its own row.
+
+Rows left in "sending" by a worker that died are marked failed rather than
+retried, so a reminder is never sent twice.
+
+Workers run inside every app process when REMINDER_OUTBOX is enabled, or
+standalone:
+
+    python -m app.outbox worker [--batch-size 100] [--poll 5]
+    python -m app.outbox enqueue
+"""
+import argparse
+import logging
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, List, Optional
+from sqlalchemy import String, cast, delete, func, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.email import get_dispatcher
+from app.models import Session as SessionModel, Topic, User, ReminderOutbox
+from app.reminders import (
+    due_conditions, insert_notifications, render_digest, session_json, session_list,
+)
+
+logger = logging.getLogger(__name__)
+
+def _outbox_insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(ReminderOutbox)
+    return sqlite.insert(ReminderOutbox)  # SQLite fallback (used by the test suite)
+
+def _single_session_list(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.json_build_array(session_json(db))
+    return func.json_array(session_json(db))
+
+def enqueue_due_reminders(db: Session, today: Optional[date] = None,
+                          digest: Optional[bool] = None,
+                          timezones: Optional[List[str]] = None) -> int:
+    """
+    Queue the reminders due `today` (for users in `timezones` if given) with
+    one INSERT ... SELECT. Sessions already notified today, or already
+    queued, are skipped. Returns rows queued.
+    """
+    today = today or date.today()
+    digest = settings.REMINDER_DIGEST if digest is None else digest
+    now = datetime.now(timezone.utc)
+    day = f":{today.isoformat()}"
+
+    if digest:
+        key, kind, sessions = literal("digest:") + cast(User.id, String) + literal(day), "digest", session_list(db)
+    else:
+        key, kind, sessions = literal("session:") + cast(SessionModel.id, String) + literal(day), "reminder", _single_session_list(db)
+    rows = select(
+        key, User.id, User.email, literal(kind), sessions,
+        literal(today), literal("pending"), literal(0), literal(now),
+    ).select_from(SessionModel)\
+        .join(Topic, SessionModel.topic_id == Topic.id)\
+        .join(User, Topic.user_id == User.id)\
+        .where(*due_conditions(today, timezones))
+    if digest:
+        rows = rows.group_by(User.id, User.email)
+
+    stmt = _outbox_insert(db).from_select([
+        "dedupe_key", "user_id", "recipient", "kind", "sessions",
+        "reminder_date", "status", "attempts", "available_at",
+    ], rows).on_conflict_do_nothing(index_elements=["dedupe_key"])
+    queued = db.execute(stmt).rowcount
+    db.commit()
+    logger.info(f"Queued {queued} reminder emails for {today}")
+    return queued
+
+def claim_batch(db: Session, batch_size: int) -> list:
+    """Claim up to `batch_size` due rows for this worker and commit the claim."""
+    now = datetime.now(timezone.utc)
+    due = select(ReminderOutbox.id)\
+        .where(ReminderOutbox.status == "pending", ReminderOutbox.available_at <= now)\
+        .order_by(ReminderOutbox.available_at, ReminderOutbox.id)\
+        .limit(batch_size)\
+        .with_for_update(skip_locked=True)\
+        .scalar_subquery()
+    rows = db.execute(
+        update(ReminderOutbox)
+        .where(ReminderOutbox.id.in_(due))
+        .values(status="sending", claimed_at=now, attempts=ReminderOutbox.attempts + 1)
+        .returning(
+            ReminderOutbox.id, ReminderOutbox.user_id, ReminderOutbox.recipient,
+            ReminderOutbox.kind, ReminderOutbox.sessions, ReminderOutbox.reminder_date,
+            ReminderOutbox.attempts,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return rows
+
+def render(row) -> dict:
+    """Email for an outbox row: a single reminder or a digest."""
+    if row.kind == "digest":
+        return {"to": row.recipient, **render_digest(sorted(
+            row.sessions, key=lambda s: (s["title"], s["day_index"], s["session_id"])
+        ))}
+    s = row.sessions[0]
+    return {
+        "to": row.recipient,
+        "subject": "Study Reminder",
+        "body": f"Your session (Day {s['day_index']}) for '{s['title']}' is due today.",
+    }
+
+def deliver_batch(db: Session, batch_size: Optional[int] = None) -> int:
+    """Claim, send and settle one batch. Returns rows processed (0 when idle)."""
+    rows = claim_batch(db, batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not rows:
+        return 0
+    results = get_dispatcher().send_many([render(row) for row in rows])
+
+    now = datetime.now(timezone.utc)
+    sent = [row for row, ok in zip(rows, results) if ok]
+    failed = [row for row, ok in zip(rows, results) if not ok]
+    if sent:
+        db.execute(
+            update(ReminderOutbox)
+            .where(ReminderOutbox.id.in_([row.id for row in sent]))
+            .values(status="sent", sent_at=now, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            insert_notifications(db).values([
+                {
+                    "user_id": row.user_id,
+                    "topic_id": s["topic_id"],
+                    "session_id": s["session_id"],
+                    "method": "email_digest" if row.kind == "digest" else "email",
+                    "reminder_date": row.reminder_date,
+                    "sent_at": now,
+                }
+                for row in sent for s in row.sessions
+            ]).on_conflict_do_nothing(index_elements=["session_id", "reminder_date"])
+        )
+    if failed:
+        db.execute(update(ReminderOutbox), [
+            {
+                "id": row.id,
+                "status": "pending" if row.attempts < settings.OUTBOX_MAX_ATTEMPTS else "failed",
+                "available_at": now + timedelta(seconds=settings.OUTBOX_RETRY_SECONDS * 2 ** (row.attempts - 1)),
+                "last_error": "delivery failed",
+            }
+            for row in failed
+        ])
+    db.commit()
+    return len(rows)
+
+def fail_stale_claims(db: Session, timeout_seconds: Optional[float] = None) -> int:
+    """Mark rows stuck in "sending" (their worker died) as failed, without resending."""
+    timeout_seconds = timeout_seconds or settings.OUTBOX_CLAIM_TIMEOUT_SECONDS
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=timeout_seconds)
+    count = db.execute(
+        update(ReminderOutbox)
+        .where(ReminderOutbox.status == "sending", ReminderOutbox.claimed_at < cutoff)
+        .values(status="failed", last_error="worker stopped during delivery; not retried")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if count:
+        logger.warning(f"Marked {count} stale outbox claims as failed")
+    return count
+
+def purge_outbox(db: Session, days: Optional[int] = None) -> int:
+    """Delete sent/failed rows older than `days`."""
+    days = settings.OUTBOX_RETENTION_DAYS if days is None else days
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    count = db.execute(
+        delete(ReminderOutbox)
+        .where(ReminderOutbox.status.in_(["sent", "failed"]), ReminderOutbox.created_at < cutoff)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return count
+
+def drain(db: Session, batch_size: Optional[int] = None,
+          should_stop: Optional[Callable[[], bool]] = None) -> int:
+    """Deliver batches until the outbox has nothing due. Returns rows processed."""
+    fail_stale_claims(db)
+    total = 0
+    while should_stop is None or not should_stop():
+        processed = deliver_batch(db, batch_size)
+        if not processed:
+            break
+        total += processed
+    return total
+
+def run_worker(session_factory: Callable, batch_size: Optional[int] = None,
+               poll_seconds: Optional[float] = None, stop: Optional[threading.Event] = None):
+    """Deliver continuously, polling when idle, until `stop` is set."""
+    poll_seconds = poll_seconds or settings.OUTBOX_POLL_SECONDS
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        db = session_factory()
+        try:
+            drain(db, batch_size, stop.is_set)
+        except Exception as e:
+            logger.error(f"Outbox worker error: {e}")
+        finally:
+            db.close()
+        stop.wait(poll_seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description="Reminder outbox")
+    parser.add_argument("command", choices=["worker", "enqueue"])
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--poll", type=float, default=None, help="seconds to wait when idle")
+    args = parser.parse_args()
+
+    from app.db import SessionLocal
+    if args.command == "worker":
+        try:
+            run_worker(SessionLocal, args.batch_size, args.poll)
+        except KeyboardInterrupt:
+            pass
+        return
+    db = SessionLocal()
+    try:
+        print(f"Queued {enqueue_due_reminders(db)} reminders")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
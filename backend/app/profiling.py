@@ -0,0 +1,99 @@
+"""
+On-demand profiling of single requests.
+
+With PROFILING_ENABLED and a PROFILING_TOKEN set, a request carrying
+`X-Profile: <token>` runs under a sampling profiler: a background thread
+records the stack of every busy thread in the process every
+PROFILING_INTERVAL_MS until the response starts. The samples are written to
+PROFILING_DIR as collapsed stacks, one `frame;frame;frame count` line per
+distinct stack, which flamegraph.pl and speedscope read directly. The
+response names the file in `X-Profile-File`.
+
+Sampling all threads, rather than tracing one, is what follows sync
+endpoints into the threadpool. It also means other requests running in the
+same worker at the same time show up in the profile, so profile against a
+quiet worker. Requests without the header only pay for a settings check.
+"""
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+from app.config import settings
+
+# Innermost frames of threads that are waiting rather than working
+IDLE_FRAMES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get")}
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _location(filename: str) -> str:
+    if "site-packages" + os.sep in filename:
+        return filename.split("site-packages" + os.sep, 1)[1]
+    if filename.startswith(_ROOT):
+        return os.path.relpath(filename, _ROOT)
+    return os.path.basename(filename)
+
+def _stack(frame) -> Optional[str]:
+    """Collapsed stack of a thread, outermost frame first; None if the thread is idle."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+    frames = []
+    while frame is not None:
+        frames.append(f"{_location(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+class Sampler:
+    """Samples the stacks of all busy threads while running (`with Sampler() as s:`)."""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or settings.PROFILING_INTERVAL_MS / 1000
+        self.samples = Counter()
+        self.started = self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _stack(frame)
+                if stack is not None:
+                    self.samples[stack] += 1
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return False
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+def requested(token: Optional[str]) -> bool:
+    """Whether a request's X-Profile header value asks for (and may have) a profile."""
+    if not settings.PROFILING_ENABLED or not settings.PROFILING_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.PROFILING_TOKEN.encode())  # str requires ASCII
+
+def write_profile(label: str, sampler: Sampler) -> str:
+    """Write the samples to PROFILING_DIR; returns the file path."""
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-").lower()
+    path = os.path.join(settings.PROFILING_DIR, f"{stamp}-{slug}.collapsed")
+    with open(path, "w") as f:
+        f.write(sampler.collapsed())
+    return path
@@ -0,0 +1,73 @@
+"""
+Per-request SQL statement counts and database time.
+
+Cursor events on the Engine class (so every engine, replicas included) add
+each statement to the QueryStats of the current request, which the
+middleware in main sets in a context variable. Statements run outside a
+tracked request (scheduled jobs, CLIs) are not counted.
+
+The same statement repeated many times in one request is the signature of
+an N+1 pattern (a query per row of an earlier result). Statements are
+compared by their parameterized SQL, so a lookup repeated with different
+ids counts as one statement run N times.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class QueryStats:
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements run at least `threshold` times, most repeated first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None and context is not None:
+        context._query_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_query_started", None)
+    if stats is None or started is None:
+        return
+    stats.seconds += time.perf_counter() - started
+    stats.count += 1
+    stats.statements[statement] += 1
+
+@contextmanager
+def track():
+    """Count the statements run in this context (and tasks/threads it starts)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+def report(label: str, elapsed: float, stats: QueryStats):
+    """Log a finished request if it was slow, ran too many statements or repeated one."""
+    if elapsed * 1000 >= settings.SLOW_REQUEST_MS or stats.count >= settings.QUERY_COUNT_WARN:
+        logger.warning(
+            f"Slow request {label}: {elapsed * 1000:.0f}ms, "
+            f"{stats.count} queries, {stats.seconds * 1000:.0f}ms in the database"
+        )
+    for sql, n in stats.repeated(settings.QUERY_REPEAT_WARN):
+        logger.warning(f"Possible N+1 in {label}: statement ran {n} times: {' '.join(sql.split())[:200]}")
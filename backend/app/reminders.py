@@ -0,0 +1,60 @@
+"""
+Query and rendering helpers shared by the direct reminder jobs
+(app.scheduler) and the reminder outbox (app.outbox).
+"""
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models import Session as SessionModel, Topic, User, Notification
+
+def due_conditions(today: date, timezones: Optional[List[str]] = None) -> list:
+    """
+    Filters for sessions due today whose user has an email and wasn't notified
+    today, optionally only for users in `timezones` (whose local date is `today`).
+    """
+    already_notified = select(Notification.id).where(
+        Notification.session_id == SessionModel.id,
+        Notification.reminder_date == today,
+    ).exists()
+    conditions = [
+        SessionModel.scheduled_for == today,
+        SessionModel.status == "scheduled",
+        User.email.isnot(None), User.email != "",
+        ~already_notified,
+    ]
+    if timezones is not None:
+        conditions.append(User.timezone.in_(timezones))
+    return conditions
+
+def insert_notifications(db: Session):
+    """INSERT into notifications that supports ON CONFLICT DO NOTHING on this dialect."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(Notification)
+    return sqlite.insert(Notification)  # SQLite fallback (used by the test suite)
+
+def session_json(db: Session):
+    """JSON object describing a due session, built by the database."""
+    fields = (
+        "session_id", SessionModel.id, "topic_id", SessionModel.topic_id,
+        "title", Topic.title, "day_index", SessionModel.day_index,
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        return func.json_build_object(*fields)
+    return func.json_object(*fields)  # SQLite fallback (used by the test suite)
+
+def session_list(db: Session):
+    """Per-user JSON array of due sessions, aggregated by the database."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.json_agg(session_json(db))
+    return func.json_group_array(session_json(db))
+
+def render_digest(sessions: List[dict]) -> dict:
+    """Subject and body of a user's digest email."""
+    lines = [f"- '{s['title']}' (Day {s['day_index']})" for s in sessions]
+    count = len(sessions)
+    return {
+        "subject": f"Study Reminder: {count} session{'s' if count != 1 else ''} due today",
+        "body": "You have these study sessions due today:\n" + "\n".join(lines),
+    }
@@ -0,0 +1,66 @@
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Optional
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+def _default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat().replace("+00:00", "Z")
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    """
+    Serialize plain dicts/lists to JSON bytes.
+
+    Uses orjson when installed (dates, datetimes and enums are handled
+    natively) and falls back to the standard library otherwise. UTC datetimes
+    are rendered with a `Z` suffix to match Pydantic's output.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+class FastJSONResponse(Response):
+    """
+    JSON response for pre-shaped row dicts.
+
+    Returning this from an endpoint skips FastAPI's response_model validation
+    and jsonable_encoder pass, so callers are responsible for producing rows
+    that match the declared schema (see the *_rows functions in app.crud).
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def user_etag(user_id: int, data_version: int, *scope) -> str:
+    """
+    Weak ETag derived from the user's data_version change counter, plus any
+    `scope` values the response also depends on (e.g. the current date).
+    """
+    return f'W/"{"-".join(str(part) for part in (user_id, data_version, *scope))}"'
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Return a 304 response if the request's If-None-Match matches `etag`."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    if "*" in tags or etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers=cache_headers(etag))
+    return None
+
+def cache_headers(etag: str) -> dict:
+    # no-cache: clients may store the response but must revalidate each time
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
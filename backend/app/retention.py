@@ -0,0 +1,112 @@
+"""
+Retention policy and batched compaction for the comparisons table.
+
+Every POST /sessions/{id}/compare appends a row but only the newest one per
+session is ever read, so older rows can be dropped. A row is deleted when it
+is not the newest for its session and either:
+
+- it is older than the newest COMPARISON_KEEP_LATEST rows of its session, or
+- it was created more than COMPARISON_RETENTION_DAYS days ago.
+
+Work is done a chunk of sessions at a time and deletes are committed in
+batches of at most COMPACTION_BATCH_SIZE rows, so no transaction holds locks
+on a large part of the table. Runs nightly from the scheduler, or manually:
+
+    python -m app.retention
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Comparison
+
+logger = logging.getLogger(__name__)
+
+def _expired_ids(db: Session, session_ids: list, keep_latest: int,
+                 cutoff: Optional[datetime]) -> list:
+    ranked = select(
+        Comparison.id,
+        Comparison.created_at,
+        func.row_number().over(
+            partition_by=Comparison.session_id,
+            order_by=(Comparison.created_at.desc(), Comparison.id.desc()),
+        ).label("rn"),
+    ).where(Comparison.session_id.in_(session_ids)).subquery()
+
+    expired = []
+    if keep_latest > 0:
+        expired.append(ranked.c.rn > keep_latest)
+    if cutoff is not None:
+        expired.append(ranked.c.created_at < cutoff)
+    # The newest comparison of a session is always kept
+    stmt = select(ranked.c.id).where(and_(ranked.c.rn > 1, or_(*expired)))
+    return list(db.execute(stmt).scalars())
+
+def compact_comparisons(db: Session, keep_latest: Optional[int] = None,
+                        max_age_days: Optional[int] = None,
+                        batch_size: Optional[int] = None,
+                        pause_seconds: float = 0.0) -> int:
+    """Delete expired comparison rows in bounded batches. Returns rows deleted."""
+    keep_latest = settings.COMPARISON_KEEP_LATEST if keep_latest is None else keep_latest
+    max_age_days = settings.COMPARISON_RETENTION_DAYS if max_age_days is None else max_age_days
+    batch_size = batch_size or settings.COMPACTION_BATCH_SIZE
+    if keep_latest <= 0 and max_age_days <= 0:
+        logger.info("Comparison retention disabled; nothing to compact")
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days) if max_age_days > 0 else None
+
+    deleted = 0
+    last_session_id = 0
+    while True:
+        # Keyset-paginate over sessions that have comparisons
+        session_ids = list(db.execute(
+            select(Comparison.session_id)
+            .where(Comparison.session_id > last_session_id)
+            .distinct()
+            .order_by(Comparison.session_id)
+            .limit(batch_size)
+        ).scalars())
+        if not session_ids:
+            break
+        last_session_id = session_ids[-1]
+
+        ids = _expired_ids(db, session_ids, keep_latest, cutoff)
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            db.execute(
+                delete(Comparison)
+                .where(Comparison.id.in_(chunk))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            deleted += len(chunk)
+            if pause_seconds:
+                time.sleep(pause_seconds)
+        db.commit()  # end the read transaction between chunks
+
+    logger.info(f"Comparison compaction reclaimed {deleted} rows")
+    return deleted
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the comparisons table")
+    parser.add_argument("--keep-latest", type=int, default=None)
+    parser.add_argument("--max-age-days", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    from app.db import SessionLocal
+    db = SessionLocal()
+    try:
+        deleted = compact_comparisons(db, args.keep_latest, args.max_age_days, args.batch_size, args.pause)
+        print(f"Reclaimed {deleted} comparison rows")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
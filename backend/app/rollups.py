@@ -0,0 +1,125 @@
+"""
+Incrementally maintained solo-trend rollups.
+
+Each topic with solo metrics has one `solo_trends` row holding the metric
+count, running sums, an EWMA of percent_remembered and the last
+SOLO_TREND_WINDOW metrics, so the trend endpoint is a single-row read.
+
+Rows are created lazily from the full history the first time a topic gets a
+new metric, so existing data converges without a backfill. To build all
+rollups up front after upgrading, run:
+
+    python -m app.rollups backfill
+"""
+import argparse
+import logging
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import SoloMetric, SoloTrend, Session as SessionModel
+
+logger = logging.getLogger(__name__)
+
+def _accumulate(trend: SoloTrend, percent_covered: float, percent_remembered: float,
+                created_at: Optional[datetime]):
+    """Fold one metric into the rollup."""
+    alpha = settings.SOLO_EWMA_ALPHA
+    trend.metric_count = (trend.metric_count or 0) + 1
+    trend.sum_covered = (trend.sum_covered or 0.0) + percent_covered
+    trend.sum_remembered = (trend.sum_remembered or 0.0) + percent_remembered
+    if trend.ewma_remembered is None:
+        trend.ewma_remembered = percent_remembered
+    else:
+        trend.ewma_remembered = alpha * percent_remembered + (1 - alpha) * trend.ewma_remembered
+    entry = {
+        "percent_covered": percent_covered,
+        "percent_remembered": percent_remembered,
+        "created_at": created_at.isoformat() if created_at else None,
+    }
+    # Reassign (rather than mutate) so the JSON column is marked dirty
+    trend.recent = ([entry] + list(trend.recent or []))[:settings.SOLO_TREND_WINDOW]
+
+def rebuild_solo_trend(db: Session, topic_id: int) -> Optional[SoloTrend]:
+    """Recompute a topic's rollup from all of its solo metrics (no commit)."""
+    stmt = select(SoloMetric.percent_covered, SoloMetric.percent_remembered, SoloMetric.created_at)\
+        .join(SessionModel, SoloMetric.session_id == SessionModel.id)\
+        .where(SessionModel.topic_id == topic_id)\
+        .order_by(SoloMetric.created_at, SoloMetric.id)\
+        .execution_options(yield_per=1000)
+
+    trend = db.get(SoloTrend, topic_id)
+    if trend is None:
+        trend = SoloTrend(topic_id=topic_id)
+        db.add(trend)
+    trend.metric_count, trend.sum_covered, trend.sum_remembered = 0, 0.0, 0.0
+    trend.ewma_remembered, trend.recent = None, []
+    for covered, remembered, created_at in db.execute(stmt):
+        _accumulate(trend, covered, remembered, created_at)
+    return trend
+
+def apply_solo_metric(db: Session, topic_id: int, metric: SoloMetric):
+    """
+    Fold a newly flushed metric into its topic's rollup, in the caller's
+    transaction. The rollup row is locked so concurrent submissions for the
+    same topic serialize instead of losing updates.
+    """
+    trend = db.query(SoloTrend)\
+        .filter(SoloTrend.topic_id == topic_id)\
+        .with_for_update()\
+        .first()
+    if trend is not None:
+        _accumulate(trend, metric.percent_covered, metric.percent_remembered, metric.created_at)
+        return trend
+
+    # First metric since rollups were introduced: seed from history (which
+    # already includes `metric`). A concurrent request may win the insert.
+    try:
+        with db.begin_nested():
+            trend = rebuild_solo_trend(db, topic_id)
+        return trend
+    except IntegrityError:
+        trend = db.query(SoloTrend)\
+            .filter(SoloTrend.topic_id == topic_id)\
+            .with_for_update()\
+            .first()
+        _accumulate(trend, metric.percent_covered, metric.percent_remembered, metric.created_at)
+        return trend
+
+def backfill_solo_trends(db: Session, batch_size: int = 500) -> int:
+    """Rebuild rollups for every topic with solo metrics. Returns topics processed."""
+    topic_ids = db.execute(
+        select(SessionModel.topic_id)
+        .join(SoloMetric, SoloMetric.session_id == SessionModel.id)
+        .distinct()
+        .order_by(SessionModel.topic_id)
+    ).scalars().all()
+
+    for i, topic_id in enumerate(topic_ids, start=1):
+        rebuild_solo_trend(db, topic_id)
+        if i % batch_size == 0:
+            db.commit()
+            logger.info(f"Backfilled solo trends for {i}/{len(topic_ids)} topics")
+    db.commit()
+    logger.info(f"Backfilled solo trends for {len(topic_ids)} topics")
+    return len(topic_ids)
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain solo-trend rollups")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    from app.db import SessionLocal
+    db = SessionLocal()
+    try:
+        count = backfill_solo_trends(db, args.batch_size)
+        print(f"Backfilled {count} topics")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,38 +1,323 @@
 from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set
+import json
+import logging
+import time
+from contextlib import contextmanager
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
-from app.models import Session as SessionModel, Notification
-from app.email import send_email
-
-def send_due_notifications(db: Session):
-    today = date.today()
-    due = db.query(SessionModel).filter(SessionModel.scheduled_for == today, SessionModel.status == "scheduled").all()
-    for s in due:
-        # find user email via topic->user
-        user = s.topic.user
-        if user and user.email:
-            send_email(to=user.email, subject="Study Reminder", body=f"Your session (Day {s.day_index}) for '{s.topic.title}' is due today.")
-            from datetime import datetime, timezone
-            n = Notification(
-                user_id=user.id, 
-                topic_id=s.topic_id, 
-                session_id=s.id, 
-                method="email",
-                sent_at=datetime.now(timezone.utc)
-            )
-            db.add(n)
+from app.config import settings
+from app import metrics
+from app.models import Session as SessionModel, Topic, User, Notification
+from app.email import get_dispatcher
+from app.leader import Lease
+from app.reminders import due_conditions, insert_notifications, render_digest, session_list
+from app.retention import compact_comparisons
+from app.spacing import reschedule_topics
+from app.timezones import zones_at_hour
+
+logger = logging.getLogger(__name__)
+
+def reminder_slices(db: Session, now: Optional[datetime] = None) -> Dict[date, List[str]]:
+    """
+    Timezones in use whose local time is in the REMINDER_LOCAL_HOUR hour at
+    `now`, grouped by local date. Each hourly run handles only these users.
+    """
+    zones = db.execute(select(User.timezone).distinct()).scalars()
+    return zones_at_hour(zones, settings.REMINDER_LOCAL_HOUR, now)
+
+def _due_reminders(db: Session, today: date, after_id: int, limit: int,
+                   timezones: Optional[List[str]] = None) -> list:
+    """
+    Next chunk of today's due sessions (keyset on session id) with their topic
+    title and user email, skipping sessions already notified today.
+    """
+    stmt = select(
+        SessionModel.id, SessionModel.topic_id, SessionModel.day_index,
+        Topic.title, User.id.label("user_id"), User.email,
+    ).join(Topic, SessionModel.topic_id == Topic.id)\
+        .join(User, Topic.user_id == User.id)\
+        .where(SessionModel.id > after_id, *due_conditions(today, timezones))\
+        .order_by(SessionModel.id)\
+        .limit(limit)
+    return db.execute(stmt).all()
+
+def _claim_notifications(db: Session, rows: List[dict], method: str, today: date) -> Set[int]:
+    """
+    Claim today's reminder for each session before sending it, with a single
+    multi-row INSERT. The unique (session_id, reminder_date) key makes this
+    the dedupe point: sessions already claimed by an earlier or concurrent run
+    are skipped. Returns the session ids claimed by this call (committed).
+    """
+    if not rows:
+        return set()
+    stmt = insert_notifications(db).values([
+        {
+            "user_id": row["user_id"],
+            "topic_id": row["topic_id"],
+            "session_id": row["session_id"],
+            "method": method,
+            "reminder_date": today,
+            "claimed_at": datetime.now(timezone.utc),
+        }
+        for row in rows
+    ]).on_conflict_do_nothing(index_elements=["session_id", "reminder_date"])\
+        .returning(Notification.session_id)
+    claimed = set(db.execute(stmt).scalars())
+    db.commit()
+    return claimed
+
+def fail_stale_claims(db: Session, timeout_seconds: Optional[float] = None) -> int:
+    """
+    Mark claims left unsettled for `timeout_seconds` (default
+    REMINDER_CLAIM_TIMEOUT_SECONDS; their run died, possibly after the email
+    went out) as failed, without resending. Returns claims marked.
+    """
+    timeout_seconds = timeout_seconds or settings.REMINDER_CLAIM_TIMEOUT_SECONDS
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=timeout_seconds)
+    count = db.execute(
+        update(Notification)
+        .where(Notification.sent_at.is_(None), Notification.failed_at.is_(None),
+               Notification.claimed_at < cutoff)
+        .values(failed_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if count:
+        logger.warning(f"Marked {count} stale reminder claims as failed; not resent")
+    return count
+
+def _settle_notifications(db: Session, sent: List[int], failed: List[int], today: date):
+    """Stamp delivered claims with sent_at and drop failed ones so a rerun retries them."""
+    if sent:
+        db.execute(
+            update(Notification)
+            .where(Notification.session_id.in_(sent), Notification.reminder_date == today)
+            .values(sent_at=datetime.now(timezone.utc), failed_at=None)  # in case a slow chunk was marked stale
+            .execution_options(synchronize_session=False)
+        )
+    if failed:
+        db.execute(
+            delete(Notification)
+            .where(Notification.session_id.in_(failed), Notification.reminder_date == today)
+            .execution_options(synchronize_session=False)
+        )
     db.commit()
 
+def send_due_notifications(db: Session, chunk_size: Optional[int] = None,
+                           is_leader: Optional[Callable[[], bool]] = None,
+                           today: Optional[date] = None,
+                           timezones: Optional[List[str]] = None) -> int:
+    """
+    Email a reminder for every session due `today` (default: the server's
+    date), for users in `timezones` only if given. Returns reminders sent.
+
+    Sessions are read a chunk at a time in one joined query. Each chunk is
+    claimed in `notifications` before any email goes out, then sent
+    concurrently through the shared dispatcher, so memory is bounded and no
+    run, retried or concurrent, ever sends a session's reminder twice. A run
+    that dies part-way can simply be restarted. Claims it left unsettled are
+    marked failed by `fail_stale_claims`, never resent: the email may have
+    gone out before the crash.
+    `is_leader` is checked before each chunk; the job stops when it turns False.
+    """
+    chunk_size = chunk_size or settings.REMINDER_CHUNK_SIZE
+    today = today or date.today()
+    sent = 0
+    last_id = 0
+    while True:
+        if is_leader is not None and not is_leader():
+            logger.warning("No longer the scheduler leader; stopping reminders")
+            break
+        rows = _due_reminders(db, today, last_id, chunk_size, timezones)
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        claimed = _claim_notifications(db, [
+            {"user_id": row.user_id, "topic_id": row.topic_id, "session_id": row.id} for row in rows
+        ], "email", today)
+        rows = [row for row in rows if row.id in claimed]
+        results = get_dispatcher().send_many([
+            {
+                "to": row.email,
+                "subject": "Study Reminder",
+                "body": f"Your session (Day {row.day_index}) for '{row.title}' is due today.",
+            }
+            for row in rows
+        ])
+        _settle_notifications(
+            db,
+            [row.id for row, ok in zip(rows, results) if ok],
+            [row.id for row, ok in zip(rows, results) if not ok],
+            today,
+        )
+        sent += sum(results)
+
+    logger.info(f"Sent {sent} study reminders")
+    return sent
+
+def _due_digests(db: Session, today: date, after_user_id: int, limit: int,
+                 timezones: Optional[List[str]] = None) -> list:
+    """
+    Next chunk of users (keyset on user id) with sessions due today, each with
+    the list of those sessions aggregated in SQL.
+    """
+    stmt = select(User.id, User.email, session_list(db).label("sessions"))\
+        .select_from(SessionModel)\
+        .join(Topic, SessionModel.topic_id == Topic.id)\
+        .join(User, Topic.user_id == User.id)\
+        .where(User.id > after_user_id, *due_conditions(today, timezones))\
+        .group_by(User.id, User.email)\
+        .order_by(User.id)\
+        .limit(limit)
+    digests = []
+    for user_id, email, sessions in db.execute(stmt):
+        if isinstance(sessions, str):  # SQLite returns the JSON as text
+            sessions = json.loads(sessions)
+        sessions.sort(key=lambda s: (s["title"], s["day_index"], s["session_id"]))
+        digests.append((user_id, email, sessions))
+    return digests
+
+def send_due_digests(db: Session, chunk_size: Optional[int] = None,
+                     is_leader: Optional[Callable[[], bool]] = None,
+                     today: Optional[date] = None,
+                     timezones: Optional[List[str]] = None) -> int:
+    """
+    Email each user one digest listing all of their sessions due today.
+    Returns digests sent.
+
+    Works like send_due_notifications but chunks by user: the database groups
+    due sessions per user, each digest counts as one provider call, and every
+    session in a digest is claimed up front (one multi-row insert per chunk)
+    and settled with the digest's outcome.
+    """
+    chunk_size = chunk_size or settings.REMINDER_CHUNK_SIZE
+    today = today or date.today()
+    sent = 0
+    last_user_id = 0
+    while True:
+        if is_leader is not None and not is_leader():
+            logger.warning("No longer the scheduler leader; stopping reminder digests")
+            break
+        digests = _due_digests(db, today, last_user_id, chunk_size, timezones)
+        if not digests:
+            break
+        last_user_id = digests[-1][0]
+
+        claimed = _claim_notifications(db, [
+            {"user_id": user_id, "topic_id": s["topic_id"], "session_id": s["session_id"]}
+            for user_id, _, sessions in digests for s in sessions
+        ], "email_digest", today)
+        digests = [
+            (user_id, email, [s for s in sessions if s["session_id"] in claimed])
+            for user_id, email, sessions in digests
+        ]
+        digests = [digest for digest in digests if digest[2]]
+        results = get_dispatcher().send_many([
+            {"to": email, **render_digest(sessions)} for _, email, sessions in digests
+        ])
+        _settle_notifications(
+            db,
+            [s["session_id"] for (_, _, sessions), ok in zip(digests, results) if ok for s in sessions],
+            [s["session_id"] for (_, _, sessions), ok in zip(digests, results) if not ok for s in sessions],
+            today,
+        )
+        sent += sum(results)
+
+    logger.info(f"Sent {sent} study reminder digests")
+    return sent
+
 def start_scheduler():
     sched = BackgroundScheduler()
-    # run daily at 8 AM server time
-    sched.add_job(lambda: _run_job(), "cron", hour=8, minute=0)
+    # hourly: reminders for the users whose local time is REMINDER_LOCAL_HOUR
+    sched.add_job(lambda: _run_job(), "cron", minute=0)
+    # schedule the next adaptive session of topics that ran out, nightly
+    sched.add_job(lambda: _run_spacing(), "cron", hour=2, minute=0)
+    # prune superseded comparisons nightly, off-peak
+    sched.add_job(lambda: _run_compaction(), "cron", hour=3, minute=0)
+    if settings.REMINDER_OUTBOX:
+        # every process delivers; SKIP LOCKED claims keep workers apart
+        sched.add_job(lambda: _run_outbox_delivery(), "interval", seconds=settings.OUTBOX_POLL_SECONDS,
+                      max_instances=1, coalesce=True)
     sched.start()
 
+@contextmanager
+def _timed_job(name: str):
+    """Record the job's duration and outcome (ok/error) in scheduler_job_duration_seconds."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        metrics.SCHEDULER_JOB_SECONDS.observe(time.perf_counter() - start, job=name, outcome=outcome)
+
+def _slot_end(now: datetime, period: timedelta) -> datetime:
+    """End of the `period`-long slot (aligned to the Unix epoch) containing `now`."""
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return now - (now - epoch) % period + period
+
+def _run_exclusive(name: str, job: Callable, period: timedelta):
+    """
+    Run `job(db, lease)` only if this process wins the named scheduler lease.
+    The lease is kept until the end of the job's `period`-long slot, so each
+    slot's run happens once however late the other processes' ticks fire.
+    """
+    from app.db import SessionLocal
+    lease = Lease(name, settings.SCHEDULER_LEASE_SECONDS, SessionLocal)
+    with lease.hold(until=_slot_end(datetime.now(timezone.utc), period)) as leader:
+        if not leader:
+            logger.info(f"Skipping '{name}': another instance holds the lease")
+            return
+        db = SessionLocal()
+        try:
+            with _timed_job(name):
+                job(db, lease)
+        finally:
+            db.close()
+
+def send_reminder_slices(db: Session, now: Optional[datetime] = None,
+                         is_leader: Optional[Callable[[], bool]] = None) -> int:
+    """Send (or queue) the reminders of the timezones now at REMINDER_LOCAL_HOUR."""
+    slices = reminder_slices(db, now)
+    if not settings.REMINDER_OUTBOX:
+        fail_stale_claims(db)
+    sent = 0
+    for today, zones in slices.items():
+        logger.info(f"Reminders for {today} in {len(zones)} timezones")
+        if settings.REMINDER_OUTBOX:
+            from app.outbox import enqueue_due_reminders
+            sent += enqueue_due_reminders(db, today, timezones=zones)
+            continue
+        send = send_due_digests if settings.REMINDER_DIGEST else send_due_notifications
+        sent += send(db, is_leader=is_leader, today=today, timezones=zones)
+    return sent
+
 def _run_job():
+    _run_exclusive("reminders", lambda db, lease: send_reminder_slices(db, is_leader=lambda: not lease.lost),
+                   timedelta(hours=1))
+
+def _run_outbox_delivery():
     from app.db import SessionLocal
+    from app.outbox import drain
     db = SessionLocal()
     try:
-        send_due_notifications(db)
+        with _timed_job("outbox-delivery"):
+            drain(db)
+    except Exception as e:
+        logger.error(f"Outbox delivery failed: {e}")
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def _run_spacing():
+    _run_exclusive("adaptive-scheduling", lambda db, lease: reschedule_topics(db), timedelta(days=1))
+
+def _run_compaction():
+    def job(db, lease):
+        compact_comparisons(db)
+        if settings.REMINDER_OUTBOX:
+            from app.outbox import purge_outbox
+            purge_outbox(db)
+    _run_exclusive("comparison-compaction", job, timedelta(days=1))
@@ -1,28 +1,73 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Literal
 from datetime import date, datetime
+from app.timezones import is_valid_timezone
+
+class UserSettingsUpdate(BaseModel):
+    timezone: str
+
+    @field_validator("timezone")
+    @classmethod
+    def known_timezone(cls, value: str) -> str:
+        if not is_valid_timezone(value):
+            raise ValueError("must be an IANA timezone name, e.g. Europe/Berlin")
+        return value
+
+class UserSettingsOut(BaseModel):
+    email: Optional[str] = None
+    timezone: str
+    class Config:
+        from_attributes = True
 
 class TopicCreate(BaseModel):
     title: str
     description: str = ""
     mode: Literal["automated", "solo"]
+    compare_engine: Literal["semantic", "lexical"] = "semantic"
+
+class TopicUpdate(BaseModel):
+    compare_engine: Literal["semantic", "lexical"]
 
 class TopicOut(BaseModel):
     id: int
     title: str
     description: str
     mode: str
+    compare_engine: str = "semantic"
     class Config: 
         from_attributes = True
 
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class TopicImportOut(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+
 class SessionOut(BaseModel):
     id: int
     day_index: int
-    scheduled_for: str
+    scheduled_for: date
     status: str
     class Config: 
         from_attributes = True
 
+class DueSessionOut(BaseModel):
+    id: int
+    topic_id: int
+    topic_title: str
+    mode: str
+    day_index: int
+    scheduled_for: date
+
+class DueOut(BaseModel):
+    as_of: date  # the user's local today
+    overdue: List[DueSessionOut] = []
+    today: List[DueSessionOut] = []
+    upcoming: List[DueSessionOut] = []
+
 class SessionReschedule(BaseModel):
     scheduled_for: date
 
@@ -32,14 +77,32 @@ class NotesIn(BaseModel):
 class CompareOut(BaseModel):
     recall_score: float
     missed_points: list
+    engine: str = "semantic"  # "semantic" or "lexical"
 
 class ComparisonOut(BaseModel):
     recall_score: float
     missed_points: list
+    engine: str = "semantic"
     created_at: datetime
     class Config: 
         from_attributes = True
 
+class RecallPoint(BaseModel):
+    session_id: int
+    topic_id: int
+    day_index: int
+    recall_score: float
+    created_at: datetime
+
+class RecallBucket(BaseModel):
+    bucket: date
+    avg_recall: float
+    sessions: int
+
+class RecallHistoryOut(BaseModel):
+    points: List[RecallPoint] = Field(default_factory=list)
+    buckets: List[RecallBucket] = Field(default_factory=list)
+
 class SoloIn(BaseModel):
     percent_covered: float
     percent_remembered: float
@@ -54,3 +117,5 @@ class SoloMetricOut(BaseModel):
 class SoloTrendOut(BaseModel):
     metrics: List[SoloMetricOut]
     suggestion: str
+    count: Optional[int] = None  # all-time number of metrics
+    ewma_remembered: Optional[float] = None
@@ -0,0 +1,221 @@
+"""
+Adaptive spaced repetition: SM-2 intervals computed in batches with NumPy.
+
+New topics still start with the fixed day 1/3/7 sessions. Once a topic has
+no scheduled session left, its latest review decides the next one:
+
+- a completed session is graded from its latest comparison recall_score
+  (automated mode) or solo percent_remembered (solo mode), 0-100 mapped to
+  SM-2 quality 0-5; sessions completed without a score count as
+  SPACING_MISSING_SCORE
+- a skipped session counts as a failed review (quality 0)
+
+Each topic keeps its SM-2 state (ease, interval_days, repetitions); the
+fixed schedule counts as two successful reviews with a 4 day interval, so
+a good day-7 review leads to a ~10 day gap. Quality >= 3 grows the interval
+(1, 6, then previous interval x ease); anything lower restarts at 1 day.
+
+The nightly job works a chunk of topics at a time: one query loads the
+chunk's latest reviews and scores, the next intervals are computed for the
+whole chunk in one vectorized pass, and the new sessions are written with a
+single multi-row upsert on (topic_id, day_index), so a rerun is harmless.
+Runs nightly from the scheduler, or manually:
+
+    python -m app.spacing
+"""
+import argparse
+import logging
+from datetime import date, datetime, timezone
+from typing import Optional, Tuple
+import numpy as np
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import User, Topic, Session as SessionModel, Comparison, SoloMetric
+from app.timezones import local_today
+
+logger = logging.getLogger(__name__)
+
+MIN_EASE = 1.3
+
+def sm2(ease: np.ndarray, interval: np.ndarray, repetitions: np.ndarray,
+        quality: np.ndarray, max_interval: int = 365) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    One SM-2 step for arrays of items. Returns the new (ease, interval in
+    days, repetitions).
+    """
+    q = np.clip(np.asarray(quality, dtype=np.float64), 0, 5)
+    miss = 5 - q
+    new_ease = np.maximum(MIN_EASE, ease + 0.1 - miss * (0.08 + miss * 0.02))
+    passed = q >= 3
+    new_reps = np.where(passed, repetitions + 1, 0)
+    grown = np.rint(interval * new_ease)
+    new_interval = np.select([~passed | (new_reps == 1), new_reps == 2], [1, 6], grown)
+    return new_ease, np.clip(new_interval, 1, max_interval).astype(np.int64), new_reps
+
+def _upsert_sessions(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(SessionModel)
+    return sqlite.insert(SessionModel)  # SQLite fallback (used by the test suite)
+
+def _topic_chunk(db: Session, after_id: int, limit: int) -> list:
+    """Next chunk of topic ids (keyset) with no scheduled session left."""
+    pending = select(SessionModel.id).where(
+        SessionModel.topic_id == Topic.id,
+        SessionModel.status == "scheduled",
+    ).exists()
+    return list(db.execute(
+        select(Topic.id).where(Topic.id > after_id, ~pending).order_by(Topic.id).limit(limit)
+    ).scalars())
+
+def _latest_reviews(db: Session, topic_ids: list) -> list:
+    """
+    Each topic's latest completed or skipped session with its score, for
+    topics whose latest review hasn't been folded into their state yet.
+    """
+    ranked = select(
+        SessionModel.id, SessionModel.topic_id, SessionModel.day_index,
+        SessionModel.scheduled_for, SessionModel.status, SessionModel.completed_at,
+        func.row_number().over(
+            partition_by=SessionModel.topic_id,
+            order_by=(SessionModel.day_index.desc(), SessionModel.id.desc()),
+        ).label("rn"),
+    ).where(
+        SessionModel.topic_id.in_(topic_ids),
+        SessionModel.status.in_(["completed", "skipped"]),
+    ).subquery()
+    recall = select(Comparison.recall_score)\
+        .where(Comparison.session_id == ranked.c.id)\
+        .order_by(Comparison.created_at.desc(), Comparison.id.desc())\
+        .limit(1).scalar_subquery()
+    remembered = select(SoloMetric.percent_remembered)\
+        .where(SoloMetric.session_id == ranked.c.id)\
+        .order_by(SoloMetric.created_at.desc(), SoloMetric.id.desc())\
+        .limit(1).scalar_subquery()
+    stmt = select(
+        Topic.id.label("topic_id"), Topic.user_id, User.timezone, Topic.ease, Topic.interval_days, Topic.repetitions,
+        ranked.c.id.label("session_id"), ranked.c.day_index, ranked.c.scheduled_for,
+        ranked.c.status, ranked.c.completed_at,
+        func.coalesce(recall, remembered).label("score"),
+    ).join(ranked, ranked.c.topic_id == Topic.id)\
+        .join(User, Topic.user_id == User.id)\
+        .where(ranked.c.rn == 1, ranked.c.id != func.coalesce(Topic.reviewed_session_id, 0))\
+        .order_by(Topic.id)
+    return db.execute(stmt).all()
+
+def _aware(moment: datetime) -> datetime:
+    # SQLite (used by the test suite) returns naive UTC timestamps
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+def _plan(rows: list, today: Optional[date], now: datetime) -> dict:
+    """
+    Vectorized next step for a chunk of latest reviews. Sessions are never
+    scheduled before `today`, or else each user's local date at `now`.
+    """
+    if today is None:
+        local = {}
+        for r in rows:
+            if r.timezone not in local:
+                local[r.timezone] = local_today(r.timezone, now).toordinal()
+        earliest = np.array([local[r.timezone] for r in rows], dtype=np.int64)
+    else:
+        earliest = np.full(len(rows), today.toordinal(), dtype=np.int64)
+    score = np.array([r.score if r.score is not None else np.nan for r in rows], dtype=np.float64)
+    skipped = np.array([r.status == "skipped" for r in rows])
+    score = np.where(np.isnan(score), settings.SPACING_MISSING_SCORE, score)
+    quality = np.where(skipped, 0.0, score / 20.0)
+
+    ease, interval, reps = sm2(
+        np.array([r.ease for r in rows], dtype=np.float64),
+        np.array([r.interval_days for r in rows], dtype=np.float64),
+        np.array([r.repetitions for r in rows], dtype=np.int64),
+        quality,
+        settings.SPACING_MAX_INTERVAL_DAYS,
+    )
+
+    # Intervals count from the day of the review (the user's local date of
+    # completion, else the scheduled date); never schedule before the user's
+    # today or on/before the last session
+    scheduled = np.array([r.scheduled_for.toordinal() for r in rows], dtype=np.int64)
+    reviewed = np.array([
+        local_today(r.timezone, _aware(r.completed_at)).toordinal() if r.completed_at is not None
+        else r.scheduled_for.toordinal()
+        for r in rows
+    ], dtype=np.int64)
+    next_day = np.maximum.reduce([reviewed + interval, earliest, scheduled + 1])
+    day_index = np.array([r.day_index or 0 for r in rows], dtype=np.int64) + (next_day - scheduled)
+    return {"ease": ease, "interval": interval, "repetitions": reps,
+            "next_day": next_day, "day_index": day_index}
+
+def reschedule_topics(db: Session, today: Optional[date] = None,
+                      batch_size: Optional[int] = None) -> int:
+    """
+    Schedule the next session of every topic that has run out. Returns
+    sessions written. `today` overrides each user's local date.
+    """
+    now = datetime.now(timezone.utc)
+    batch_size = batch_size or settings.SPACING_BATCH_SIZE
+    scheduled = 0
+    last_topic_id = 0
+    while True:
+        topic_ids = _topic_chunk(db, last_topic_id, batch_size)
+        if not topic_ids:
+            break
+        last_topic_id = topic_ids[-1]
+        rows = _latest_reviews(db, topic_ids)
+        if not rows:
+            continue
+        plan = _plan(rows, today, now)
+
+        stmt = _upsert_sessions(db).values([
+            {
+                "topic_id": row.topic_id,
+                "day_index": int(plan["day_index"][i]),
+                "scheduled_for": date.fromordinal(int(plan["next_day"][i])),
+                "status": "scheduled",
+            }
+            for i, row in enumerate(rows)
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["topic_id", "day_index"],
+            set_={"scheduled_for": stmt.excluded.scheduled_for},
+            where=SessionModel.status == "scheduled",
+        ))
+        db.execute(update(Topic), [
+            {
+                "id": row.topic_id,
+                "ease": float(plan["ease"][i]),
+                "interval_days": int(plan["interval"][i]),
+                "repetitions": int(plan["repetitions"][i]),
+                "reviewed_session_id": row.session_id,
+            }
+            for i, row in enumerate(rows)
+        ])
+        db.execute(
+            update(User)
+            .where(User.id.in_({row.user_id for row in rows}))
+            .values(data_version=User.data_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        scheduled += len(rows)
+
+    logger.info(f"Scheduled {scheduled} adaptive sessions")
+    return scheduled
+
+def main():
+    parser = argparse.ArgumentParser(description="Schedule the next adaptive session of each topic")
+    parser.add_argument("--batch-size", type=int, default=None, help="topics per chunk")
+    args = parser.parse_args()
+
+    from app.db import SessionLocal
+    db = SessionLocal()
+    try:
+        print(f"Scheduled {reschedule_topics(db, batch_size=args.batch_size)} sessions")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,48 @@
+"""
+Per-user timezones (IANA names such as "Europe/Berlin", stored on users.timezone).
+
+Session dates are calendar days in the user's zone: new schedules start from
+the user's local today, and reminders go out during the REMINDER_LOCAL_HOUR
+hour of the user's local clock.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+DEFAULT_TIMEZONE = "UTC"
+
+@lru_cache(maxsize=None)
+def _zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+def is_valid_timezone(name: str) -> bool:
+    return name in available_timezones()
+
+def local_now(tz: Optional[str], now: Optional[datetime] = None) -> datetime:
+    """`now` (default: current time) on the clock of zone `tz`; unknown zones fall back to UTC."""
+    now = now or datetime.now(timezone.utc)
+    try:
+        return now.astimezone(_zone(tz or DEFAULT_TIMEZONE))
+    except (ZoneInfoNotFoundError, ValueError):
+        return now.astimezone(timezone.utc)
+
+def local_today(tz: Optional[str], now: Optional[datetime] = None) -> date:
+    """Calendar date in zone `tz`."""
+    return local_now(tz, now).date()
+
+def zones_at_hour(zones: Iterable[str], hour: int,
+                  now: Optional[datetime] = None) -> Dict[date, List[str]]:
+    """
+    The zones whose local time is within `hour` at `now`, grouped by their
+    local date (zones 24h apart, e.g. UTC-10 and UTC+14, share the hour but
+    not the date).
+    """
+    now = now or datetime.now(timezone.utc)
+    slices = defaultdict(list)
+    for name in zones:
+        local = local_now(name, now)
+        if local.hour == hour:
+            slices[local.date()].append(name)
+    return dict(slices)
@@ -0,0 +1 @@
+# Performance benchmarks for 123tracker backend
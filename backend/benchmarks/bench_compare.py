@@ -0,0 +1,48 @@
+"""
+compare_notes across note-set sizes.
+
+Each size n compares n previous points with n current points (normalized
+random 384-dim embeddings, as lists of dicts like the API builds), so the
+cost includes building the arrays from the point dicts.
+
+Usage: python -m benchmarks.bench_compare [--sizes 10,100,1000,10000] [--shortlist 32]
+"""
+import argparse
+import numpy as np
+from benchmarks.common import emit, timeit
+
+def points(n: int, dim: int, rng) -> list:
+    embeddings = rng.standard_normal((n, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return [{"id": i, "text": f"Point {i}", "embedding": e.tolist()} for i, e in enumerate(embeddings)]
+
+def run(sizes=(10, 100, 1000, 10000), dim: int = 384, shortlist: int = None,
+        repeat: int = 5, seed: int = 0) -> list:
+    from app.ai.compare import compare_notes
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for n in sizes:
+        prev, curr = points(n, dim, rng), points(n, dim, rng)
+        # Large sizes take seconds per call; fewer repeats keep the run bounded
+        stats = timeit(lambda: compare_notes(prev, curr, shortlist=shortlist), repeat if n < 5000 else min(repeat, 2))
+        results.append({
+            "case": f"compare_notes/n={n}",
+            "points": n,
+            "shortlist": shortlist,
+            **stats,
+            "points_per_s": round(n / (stats["median_ms"] / 1000), 1) if stats["median_ms"] else None,
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="comma-separated point counts")
+    parser.add_argument("--shortlist", type=int, default=None, help="use the prefilter with this shortlist")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sizes = [int(n) for n in args.sizes.split(",") if n]
+    emit("compare", run(sizes, shortlist=args.shortlist, repeat=args.repeat), vars(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Embedding throughput: one get_embedding call per text vs get_embeddings batches.
+
+By default the sentence-transformers model is replaced by StubModel, which
+hashes text into 384-dim vectors (app.ai.lexical) and sleeps a fixed
+`--overhead-ms` per forward pass, so runs are offline, fast and comparable.
+The stub only shows how much per-call overhead batching saves; use
+`--model real` (downloads thenlper/gte-small on first use) for real numbers.
+
+Usage: python -m benchmarks.bench_embeddings [--texts 256] [--batch-sizes 8,32,128] [--model stub|real]
+"""
+import argparse
+import math
+import time
+import numpy as np
+from benchmarks.common import emit, timeit
+
+class StubModel:
+    """Stand-in for SentenceTransformer.encode with a fixed cost per forward pass."""
+    def __init__(self, dim: int = 384, overhead_ms: float = 2.0):
+        self.dim = dim
+        self.overhead_ms = overhead_ms
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False):
+        from app.ai.lexical import lexical_vectors
+
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        time.sleep(self.overhead_ms * math.ceil(len(texts) / batch_size) / 1000)
+        vectors = lexical_vectors(texts, self.dim)
+        return vectors[0] if single else vectors
+
+def texts(n: int) -> list:
+    words = ["cell", "membrane", "protein", "energy", "enzyme", "nucleus", "osmosis", "gene"]
+    rng = np.random.default_rng(0)
+    return [" ".join(rng.choice(words, size=12)) + f" #{i}" for i in range(n)]
+
+def run(n_texts: int = 256, batch_sizes=(8, 32, 128), model: str = "stub",
+        overhead_ms: float = 2.0, repeat: int = 3) -> list:
+    from app.ai import embeddings
+
+    saved = embeddings._model
+    if model == "stub":
+        embeddings._model = StubModel(overhead_ms=overhead_ms)
+    try:
+        corpus = texts(n_texts)
+        embeddings.get_embedding(corpus[0])  # load the model outside the timings
+        cases = [("single", lambda: [embeddings.get_embedding(t) for t in corpus], 1)]
+        cases += [
+            (f"batch/{bs}", (lambda bs=bs: embeddings.get_embeddings(corpus, batch_size=bs)), bs)
+            for bs in batch_sizes
+        ]
+        results = []
+        for name, fn, batch_size in cases:
+            stats = timeit(fn, repeat)
+            results.append({
+                "case": f"embeddings/{name}",
+                "model": model,
+                "texts": n_texts,
+                "batch_size": batch_size,
+                **stats,
+                "texts_per_s": round(n_texts / (stats["median_ms"] / 1000), 1) if stats["median_ms"] else None,
+            })
+        return results
+    finally:
+        embeddings._model = saved
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--batch-sizes", default="8,32,128")
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--overhead-ms", type=float, default=2.0, help="stub cost per forward pass")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",") if b]
+    emit("embeddings", run(args.texts, batch_sizes, args.model, args.overhead_ms, args.repeat), vars(args))
+
+if __name__ == "__main__":
+    main()
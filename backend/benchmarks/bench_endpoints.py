@@ -0,0 +1,106 @@
+"""
+End-to-end latency of the main endpoints through FastAPI's TestClient.
+
+Runs the app in-process on an in-memory SQLite database (like the test
+suite) with authentication overridden and embeddings stubbed, and reports
+p50/p90/p99 per endpoint. Numbers include routing, validation,
+serialization and SQLite queries, but no network or Postgres.
+
+Usage: python -m benchmarks.bench_endpoints [--requests 200] [--topics 50] [--notes 20]
+"""
+import argparse
+import itertools
+import logging
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+from benchmarks.common import emit, latency_stats, sqlite_session
+
+def seed(db, topics: int, notes: int):
+    from app.models import User, Topic, Session as SessionModel, NotePoint, ModeEnum
+    from benchmarks.bench_embeddings import StubModel
+
+    model = StubModel(overhead_ms=0)
+    user = User(auth0_sub="bench|endpoints", email="bench@example.com")
+    db.add(user)
+    db.flush()
+    today = date.today()
+    topic_rows = [Topic(user_id=user.id, title=f"Topic {i}", mode=ModeEnum.automated) for i in range(topics)]
+    db.add_all(topic_rows)
+    db.flush()
+    sessions = []
+    for topic in topic_rows:
+        for offset, day_index in ((-1, 1), (0, 3), (4, 7)):
+            sessions.append(SessionModel(
+                topic_id=topic.id, day_index=day_index, scheduled_for=today + timedelta(days=offset),
+                status="completed" if day_index == 1 else "scheduled",
+            ))
+    db.add_all(sessions)
+    db.flush()
+    prev, curr = sessions[0], sessions[1]
+    texts = [f"cell membrane protein fact {i}" for i in range(notes)]
+    db.add_all([
+        NotePoint(session_id=session.id, point_text=text, embedding=model.encode(text).tolist())
+        for session in (prev, curr) for text in texts
+    ])
+    db.commit()
+    return user, topic_rows[0].id, curr.id, [s.id for s in sessions[3:] if s.day_index != 1]
+
+def run(requests: int = 200, topics: int = 50, notes: int = 20, warmup: int = 5) -> list:
+    db = sqlite_session()
+    from fastapi.testclient import TestClient
+    from app.db import get_db
+    from app.main import app, get_current_user
+    from app.ai.embeddings import embedding_breaker
+    from benchmarks.bench_embeddings import StubModel
+
+    user, topic_id, compare_session_id, note_session_ids = seed(db, topics, notes)
+    model = StubModel(overhead_ms=0)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: user
+    note_targets = itertools.cycle(note_session_ids)
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request otherwise
+
+    cases = [
+        ("GET /topics", lambda: ("GET", "/topics", None)),
+        ("GET /topics/{id}/sessions", lambda: ("GET", f"/topics/{topic_id}/sessions", None)),
+        ("GET /me/due", lambda: ("GET", "/me/due", None)),
+        ("POST /sessions/{id}/notes", lambda: (
+            "POST", f"/sessions/{next(note_targets)}/notes", {"points": ["enzyme energy point"] * 5},
+        )),
+        ("POST /sessions/{id}/compare", lambda: ("POST", f"/sessions/{compare_session_id}/compare", None)),
+        ("GET /sessions/{id}/comparison", lambda: ("GET", f"/sessions/{compare_session_id}/comparison", None)),
+    ]
+    results = []
+    try:
+        with patch("app.main.get_embeddings", lambda texts: model.encode(texts).tolist()):
+            embedding_breaker.reset()
+            client = TestClient(app)
+            for name, make in cases:
+                samples, errors = [], 0
+                for i in range(warmup + requests):
+                    method, url, body = make()
+                    start = time.perf_counter()
+                    response = client.request(method, url, json=body)
+                    elapsed = (time.perf_counter() - start) * 1000
+                    if i >= warmup:
+                        samples.append(elapsed)
+                        errors += response.status_code >= 400
+                results.append({"case": name, **latency_stats(samples), "errors": errors})
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_current_user, None)
+        embedding_breaker.reset()
+        db.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--notes", type=int, default=20, help="notes per compared session")
+    args = parser.parse_args()
+    emit("endpoints", run(args.requests, args.topics, args.notes), vars(args))
+
+if __name__ == "__main__":
+    main()
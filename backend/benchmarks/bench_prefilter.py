@@ -0,0 +1,57 @@
+"""
+Exact vs binary-quantized prefilter matching for large note sets.
+
+Builds synthetic normalized embeddings where a fraction of the previous
+points has a noisy paraphrase among the current points, then times
+compare.best_matches on the exact path and with each shortlist size, and
+reports the prefilter's recall error against the exact path.
+
+Usage: python -m benchmarks.bench_prefilter [--prev 2000] [--curr 2000] [--shortlist 8,32,128]
+"""
+import argparse
+import numpy as np
+from benchmarks.common import emit, timeit
+
+def synthetic(n_prev: int, n_curr: int, dim: int, recalled: float, noise: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+
+    def normalize(x):
+        return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+    prev = normalize(rng.standard_normal((n_prev, dim)))
+    n_para = min(int(n_prev * recalled), n_curr)
+    paraphrases = normalize(prev[:n_para] + noise * rng.standard_normal((n_para, dim)) / np.sqrt(dim))
+    others = normalize(rng.standard_normal((n_curr - n_para, dim)))
+    curr = np.concatenate([paraphrases, others])
+    return prev, curr[rng.permutation(n_curr)]
+
+def run(n_prev: int = 2000, n_curr: int = 2000, shortlists=(8, 32, 128), dim: int = 384,
+        recalled: float = 0.7, noise: float = 0.6, threshold: float = 0.80, repeat: int = 3) -> list:
+    from app.ai.compare import best_matches
+    from app.ai.quantized import recall_error
+
+    prev, curr = synthetic(n_prev, n_curr, dim, recalled, noise)
+    results = [{"mode": "exact", **timeit(lambda: best_matches(prev, curr), repeat)}]
+    for k in shortlists:
+        stats = timeit(lambda: best_matches(prev, curr, k), repeat)
+        results.append({"mode": "prefilter", **stats, **recall_error(prev, curr, k, threshold)})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prev", type=int, default=2000)
+    parser.add_argument("--curr", type=int, default=2000)
+    parser.add_argument("--shortlist", default="8,32,128", help="comma-separated shortlist sizes")
+    parser.add_argument("--noise", type=float, default=0.6, help="paraphrase noise (higher = lower similarity)")
+    parser.add_argument("--threshold", type=float, default=0.80)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    shortlists = [int(k) for k in args.shortlist.split(",") if k]
+    results = run(args.prev, args.curr, shortlists, noise=args.noise,
+                  threshold=args.threshold, repeat=args.repeat)
+    emit("prefilter", results, {
+        "prev": args.prev, "curr": args.curr, "noise": args.noise, "threshold": args.threshold,
+    })
+
+if __name__ == "__main__":
+    main()
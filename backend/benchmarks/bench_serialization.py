@@ -0,0 +1,99 @@
+"""
+Serialization cost of list/comparison responses, before and after the fast path.
+
+"orm_pydantic" mirrors FastAPI's default path: hydrate ORM objects, validate
+them through the response_model with from_attributes, run jsonable_encoder
+and encode with the standard json module. "rows_fast_json" is the
+FAST_JSON_RESPONSES path: lightweight row queries encoded by app.responses.
+
+Usage: python -m benchmarks.bench_serialization [--rows 1000] [--repeat 5]
+"""
+import argparse
+import json
+from datetime import date, timedelta
+from typing import List
+from benchmarks.common import emit, sqlite_session, timeit
+
+def seed(db, rows: int):
+    from app.models import User, Topic, Session as SessionModel, Comparison, ModeEnum
+
+    user = User(auth0_sub="bench|1", email="bench@example.com")
+    db.add(user)
+    db.flush()
+    topic = Topic(user_id=user.id, title="Bench", mode=ModeEnum.automated)
+    db.add(topic)
+    db.flush()
+    today = date.today()
+    db.add_all([
+        Topic(user_id=user.id, title=f"Topic {i}", description="desc", mode=ModeEnum.solo)
+        for i in range(rows - 1)
+    ])
+    db.add_all([
+        SessionModel(topic_id=topic.id, day_index=i, scheduled_for=today + timedelta(days=i), status="scheduled")
+        for i in range(rows)
+    ])
+    db.flush()
+    db.add(Comparison(
+        session_id=1, compared_to_session_id=2, recall_score=50.0,
+        missed_points=[{"text": f"Missed point {i}"} for i in range(50)],
+    ))
+    db.commit()
+    return user.id, topic.id
+
+def run(rows: int = 1000, repeat: int = 5) -> list:
+    db = sqlite_session()
+    user_id, topic_id = seed(db, rows)
+
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from app import crud, schemas
+    from app.models import Session as SessionModel
+    from app.responses import dumps
+
+    def before(query, adapter):
+        def fn():
+            db.expunge_all()  # measure hydration, not identity-map hits
+            validated = adapter.validate_python(query(), from_attributes=True)
+            json.dumps(jsonable_encoder(validated)).encode()
+        return fn
+
+    def after(query):
+        return lambda: dumps(query())
+
+    cases = {
+        "list_topics": (
+            lambda: crud.get_user_topics(db, user_id),
+            TypeAdapter(List[schemas.TopicOut]),
+            lambda: crud.get_user_topic_rows(db, user_id),
+        ),
+        "list_sessions": (
+            lambda: db.query(SessionModel).filter(SessionModel.topic_id == topic_id).all(),
+            TypeAdapter(List[schemas.SessionOut]),
+            lambda: crud.get_topic_session_rows(db, topic_id),
+        ),
+        "get_comparison": (
+            lambda: crud.get_latest_comparison(db, 1),
+            TypeAdapter(schemas.ComparisonOut),
+            lambda: crud.get_latest_comparison_row(db, 1),
+        ),
+    }
+
+    results = []
+    for name, (orm_query, adapter, row_query) in cases.items():
+        n = rows if name != "get_comparison" else 1
+        for mode, fn in (("orm_pydantic", before(orm_query, adapter)), ("rows_fast_json", after(row_query))):
+            stats = timeit(fn, repeat)
+            stats["per_1k_rows_ms"] = round(stats["median_ms"] * 1000 / n, 4)
+            results.append({"case": name, "mode": mode, "rows": n, **stats})
+    db.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    emit("serialization", run(args.rows, args.repeat), vars(args))
+
+if __name__ == "__main__":
+    main()
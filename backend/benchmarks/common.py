@@ -0,0 +1,101 @@
+"""Shared setup for benchmarks: an in-memory SQLite database with the app schema."""
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine, Text, TypeDecorator
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+class TextJSON(TypeDecorator):
+    """Stores JSON-serialized data in a TEXT column for SQLite (mirrors tests/conftest.py)."""
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None:
+            return json.dumps(value)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None:
+            return json.loads(value)
+        return value
+
+def stub_pgvector():
+    """Swap pgvector's Vector type for TextJSON so models work on SQLite."""
+    if "app.models" in sys.modules:
+        return
+    sys.modules["pgvector"] = MagicMock()
+    sys.modules["pgvector.sqlalchemy"] = MagicMock()
+    sys.modules["pgvector.sqlalchemy"].Vector = lambda dim: TextJSON()
+
+def sqlite_session():
+    """Create a fresh in-memory SQLite database and return a session bound to it."""
+    stub_pgvector()
+    from app.db import Base
+    import app.models  # noqa: F401 - register tables
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+def timeit(fn, repeat: int = 5) -> dict:
+    """Run fn `repeat` times and return timing stats in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "min_ms": round(min(samples), 4),
+        "max_ms": round(max(samples), 4),
+        "repeat": repeat,
+    }
+
+def latency_stats(samples_ms: list) -> dict:
+    """Percentiles (nearest-rank) of latency samples in milliseconds."""
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))], 4)
+
+    return {
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "max_ms": round(ordered[-1], 4),
+        "samples": len(ordered),
+    }
+
+def environment() -> dict:
+    """Commit and platform details stored with results, so runs can be compared."""
+    import numpy
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+def emit(name: str, results: list, params: dict = None):
+    """Print benchmark results as one JSON document on stdout."""
+    print(json.dumps({"benchmark": name, "params": params or {}, "results": results}, indent=2))
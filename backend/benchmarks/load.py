@@ -0,0 +1,183 @@
+"""
+Load driver: replays a realistic endpoint mix against a running API at a
+target request rate and reports throughput and latency percentiles.
+
+Point it at benchmarks.serve (auth stubbed) on a database filled by
+benchmarks.seed. Before the run, it reads each user's topics and sessions
+through the API (untimed). Then requests go out on a fixed schedule (open
+loop) from a pool of --concurrency threads, each as a random seeded user.
+Latency is measured from each request's scheduled start. If the server, or
+the driver's thread pool, falls behind, the queueing shows up in the
+percentiles instead of silently lowering the rate.
+
+Usage: python -m benchmarks.load [--url http://127.0.0.1:8000] [--rate 50] [--duration 30] [--users 100]
+"""
+import argparse
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from benchmarks.common import emit, latency_stats
+from benchmarks.seed import sub_for
+from benchmarks.serve import USER_HEADER
+
+# (case, weight): roughly what the frontend sends over a day
+MIX = [
+    ("GET /me/due", 30),
+    ("GET /topics", 15),
+    ("GET /topics/{id}/sessions", 15),
+    ("GET /sessions/{id}/comparison", 10),
+    ("POST /sessions/{id}/notes", 8),
+    ("GET /me/recall-history", 5),
+    ("GET /topics/{id}/solo/trend", 5),
+    ("POST /sessions/{id}/compare", 4),
+    ("POST /sessions/{id}/solo", 4),
+    ("PATCH /sessions/{id}/reschedule", 4),
+]
+FALLBACK = "GET /me/due"
+
+def discover(client, base_url: str, sub: str) -> dict:
+    """A user's request targets, read through the API."""
+    headers = {USER_HEADER: sub}
+    catalog = {"headers": headers, "topics": [], "solo_topics": [], "compared": [],
+               "open_automated": [], "completed_solo": [], "scheduled": []}
+    for topic in client.request("GET", f"{base_url}/topics", headers=headers).json():
+        catalog["topics"].append(topic["id"])
+        sessions = client.request("GET", f"{base_url}/topics/{topic['id']}/sessions", headers=headers).json()
+        sessions.sort(key=lambda s: s["day_index"])
+        completed = [s["id"] for s in sessions if s["status"] == "completed"]
+        scheduled = [s["id"] for s in sessions if s["status"] == "scheduled"]
+        catalog["scheduled"] += scheduled
+        if topic["mode"] == "solo":
+            catalog["solo_topics"].append(topic["id"])
+            catalog["completed_solo"] += completed
+        else:
+            # sessions compare against the one right before them, which needs notes
+            catalog["compared"] += [
+                curr["id"] for prev, curr in zip(sessions, sessions[1:])
+                if prev["status"] == curr["status"] == "completed"
+            ]
+            catalog["open_automated"] += scheduled
+    return catalog
+
+def _request(case: str, catalog: dict, rng: random.Random):
+    """(method, path, body) for `case` as this user, or None if they have nothing to target."""
+    def pick(key):
+        return rng.choice(catalog[key]) if catalog[key] else None
+
+    if case == "GET /me/due":
+        return "GET", "/me/due", None
+    if case == "GET /topics":
+        return "GET", "/topics", None
+    if case == "GET /me/recall-history":
+        return "GET", "/me/recall-history", None
+    target = {
+        "GET /topics/{id}/sessions": "topics",
+        "GET /sessions/{id}/comparison": "compared",
+        "POST /sessions/{id}/notes": "open_automated",
+        "GET /topics/{id}/solo/trend": "solo_topics",
+        "POST /sessions/{id}/compare": "compared",
+        "POST /sessions/{id}/solo": "completed_solo",
+        "PATCH /sessions/{id}/reschedule": "scheduled",
+    }[case]
+    target_id = pick(target)
+    if target_id is None:
+        return None
+    path = case.split(" ", 1)[1].replace("{id}", str(target_id))
+    body = None
+    if case == "POST /sessions/{id}/notes":
+        body = {"points": [f"load test point {rng.randrange(10 ** 6)}" for _ in range(5)]}
+    elif case == "POST /sessions/{id}/solo":
+        body = {"percent_covered": rng.uniform(40, 100), "percent_remembered": rng.uniform(30, 100)}
+    elif case == "PATCH /sessions/{id}/reschedule":
+        # a couple of days out, so it's in the future in every user's timezone
+        body = {"scheduled_for": (date.today() + timedelta(days=rng.randint(2, 30))).isoformat()}
+    return case.split(" ", 1)[0], path, body
+
+def plan(catalogs: list, count: int, seed: int = 0) -> list:
+    """`count` requests drawn from MIX: (case, headers, method, path, body)."""
+    rng = random.Random(seed)
+    cases, weights = zip(*MIX)
+    requests = []
+    for case in rng.choices(cases, weights, k=count):
+        for _ in range(10):  # find a user with something to target
+            catalog = rng.choice(catalogs)
+            request = _request(case, catalog, rng)
+            if request is not None:
+                break
+        else:
+            case, request = FALLBACK, _request(FALLBACK, catalog, rng)
+        requests.append((case, catalog["headers"], *request))
+    return requests
+
+def run(client, base_url: str = "", users: int = 100, rate: float = 50, duration: float = 30,
+        concurrency: int = 32, first_user: int = 0, seed: int = 0) -> list:
+    """Replay the mix at `rate` requests/s for `duration` seconds; per-case and overall results."""
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        catalogs = list(pool.map(
+            lambda n: discover(client, base_url, sub_for(n)), range(first_user, first_user + users)
+        ))
+    requests = plan(catalogs, max(1, int(rate * duration)), seed)
+
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def fire(scheduled_at: float, case: str, headers: dict, method: str, path: str, body):
+        try:
+            failed = client.request(method, f"{base_url}{path}", json=body, headers=headers).status_code >= 400
+        except Exception:
+            failed = True
+        latency = (time.perf_counter() - scheduled_at) * 1000
+        with lock:
+            samples[case].append(latency)
+            errors[case] += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, request in enumerate(requests):
+            scheduled_at = start + i / rate
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, scheduled_at, *request)
+    elapsed = time.perf_counter() - start
+
+    everything = [ms for case_samples in samples.values() for ms in case_samples]
+    results = [{
+        "case": "all",
+        "target_rps": rate,
+        "throughput_rps": round(len(everything) / elapsed, 2),
+        **latency_stats(everything),
+        "errors": sum(errors.values()),
+    }]
+    for case, _ in MIX:
+        if samples[case]:
+            results.append({"case": case, **latency_stats(samples[case]), "errors": errors[case]})
+    return results
+
+def main():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API base URL")
+    parser.add_argument("--rate", type=float, default=50, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--users", type=int, default=100, help="seeded users to act as")
+    parser.add_argument("--first-user", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight at most")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_maxsize=args.concurrency))
+    session.mount("https://", HTTPAdapter(pool_maxsize=args.concurrency))
+    results = run(session, args.url.rstrip("/"), args.users, args.rate, args.duration,
+                  args.concurrency, args.first_user, args.seed)
+    emit("load", results, vars(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Run the benchmark suite and write one JSON document of results.
+
+The document records the commit and platform next to each benchmark's
+results, so two runs can be diffed: `--baseline` compares this run with an
+earlier results file, case by case, on each case's primary timing (p50 for
+endpoints, median otherwise) and flags cases slower by more than
+`--tolerance`.
+
+Usage:
+    python -m benchmarks.run [--quick] [--only compare,embeddings,endpoints,serialization]
+                             [--output results.json] [--baseline previous.json] [--tolerance 0.10]
+"""
+import argparse
+import json
+import sys
+from benchmarks import bench_compare, bench_embeddings, bench_endpoints, bench_serialization
+from benchmarks.common import environment
+
+SUITES = {
+    "compare": lambda quick: bench_compare.run(
+        (10, 100, 1000) if quick else (10, 100, 1000, 10000), repeat=3 if quick else 5,
+    ),
+    "embeddings": lambda quick: bench_embeddings.run(64 if quick else 256, repeat=2 if quick else 3),
+    "endpoints": lambda quick: bench_endpoints.run(requests=30 if quick else 200),
+    "serialization": lambda quick: bench_serialization.run(200 if quick else 1000, repeat=3 if quick else 5),
+}
+
+def _case_key(result: dict) -> str:
+    return " ".join(str(result[k]) for k in ("case", "mode") if result.get(k) is not None)
+
+def _timing(result: dict):
+    return result.get("p50_ms", result.get("median_ms"))
+
+def diff(baseline: dict, current: dict, tolerance: float = 0.10) -> list:
+    """Per-case change in primary timing between two results documents."""
+    rows = []
+    for name, results in current["benchmarks"].items():
+        before = {_case_key(r): r for r in baseline.get("benchmarks", {}).get(name, [])}
+        for result in results:
+            old = before.get(_case_key(result))
+            if old is None or not _timing(old):
+                continue
+            change = _timing(result) / _timing(old) - 1
+            rows.append({
+                "benchmark": name,
+                "case": _case_key(result),
+                "baseline_ms": _timing(old),
+                "current_ms": _timing(result),
+                "change": round(change, 4),
+                "regression": change > tolerance,
+            })
+    return rows
+
+def run(suites=None, quick: bool = False) -> dict:
+    suites = suites or list(SUITES)
+    return {
+        "environment": environment(),
+        "quick": quick,
+        "benchmarks": {name: SUITES[name](quick) for name in suites},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast smoke run")
+    parser.add_argument("--only", default="", help=f"comma-separated subset of {','.join(SUITES)}")
+    parser.add_argument("--output", help="write results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier results file to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="slowdown counted as a regression")
+    args = parser.parse_args()
+
+    suites = [s for s in args.only.split(",") if s] or None
+    unknown = set(suites or []) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    document = run(suites, args.quick)
+    if args.baseline:
+        with open(args.baseline) as f:
+            document["diff"] = diff(json.load(f), document, args.tolerance)
+
+    output = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    regressions = [row for row in document.get("diff", []) if row["regression"]]
+    for row in regressions:
+        print(f"REGRESSION {row['benchmark']} {row['case']}: "
+              f"{row['baseline_ms']}ms -> {row['current_ms']}ms ({row['change']:+.1%})", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
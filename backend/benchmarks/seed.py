@@ -0,0 +1,189 @@
+"""
+Synthetic data for load tests: users, topics, sessions, note points,
+comparisons and solo metrics at realistic ratios.
+
+Each user gets --topics topics started at random points in the last
+--history-days days, on the day 1/3/7 schedule followed by widening
+adaptive intervals. Past sessions are completed (1 in 10 skipped, and 1 in
+10 topics left with an overdue session); each topic then has one upcoming
+session. Completed automated sessions get --notes note points with random
+unit-length 384-dim embeddings and, when the session before it was
+completed too, a comparison against that one; completed solo sessions get
+a solo metric. Rows are written with multi-row INSERTs, --batch-users
+users per transaction, and solo-trend rollups are built at the end.
+
+Users are created with auth0_sub "load|<n>" (see benchmarks.load), so
+reseeding an existing database needs a fresh --first-user.
+
+Usage: python -m benchmarks.seed --users 1000 [--topics 10] [--notes 20] [--seed 0]
+Writes to DATABASE_URL (Postgres with pgvector; run the migrations first).
+"""
+import argparse
+import logging
+import time
+from collections import Counter
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Optional
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 384
+SUB_PREFIX = "load|"
+TIMEZONES = ["UTC", "Europe/Berlin", "Europe/London", "America/New_York", "America/Los_Angeles",
+             "Asia/Kolkata", "Asia/Tokyo", "Australia/Sydney"]
+WORDS = ("cell membrane protein enzyme energy mitosis gene receptor neuron synapse atom bond "
+         "orbital entropy reaction catalyst market supply demand inflation theorem proof vector "
+         "matrix integral limit syntax grammar treaty empire river climate").split()
+
+def sub_for(n: int) -> str:
+    return f"{SUB_PREFIX}{n}"
+
+def _insert(db: Session, model, rows: list, returning=None) -> list:
+    """Multi-row INSERT; with `returning`, the new ids in row order."""
+    if not rows:
+        return []
+    if returning is None:
+        db.execute(insert(model), rows)
+        return []
+    stmt = insert(model).returning(returning, sort_by_parameter_order=True)
+    return list(db.execute(stmt, rows).scalars())
+
+def _day_indices(rng: np.random.Generator, started: date, today: date) -> list:
+    """Day indices of a topic's sessions: 1, 3, 7, then growing gaps, up to the first one after today."""
+    indices, gap = [1, 3, 7], 10
+    while started + timedelta(days=indices[-1]) <= today:
+        indices.append(indices[-1] + gap)
+        gap = int(gap * rng.uniform(1.8, 2.6))
+    while len(indices) > 1 and started + timedelta(days=indices[-2]) > today:
+        indices.pop()  # young topics: keep a single upcoming session
+    return indices
+
+def _points(rng: np.random.Generator, n: int) -> tuple:
+    """n note texts and unit-length embeddings."""
+    vectors = rng.standard_normal((n, EMBEDDING_DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    texts = [" ".join(rng.choice(WORDS, size=6)) for _ in range(n)]
+    return texts, vectors.tolist()
+
+def seed_users(db: Session, rng: np.random.Generator, first_user: int, users: int,
+               topics: int, notes: int, history_days: int, today: date) -> Counter:
+    """Insert one batch of users with their data (not committed). Returns rows per table."""
+    from app.models import (
+        User, Topic, Session as SessionModel, NotePoint, Comparison, SoloMetric, ModeEnum,
+    )
+
+    counts = Counter()
+    user_ids = _insert(db, User, [
+        {"auth0_sub": sub_for(n), "email": f"load{n}@example.com", "timezone": str(rng.choice(TIMEZONES))}
+        for n in range(first_user, first_user + users)
+    ], returning=User.id)
+
+    topic_meta = []  # (mode, started)
+    topic_rows = []
+    for user_id in user_ids:
+        for k in range(topics):
+            mode = ModeEnum.automated if rng.random() < 0.7 else ModeEnum.solo
+            topic_meta.append((mode, today - timedelta(days=int(rng.integers(0, history_days + 1)))))
+            topic_rows.append({"user_id": user_id, "title": f"Topic {k}", "description": "", "mode": mode})
+    topic_ids = _insert(db, Topic, topic_rows, returning=Topic.id)
+
+    session_meta = []  # (topic index, status)
+    session_rows = []
+    for t, (topic_id, (mode, started)) in enumerate(zip(topic_ids, topic_meta)):
+        overdue = rng.random() < 0.1
+        for day_index in _day_indices(rng, started, today):
+            scheduled_for = started + timedelta(days=day_index)
+            if scheduled_for > today or (overdue and scheduled_for < today):
+                status = "scheduled"
+            else:
+                status = "skipped" if rng.random() < 0.1 else "completed"
+            completed_at = None
+            if status == "completed":
+                completed_at = datetime.combine(scheduled_for, dtime(int(rng.integers(7, 23))), timezone.utc)
+            session_meta.append((t, status))
+            session_rows.append({"topic_id": topic_id, "day_index": day_index, "scheduled_for": scheduled_for,
+                                 "status": status, "completed_at": completed_at})
+            if status == "scheduled":
+                break
+    session_ids = _insert(db, SessionModel, session_rows, returning=SessionModel.id)
+
+    automated = [sid for sid, (t, status) in zip(session_ids, session_meta)
+                 if status == "completed" and topic_meta[t][0] == ModeEnum.automated]
+    texts, vectors = _points(rng, len(automated) * notes)
+    note_rows = [
+        {"session_id": sid, "point_text": texts[i * notes + j], "embedding": vectors[i * notes + j]}
+        for i, sid in enumerate(automated) for j in range(notes)
+    ]
+    note_ids = _insert(db, NotePoint, note_rows, returning=NotePoint.id)
+    notes_by_session = {sid: note_ids[i * notes:(i + 1) * notes] for i, sid in enumerate(automated)}
+
+    comparison_rows, solo_rows = [], []
+    previous = {}  # topic index -> id of its previous session if that was completed (has notes)
+    for sid, (t, status) in zip(session_ids, session_meta):
+        if status != "completed":
+            previous.pop(t, None)  # the app compares against the immediately preceding session
+            continue
+        if topic_meta[t][0] == ModeEnum.solo:
+            solo_rows.append({"session_id": sid, "percent_covered": float(rng.uniform(40, 100)),
+                              "percent_remembered": float(rng.uniform(30, 100))})
+        elif t in previous:
+            recall = float(rng.uniform(0.4, 1.0))
+            prev_ids = notes_by_session[previous[t]]
+            missed = rng.choice(prev_ids, size=int(round(len(prev_ids) * (1 - recall))), replace=False) \
+                if prev_ids else []
+            comparison_rows.append({
+                "session_id": sid, "compared_to_session_id": previous[t], "recall_score": recall * 100,
+                "engine": "semantic", "missed_point_ids": [int(i) for i in missed], "missed_points": None,
+            })
+        previous[t] = sid
+    _insert(db, Comparison, comparison_rows)
+    _insert(db, SoloMetric, solo_rows)
+
+    counts.update(users=len(user_ids), topics=len(topic_ids), sessions=len(session_ids),
+                  note_points=len(note_ids), comparisons=len(comparison_rows), solo_metrics=len(solo_rows))
+    return counts
+
+def seed(db: Session, users: int, topics: int = 10, notes: int = 20, history_days: int = 120,
+         batch_users: int = 100, first_user: int = 0, seed: int = 0,
+         today: Optional[date] = None) -> dict:
+    """Seed `users` users in batches; returns rows written per table."""
+    from app.rollups import backfill_solo_trends
+
+    rng = np.random.default_rng(seed)
+    today = today or date.today()
+    counts = Counter()
+    for start in range(first_user, first_user + users, batch_users):
+        size = min(batch_users, first_user + users - start)
+        counts += seed_users(db, rng, start, size, topics, notes, history_days, today)
+        db.commit()
+        logger.info(f"Seeded users {start}..{start + size - 1}")
+    counts["solo_trends"] = backfill_solo_trends(db)
+    return dict(counts)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, required=True)
+    parser.add_argument("--topics", type=int, default=10, help="topics per user")
+    parser.add_argument("--notes", type=int, default=20, help="note points per completed automated session")
+    parser.add_argument("--history-days", type=int, default=120, help="topics start up to this many days ago")
+    parser.add_argument("--batch-users", type=int, default=100, help="users per transaction")
+    parser.add_argument("--first-user", type=int, default=0, help="n of the first load|<n> user")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    from app.db import SessionLocal
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        counts = seed(db, args.users, args.topics, args.notes, args.history_days,
+                      args.batch_users, args.first_user, args.seed)
+    finally:
+        db.close()
+    print(f"Seeded {counts} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,63 @@
+"""
+The API with authentication stubbed, for local load tests.
+
+get_current_user is overridden the way tests/conftest.py does it, but per
+request: the caller acts as the user whose auth0_sub is in the X-Load-User
+header (the "load|<n>" users from benchmarks.seed). Embeddings come from
+the benchmarks' stub model unless --real-embeddings is given, so note-heavy
+traffic measures the API rather than the model. The scheduler is off.
+
+Usage: python -m benchmarks.serve [--host 127.0.0.1] [--port 8000] [--real-embeddings]
+Uses DATABASE_URL. Never expose this server: any caller can act as any user.
+"""
+import argparse
+import os
+from functools import lru_cache
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy.orm import Session
+
+USER_HEADER = "X-Load-User"
+
+@lru_cache(maxsize=1)
+def _stub_model():
+    from benchmarks.bench_embeddings import StubModel
+    return StubModel(overhead_ms=0)
+
+def stub_embeddings(texts: list) -> list:
+    return _stub_model().encode(texts).tolist()
+
+def stub_auth(app):
+    """Resolve users from the X-Load-User header instead of Auth0 tokens."""
+    from app.db import get_db
+    from app.main import get_current_user
+    from app.models import User
+
+    def load_test_user(x_load_user: str = Header(...), db: Session = Depends(get_db)) -> User:
+        user = db.query(User).filter(User.auth0_sub == x_load_user).first()
+        if user is None:
+            raise HTTPException(status_code=401, detail="Unknown load-test user")
+        return user
+
+    app.dependency_overrides[get_current_user] = load_test_user
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--real-embeddings", action="store_true", help="load the sentence-transformers model")
+    args = parser.parse_args()
+
+    # Read by app.config at import: Auth0 isn't used, and load tests shouldn't send reminders
+    os.environ.setdefault("AUTH0_DOMAIN", "load-test.invalid")
+    os.environ.setdefault("AUTH0_AUDIENCE", "load-test")
+    os.environ["ENABLE_SCHEDULER"] = "false"
+
+    import uvicorn
+    import app.main
+    stub_auth(app.main.app)
+    if not args.real_embeddings:
+        app.main.get_embeddings = stub_embeddings
+    uvicorn.run(app.main.app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import pytest
 import sys
 import json
+from contextlib import contextmanager
 from unittest.mock import MagicMock
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, Text, TypeDecorator
+from sqlalchemy import create_engine, event, Text, TypeDecorator
 from sqlalchemy.orm import sessionmaker
 
 # Create a custom type decorator for SQLite testing
@@ -109,3 +110,32 @@ def authenticated_client(test_client, mock_auth):
     """Create authenticated test client."""
     return test_client
 
+
+@pytest.fixture(scope="function")
+def assert_max_queries(test_db):
+    """
+    Fail the test if a block runs more than `limit` SQL statements:
+
+        with assert_max_queries(4):
+            client.post(f"/sessions/{session_id}/complete")
+
+    Yields the list of statements run so far.
+    """
+    @contextmanager
+    def check(limit: int):
+        statements = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = test_db.get_bind()
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        assert len(statements) <= limit, (
+            f"{len(statements)} queries, expected at most {limit}:\n" + "\n".join(statements)
+        )
+
+    return check
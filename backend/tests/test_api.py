@@ -2,7 +2,8 @@ import pytest
 from datetime import date, timedelta
 from unittest.mock import patch, MagicMock
 import numpy as np
-from app.models import Topic, Session as SessionModel, NotePoint, SoloMetric
+from app.models import Topic, Session as SessionModel, NotePoint, SoloMetric, Comparison, ComparisonState
+from app import crud
 
 def create_mock_embedding(values):
     """Create a properly-sized 384-dimension mock embedding vector."""
@@ -89,11 +90,11 @@ def test_get_topic_unauthorized(authenticated_client, test_db):
     
     assert response.status_code == 403
 
-@patch('app.main.get_embedding')
-def test_add_notes(mock_get_embedding, authenticated_client, test_db, mock_auth):
+@patch('app.main.get_embeddings')
+def test_add_notes(mock_get_embeddings, authenticated_client, test_db, mock_auth):
     """Test POST /sessions/{id}/notes adds notes with embeddings."""
     # Mock embedding function
-    mock_get_embedding.side_effect = [
+    mock_get_embeddings.return_value = [
         create_mock_embedding([1, 0, 0]),
         create_mock_embedding([0, 1, 0]),
     ]
@@ -132,8 +133,8 @@ def test_add_notes(mock_get_embedding, authenticated_client, test_db, mock_auth)
     assert notes[0].point_text == "Python is interpreted"
     assert notes[1].point_text == "Python supports OOP"
 
-@patch('app.main.get_embedding')
-def test_add_notes_too_many(mock_get_embedding, authenticated_client, test_db, mock_auth):
+@patch('app.main.get_embeddings')
+def test_add_notes_too_many(mock_get_embeddings, authenticated_client, test_db, mock_auth):
     """Test POST /sessions/{id}/notes rejects too many points."""
     # Create topic and session
     topic = Topic(user_id=mock_auth.id, title="Test Topic", mode="automated")
@@ -440,3 +441,356 @@ def test_complete_session(authenticated_client, test_db, mock_auth):
     test_db.refresh(session)
     assert session.status == "completed"
     assert session.completed_at is not None
+
+@pytest.mark.parametrize("fast_json", [True, False])
+def test_list_sessions(fast_json, authenticated_client, test_db, mock_auth, monkeypatch):
+    """Test GET /topics/{id}/sessions returns the same payload in both response modes."""
+    monkeypatch.setattr("app.main.settings.FAST_JSON_RESPONSES", fast_json)
+    response = authenticated_client.post("/topics", json={"title": "T", "mode": "solo"})
+    topic_id = response.json()["id"]
+
+    response = authenticated_client.get(f"/topics/{topic_id}/sessions")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [s["day_index"] for s in data] == [1, 3, 7]
+    assert data[0]["scheduled_for"] == (date.today() + timedelta(days=1)).isoformat()
+    assert data[0]["status"] == "scheduled"
+
+@pytest.mark.parametrize("fast_json", [True, False])
+def test_get_comparison(fast_json, authenticated_client, test_db, mock_auth, monkeypatch):
+    """Test GET /sessions/{id}/comparison returns the latest comparison in both response modes."""
+    monkeypatch.setattr("app.main.settings.FAST_JSON_RESPONSES", fast_json)
+    topic = Topic(user_id=mock_auth.id, title="Test Topic", mode="automated")
+    test_db.add(topic)
+    test_db.flush()
+    session = SessionModel(topic_id=topic.id, day_index=3, scheduled_for=date.today(), status="scheduled")
+    test_db.add(session)
+    test_db.flush()
+    test_db.add(Comparison(session_id=session.id, recall_score=50.0, missed_points=[{"text": "A"}]))
+    test_db.commit()
+
+    response = authenticated_client.get(f"/sessions/{session.id}/comparison")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["recall_score"] == 50.0
+    assert data["missed_points"] == [{"text": "A"}]
+    assert "created_at" in data
+
+def test_get_comparison_not_found(authenticated_client, test_db, mock_auth):
+    """Test GET /sessions/{id}/comparison with no comparison yet."""
+    topic = Topic(user_id=mock_auth.id, title="Test Topic", mode="automated")
+    test_db.add(topic)
+    test_db.flush()
+    session = SessionModel(topic_id=topic.id, day_index=1, scheduled_for=date.today(), status="scheduled")
+    test_db.add(session)
+    test_db.commit()
+
+    response = authenticated_client.get(f"/sessions/{session.id}/comparison")
+
+    assert response.status_code == 404
+
+def test_list_topics_etag(authenticated_client, test_db, mock_auth):
+    """Test GET /topics honours If-None-Match until the user's data changes."""
+    authenticated_client.post("/topics", json={"title": "T1", "mode": "solo"})
+
+    response = authenticated_client.get("/topics")
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+
+    response = authenticated_client.get("/topics", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # A write through crud bumps the version and invalidates the ETag
+    authenticated_client.post("/topics", json={"title": "T2", "mode": "solo"})
+    response = authenticated_client.get("/topics", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()) == 2
+
+@pytest.mark.parametrize("fast_json", [True, False])
+def test_list_sessions_etag(fast_json, authenticated_client, test_db, mock_auth, monkeypatch):
+    """Test GET /topics/{id}/sessions returns 304 for a matching ETag and changes after a session write."""
+    monkeypatch.setattr("app.main.settings.FAST_JSON_RESPONSES", fast_json)
+    topic_id = authenticated_client.post("/topics", json={"title": "T", "mode": "solo"}).json()["id"]
+
+    response = authenticated_client.get(f"/topics/{topic_id}/sessions")
+    etag = response.headers["etag"]
+
+    response = authenticated_client.get(f"/topics/{topic_id}/sessions", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    session_id = test_db.query(SessionModel).filter(SessionModel.topic_id == topic_id).first().id
+    authenticated_client.post(f"/sessions/{session_id}/skip")
+    response = authenticated_client.get(f"/topics/{topic_id}/sessions", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["status"] == "skipped"
+
+def create_compared_sessions(test_db, user_id):
+    """Create a topic with two sessions, each compared more than once."""
+    from datetime import datetime
+    topic = Topic(user_id=user_id, title="History Topic", mode="automated")
+    test_db.add(topic)
+    test_db.flush()
+    s1 = SessionModel(topic_id=topic.id, day_index=3, scheduled_for=date(2026, 3, 3), status="completed")
+    s2 = SessionModel(topic_id=topic.id, day_index=7, scheduled_for=date(2026, 3, 7), status="completed")
+    test_db.add_all([s1, s2])
+    test_db.flush()
+    test_db.add_all([
+        Comparison(session_id=s1.id, recall_score=40.0, missed_points=[], created_at=datetime(2026, 3, 3, 9)),
+        Comparison(session_id=s1.id, recall_score=60.0, missed_points=[], created_at=datetime(2026, 3, 3, 10)),
+        Comparison(session_id=s2.id, recall_score=90.0, missed_points=[], created_at=datetime(2026, 3, 7, 9)),
+        Comparison(session_id=s2.id, recall_score=80.0, missed_points=[], created_at=datetime(2026, 3, 7, 8)),
+    ])
+    test_db.commit()
+    return topic, s1, s2
+
+def test_topic_recall_history(authenticated_client, test_db, mock_auth):
+    """Test GET /topics/{id}/recall-history returns the latest comparison per session."""
+    topic, s1, s2 = create_compared_sessions(test_db, mock_auth.id)
+
+    response = authenticated_client.get(f"/topics/{topic.id}/recall-history")
+
+    assert response.status_code == 200
+    points = response.json()["points"]
+    assert [(p["session_id"], p["recall_score"]) for p in points] == [(s1.id, 60.0), (s2.id, 90.0)]
+    assert points[1]["day_index"] == 7
+
+def test_user_recall_history_bucketed(authenticated_client, test_db, mock_auth):
+    """Test GET /me/recall-history aggregates per bucket and honours date filters."""
+    create_compared_sessions(test_db, mock_auth.id)
+    # Another user's comparisons must not leak in
+    create_compared_sessions(test_db, mock_auth.id + 1)
+
+    response = authenticated_client.get("/me/recall-history?bucket=month")
+    assert response.status_code == 200
+    assert response.json()["buckets"] == [{"bucket": "2026-03-01", "avg_recall": 75.0, "sessions": 2}]
+
+    response = authenticated_client.get("/me/recall-history?bucket=week&since=2026-03-05")
+    buckets = response.json()["buckets"]
+    assert buckets == [{"bucket": "2026-03-02", "avg_recall": 90.0, "sessions": 1}]
+
+def test_recall_history_unauthorized(authenticated_client, test_db, mock_auth):
+    """Test GET /topics/{id}/recall-history rejects another user's topic."""
+    topic, _, _ = create_compared_sessions(test_db, mock_auth.id + 1)
+
+    response = authenticated_client.get(f"/topics/{topic.id}/recall-history")
+
+    assert response.status_code == 403
+
+def test_compare_stores_missed_point_ids(authenticated_client, test_db, mock_auth):
+    """Test comparisons store missed points as note_points ids and hydrate text on read."""
+    topic = Topic(user_id=mock_auth.id, title="Test Topic", mode="automated")
+    test_db.add(topic)
+    test_db.flush()
+    prev_session = SessionModel(topic_id=topic.id, day_index=1, scheduled_for=date.today(), status="completed")
+    curr_session = SessionModel(topic_id=topic.id, day_index=3, scheduled_for=date.today(), status="scheduled")
+    test_db.add_all([prev_session, curr_session])
+    test_db.flush()
+    kept = NotePoint(session_id=prev_session.id, point_text="Kept", embedding=create_mock_embedding([1, 0, 0]))
+    missed = NotePoint(session_id=prev_session.id, point_text="Missed", embedding=create_mock_embedding([0, 1, 0]))
+    test_db.add_all([
+        kept, missed,
+        NotePoint(session_id=curr_session.id, point_text="Kept again", embedding=create_mock_embedding([1, 0, 0])),
+    ])
+    test_db.commit()
+
+    response = authenticated_client.post(f"/sessions/{curr_session.id}/compare")
+
+    assert response.status_code == 200
+    assert response.json()["missed_points"] == [{"text": "Missed", "prev_point_id": missed.id}]
+    comparison = test_db.query(Comparison).filter(Comparison.session_id == curr_session.id).one()
+    assert comparison.missed_point_ids == [missed.id]
+    assert comparison.missed_points is None
+
+    for fast_json in (True, False):
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr("app.main.settings.FAST_JSON_RESPONSES", fast_json)
+            response = authenticated_client.get(f"/sessions/{curr_session.id}/comparison")
+        assert response.json()["missed_points"] == [{"text": "Missed", "prev_point_id": missed.id}]
+
+def test_compare_incremental_after_appending_notes(authenticated_client, test_db, mock_auth):
+    """Test a re-compare only scores appended notes, and recomputes when previous notes change."""
+    topic = Topic(user_id=mock_auth.id, title="Test Topic", mode="automated")
+    test_db.add(topic)
+    test_db.flush()
+    prev_session = SessionModel(topic_id=topic.id, day_index=1, scheduled_for=date.today(), status="completed")
+    curr_session = SessionModel(topic_id=topic.id, day_index=3, scheduled_for=date.today(), status="scheduled")
+    test_db.add_all([prev_session, curr_session])
+    test_db.flush()
+    test_db.add_all([
+        NotePoint(session_id=prev_session.id, point_text="A", embedding=create_mock_embedding([1, 0, 0])),
+        NotePoint(session_id=prev_session.id, point_text="B", embedding=create_mock_embedding([0, 1, 0])),
+        NotePoint(session_id=curr_session.id, point_text="A", embedding=create_mock_embedding([1, 0, 0])),
+    ])
+    test_db.commit()
+
+    assert authenticated_client.post(f"/sessions/{curr_session.id}/compare").json()["recall_score"] == 50.0
+
+    test_db.add(NotePoint(session_id=curr_session.id, point_text="B", embedding=create_mock_embedding([0, 1, 0])))
+    test_db.commit()
+    with patch("app.main.compare_notes") as full_compare:
+        response = authenticated_client.post(f"/sessions/{curr_session.id}/compare")
+    full_compare.assert_not_called()
+    assert response.json() == {"recall_score": 100.0, "missed_points": [], "engine": "semantic"}
+    state = test_db.get(ComparisonState, (curr_session.id, prev_session.id))
+    test_db.refresh(state)
+    assert len(state.curr_point_ids) == 2
+
+    # A changed previous session invalidates the stored matches
+    test_db.add(NotePoint(session_id=prev_session.id, point_text="C", embedding=create_mock_embedding([0, 0, 1])))
+    test_db.commit()
+    response = authenticated_client.post(f"/sessions/{curr_session.id}/compare")
+    assert response.json()["recall_score"] == pytest.approx(200 / 3)
+    assert [p["text"] for p in response.json()["missed_points"]] == ["C"]
+
+@patch('app.main.get_embeddings')
+def test_compare_falls_back_to_lexical_when_embeddings_fail(mock_get_embeddings, authenticated_client, test_db, mock_auth,
+                                                             monkeypatch):
+    """Test notes are stored without embeddings when the backend fails and compared lexically."""
+    from app.ai.embeddings import embedding_breaker
+    mock_get_embeddings.side_effect = RuntimeError("model unavailable")
+    monkeypatch.setattr(embedding_breaker, "failure_threshold", 2)  # one failure per notes request
+    topic = Topic(user_id=mock_auth.id, title="Test Topic", mode="automated")
+    test_db.add(topic)
+    test_db.flush()
+    prev_session = SessionModel(topic_id=topic.id, day_index=1, scheduled_for=date.today(), status="completed")
+    curr_session = SessionModel(topic_id=topic.id, day_index=3, scheduled_for=date.today(), status="scheduled")
+    test_db.add_all([prev_session, curr_session])
+    test_db.commit()
+
+    try:
+        response = authenticated_client.post(f"/sessions/{prev_session.id}/notes", json={
+            "points": ["Python is a programming language", "The French revolution began in 1789"],
+        })
+        assert response.status_code == 201
+        response = authenticated_client.post(f"/sessions/{curr_session.id}/notes", json={
+            "points": ["Python is a language for programming"],
+        })
+        assert response.status_code == 201
+        assert embedding_breaker.state == "open"
+        assert test_db.query(NotePoint).filter(NotePoint.embedding.isnot(None)).count() == 0
+
+        response = authenticated_client.post(f"/sessions/{curr_session.id}/compare")
+    finally:
+        embedding_breaker.reset()
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["engine"] == "lexical"
+    assert data["recall_score"] == 50.0
+    assert [p["text"] for p in data["missed_points"]] == ["The French revolution began in 1789"]
+    assert test_db.query(Comparison).one().engine == "lexical"
+
+@patch('app.main.get_embeddings')
+def test_topic_lexical_engine(mock_get_embeddings, authenticated_client, test_db, mock_auth):
+    """Test a topic switched to the lexical engine skips embeddings."""
+    topic = Topic(user_id=mock_auth.id, title="Test Topic", mode="automated")
+    test_db.add(topic)
+    test_db.flush()
+    session = SessionModel(topic_id=topic.id, day_index=1, scheduled_for=date.today(), status="scheduled")
+    test_db.add(session)
+    test_db.commit()
+
+    response = authenticated_client.patch(f"/topics/{topic.id}", json={"compare_engine": "lexical"})
+    assert response.status_code == 200
+    assert response.json()["compare_engine"] == "lexical"
+    assert authenticated_client.patch(f"/topics/{topic.id}", json={"compare_engine": "bogus"}).status_code == 422
+
+    response = authenticated_client.post(f"/sessions/{session.id}/notes", json={"points": ["A point"]})
+    assert response.status_code == 201
+    mock_get_embeddings.assert_not_called()
+
+def test_user_timezone_setting(authenticated_client, test_db, mock_auth):
+    """Test the timezone can be set and new schedules start from the user's local date."""
+    assert authenticated_client.get("/me/settings").json()["timezone"] == "UTC"
+    assert authenticated_client.patch("/me/settings", json={"timezone": "Mars/Olympus"}).status_code == 422
+
+    response = authenticated_client.patch("/me/settings", json={"timezone": "Pacific/Kiritimati"})
+    assert response.status_code == 200
+    assert response.json()["timezone"] == "Pacific/Kiritimati"
+
+    with patch("app.main.local_today", return_value=date(2026, 3, 1)) as mock_today:
+        topic_id = authenticated_client.post(
+            "/topics", json={"title": "Test Topic", "mode": "automated"}
+        ).json()["id"]
+    mock_today.assert_called_with("Pacific/Kiritimati")
+    dates = [s.scheduled_for for s in test_db.query(SessionModel).filter(SessionModel.topic_id == topic_id).order_by(SessionModel.day_index)]
+    assert dates == [date(2026, 3, 2), date(2026, 3, 4), date(2026, 3, 8)]
+
+@pytest.mark.parametrize("fast_json", [True, False])
+def test_due_sessions(fast_json, authenticated_client, test_db, mock_auth, monkeypatch):
+    """Test /me/due groups scheduled sessions into windows with one query."""
+    from sqlalchemy import event
+    from app.models import User
+    monkeypatch.setattr("app.main.settings.FAST_JSON_RESPONSES", fast_json)
+    today = date(2026, 5, 10)
+    topic = Topic(user_id=mock_auth.id, title="Due Topic", mode="automated")
+    other_user = User(auth0_sub="auth0|other", email="other@example.com")
+    test_db.add_all([topic, other_user])
+    test_db.flush()
+    other_topic = Topic(user_id=other_user.id, title="Other", mode="solo")
+    test_db.add(other_topic)
+    test_db.flush()
+    for day_index, offset, status in [(1, -3, "scheduled"), (2, -1, "scheduled"), (3, 0, "scheduled"),
+                                      (4, 0, "completed"), (5, 2, "scheduled"), (6, 30, "scheduled")]:
+        test_db.add(SessionModel(topic_id=topic.id, day_index=day_index,
+                                 scheduled_for=today + timedelta(days=offset), status=status))
+    test_db.add(SessionModel(topic_id=other_topic.id, day_index=1, scheduled_for=today, status="scheduled"))
+    test_db.commit()
+
+    statements = []
+    listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+    event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+    try:
+        with patch("app.main.local_today", return_value=today):
+            response = authenticated_client.get("/me/due")
+    finally:
+        event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["as_of"] == "2026-05-10"
+    assert [s["day_index"] for s in data["overdue"]] == [1, 2]
+    assert [s["day_index"] for s in data["today"]] == [3]
+    assert [s["day_index"] for s in data["upcoming"]] == [5]
+    assert data["today"][0]["topic_title"] == "Due Topic"
+    assert data["today"][0]["mode"] == "automated"
+    assert sum("JOIN sessions" in s for s in statements) == 1
+
+    with patch("app.main.local_today", return_value=today):
+        response = authenticated_client.get("/me/due?window=overdue&limit=1")
+        assert [s["day_index"] for s in response.json()["overdue"]] == [1]
+        assert response.json()["today"] == []
+        etag = response.headers["etag"]
+        assert authenticated_client.get(
+            "/me/due?window=overdue&limit=1", headers={"If-None-Match": etag}
+        ).status_code == 304
+        assert authenticated_client.get("/me/due?limit=0").status_code == 422
+
+def test_due_sessions_plan_starts_from_users_topics(test_db, mock_auth):
+    """Test each /me/due branch looks up the user's topics, then their sessions by topic and date."""
+    from sqlalchemy import event
+    test_db.add(Topic(user_id=mock_auth.id, title="Due Topic", mode="automated"))
+    test_db.commit()
+    statements = []
+    listener = lambda conn, cursor, stmt, params, *args: statements.append((stmt, params))
+    event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+    try:
+        crud.get_due_sessions(test_db, mock_auth.id, date(2026, 5, 10))
+    finally:
+        event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+
+    stmt, params = statements[-1]
+    plan = [row[3] for row in test_db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + stmt, params)]
+    searches = [step for step in plan if step.startswith(("SEARCH", "SCAN sessions", "SCAN topics"))]
+    assert searches == [
+        "SEARCH topics USING INDEX ix_topics_user_id (user_id=?)",
+        "SEARCH sessions USING INDEX ix_sessions_topic_due (topic_id=? AND scheduled_for<?)",
+        "SEARCH topics USING INDEX ix_topics_user_id (user_id=?)",
+        "SEARCH sessions USING INDEX ix_sessions_topic_due (topic_id=? AND scheduled_for=?)",
+        "SEARCH topics USING INDEX ix_topics_user_id (user_id=?)",
+        "SEARCH sessions USING INDEX ix_sessions_topic_due (topic_id=? AND scheduled_for>? AND scheduled_for<?)",
+    ]
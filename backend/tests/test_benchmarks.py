@@ -0,0 +1,36 @@
+import json
+from benchmarks import bench_compare, bench_embeddings, bench_endpoints
+from benchmarks.run import diff
+
+def test_benchmarks_smoke():
+    """Test the benchmark suite runs at tiny sizes and its results can be diffed."""
+    document = {"benchmarks": {
+        "compare": bench_compare.run((10,), repeat=1),
+        "embeddings": bench_embeddings.run(8, (4,), overhead_ms=0, repeat=1),
+        "endpoints": bench_endpoints.run(requests=2, topics=2, notes=2, warmup=0),
+    }}
+    json.dumps(document)
+    assert [r["case"] for r in document["benchmarks"]["embeddings"]] == ["embeddings/single", "embeddings/batch/4"]
+    assert all(r["errors"] == 0 for r in document["benchmarks"]["endpoints"])
+
+    rows = diff(document, document)
+    assert len(rows) == 9
+    assert not any(row["regression"] for row in rows)
+
+def test_seed_and_load_smoke(test_client, test_db, monkeypatch):
+    """Test seeded users can be driven through the stubbed-auth app by the load driver."""
+    from benchmarks import load, seed, serve
+    from app.main import app
+
+    counts = seed.seed(test_db, users=3, topics=4, notes=3, batch_users=2, seed=1)
+    assert counts["users"] == 3 and counts["topics"] == 12
+    assert counts["note_points"] > 0 and counts["comparisons"] > 0
+
+    serve.stub_auth(app)
+    monkeypatch.setattr("app.main.get_embeddings", serve.stub_embeddings)
+    results = load.run(test_client, users=3, rate=200, duration=0.2, concurrency=1)
+
+    assert results[0]["case"] == "all"
+    assert results[0]["samples"] == 40
+    assert results[0]["errors"] == 0
+    assert sum(r["samples"] for r in results[1:]) == 40
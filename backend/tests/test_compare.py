@@ -1,6 +1,7 @@
 import pytest
 import numpy as np
-from app.ai.compare import compare_notes
+from app.ai.compare import compare_notes, compare_notes_incremental, points_fingerprint
+from app.ai.quantized import hamming, pack_signs, recall_error
 
 def create_mock_embedding(values):
     """Create a normalized mock embedding vector."""
@@ -134,3 +135,91 @@ def test_missing_embedding_key():
     
     with pytest.raises(ValueError, match="missing required key"):
         compare_notes(prev_points, curr_points)
+
+def test_missed_points_carry_ids():
+    """Test missed points include prev_point_id when previous points have ids."""
+    prev_points = [
+        {"id": 7, "text": "Point 1", "embedding": create_mock_embedding([1, 0, 0])},
+        {"id": 8, "text": "Point 2", "embedding": create_mock_embedding([0, 1, 0])},
+    ]
+    curr_points = [
+        {"text": "Point 1", "embedding": create_mock_embedding([1, 0, 0])},
+    ]
+
+    result = compare_notes(prev_points, curr_points)
+
+    assert result["missed_points"] == [{"text": "Point 2", "prev_point_id": 8}]
+
+def test_incremental_matches_full_comparison():
+    """Test folding in appended points gives the same result as a full comparison."""
+    prev_points = [
+        {"id": 1, "text": "Point 1", "embedding": create_mock_embedding([1, 0, 0])},
+        {"id": 2, "text": "Point 2", "embedding": create_mock_embedding([0, 1, 0])},
+        {"id": 3, "text": "Point 3", "embedding": create_mock_embedding([0, 0, 1])},
+    ]
+    first = [{"id": 10, "text": "Point 1", "embedding": create_mock_embedding([1, 0.1, 0])}]
+    appended = [{"id": 11, "text": "Point 2", "embedding": create_mock_embedding([0, 1, 0.1])}]
+
+    seed = compare_notes(prev_points, first, include_matches=True)
+    best_ids = [first[i]["id"] for i in seed["best_match_indices"]]
+    result = compare_notes_incremental(prev_points, appended, seed["best_similarities"], best_ids)
+    full = compare_notes(prev_points, first + appended)
+
+    assert result["recall_score"] == pytest.approx(full["recall_score"])
+    assert result["missed_points"] == full["missed_points"] == [{"text": "Point 3", "prev_point_id": 3}]
+    assert result["best_match_ids"][:2] == [10, 11]
+
+def test_points_fingerprint_tracks_changes():
+    """Test the fingerprint changes when a point is added or re-embedded."""
+    points = [{"id": 1, "text": "Point 1", "embedding": create_mock_embedding([1, 0, 0])}]
+    fingerprint = points_fingerprint(points)
+
+    assert points_fingerprint([dict(points[0])]) == fingerprint
+    assert points_fingerprint(points + [{"id": 2, "embedding": create_mock_embedding([0, 1, 0])}]) != fingerprint
+    assert points_fingerprint([{**points[0], "embedding": create_mock_embedding([0, 1, 0])}]) != fingerprint
+
+def test_pack_signs_hamming():
+    """Test sign-bit codes give the number of differing signs as Hamming distance."""
+    a = np.array([[1.0, -1.0, 1.0] + [1.0] * 67])
+    b = np.array([[-1.0, -1.0, -1.0] + [1.0] * 67])
+    codes_a, codes_b = pack_signs(a), pack_signs(b)
+
+    assert codes_a.dtype == np.uint64 and codes_a.shape == (1, 2)
+    assert hamming(codes_a, codes_b).tolist() == [[2]]
+
+def test_prefiltered_matches_agree_with_exact():
+    """Test the prefilter finds the exact best matches for paraphrased points."""
+    rng = np.random.default_rng(0)
+    prev = rng.standard_normal((50, 384))
+    prev /= np.linalg.norm(prev, axis=1, keepdims=True)
+    curr = np.concatenate([prev + 0.02 * rng.standard_normal(prev.shape), rng.standard_normal((150, 384))])
+    curr /= np.linalg.norm(curr, axis=1, keepdims=True)
+    prev_points = [{"id": i, "text": str(i), "embedding": e} for i, e in enumerate(prev)]
+    curr_points = [{"text": str(i), "embedding": e} for i, e in enumerate(curr)]
+
+    exact = compare_notes(prev_points, curr_points, include_matches=True)
+    approx = compare_notes(prev_points, curr_points, include_matches=True, shortlist=8)
+
+    assert approx["best_match_indices"] == exact["best_match_indices"] == list(range(50))
+    assert approx["recall_score"] == exact["recall_score"] == 100.0
+    error = recall_error(prev, curr, shortlist=8)
+    assert error["decision_mismatches"] == 0
+    assert error["max_similarity_gap"] == pytest.approx(0.0, abs=1e-5)
+
+def test_prefiltered_chunks_bound_candidate_memory(monkeypatch):
+    """Test prefilter chunks are sized by the gathered candidate block, not just the XOR buffer."""
+    from app.ai import quantized
+
+    rng = np.random.default_rng(0)
+    prev = rng.standard_normal((40, 64)).astype(np.float32)
+    curr = rng.standard_normal((50, 64)).astype(np.float32)
+    monkeypatch.setattr(quantized, "_CHUNK_BYTES", 10 * 32 * 64 * 4)  # 10 rows of 32 candidates
+    gathered = []
+    einsum = np.einsum
+    monkeypatch.setattr(quantized.np, "einsum", lambda spec, a, b: gathered.append(a.nbytes) or einsum(spec, a, b))
+
+    sims, idx = quantized.best_matches_prefiltered(prev, curr, shortlist=32)
+
+    assert max(gathered) <= quantized._CHUNK_BYTES
+    assert len(gathered) == 4
+    assert sims.shape == idx.shape == (40,)
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+from app import crud, db as db_module
+from app.models import Topic, User
+from app.responses import user_etag
+
+@pytest.fixture
+def replica(test_db, monkeypatch):
+    """Route reads to a 'replica' bound to the test database engine."""
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+    monkeypatch.setattr(db_module, "ReplicaSessionLocals", [factory])
+    return factory
+
+def test_no_replicas_uses_primary(monkeypatch, mock_auth):
+    """Test reads stay on the primary when no replicas are configured."""
+    monkeypatch.setattr(db_module, "ReplicaSessionLocals", [])
+
+    assert db_module.replica_session_for(mock_auth) is None
+
+def test_reads_routed_to_replica(replica, mock_auth):
+    """Test reads go to a replica for users without recent writes."""
+    session = db_module.replica_session_for(mock_auth)
+    try:
+        assert session is not None
+    finally:
+        session.close()
+
+def test_read_your_writes_pins_to_primary(replica, test_db, mock_auth, monkeypatch):
+    """Test a user's write keeps their reads on the primary for the window, in every worker."""
+    other_user = User(auth0_sub="auth0|other", email="other@example.com")
+    test_db.add(other_user)
+    test_db.commit()
+    crud.create_topic(test_db, mock_auth.id, "New", "", "solo")
+
+    # Another worker loads the user afresh from the primary
+    worker = replica()
+    try:
+        assert db_module.replica_session_for(worker.get(User, mock_auth.id)) is None
+        # Other users are unaffected
+        other = db_module.replica_session_for(worker.get(User, other_user.id))
+        assert other is not None
+        other.close()
+
+        monkeypatch.setattr(db_module.settings, "REPLICA_READ_YOUR_WRITES_SECONDS", 0)
+        replica_session = db_module.replica_session_for(worker.get(User, mock_auth.id))
+        assert replica_session is not None
+        replica_session.close()
+    finally:
+        worker.close()
+
+def test_read_only_commit_does_not_pin(replica, test_db, mock_auth):
+    """Test commits without writes do not pin the user to the primary."""
+    test_db.query(Topic).all()
+    test_db.commit()
+
+    session = db_module.replica_session_for(test_db.get(User, mock_auth.id))
+    assert session is not None
+    session.close()
+
+def test_list_topics_reads_from_replica(authenticated_client, replica, test_db, mock_auth):
+    """Test GET /topics is served through the replica session."""
+    test_db.add(Topic(user_id=mock_auth.id, title="Replicated", mode="solo"))
+    test_db.commit()
+
+    response = authenticated_client.get("/topics")
+
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["Replicated"]
+
+def test_db_health_reports_pools(test_client):
+    """Test GET /health/db reports pool stats per engine."""
+    response = test_client.get("/health/db")
+
+    assert response.status_code == 200
+    pools = response.json()["pools"]
+    assert "primary" in pools
+    assert "checkedout" in pools["primary"]
+
+def test_replica_etag_uses_replica_data_version(authenticated_client, replica, test_db, mock_auth):
+    """Test a response served by a replica is tagged with the data_version that replica has."""
+    test_db.execute(update(User).where(User.id == mock_auth.id).values(data_version=7)
+                    .execution_options(synchronize_session=False))
+    test_db.commit()
+    mock_auth.data_version = 9  # the primary has moved on; the replica hasn't caught up
+
+    response = authenticated_client.get("/topics")
+
+    assert response.headers["ETag"] == user_etag(mock_auth.id, 7)
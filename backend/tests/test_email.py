@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from urllib3.exceptions import ProtocolError
+from app import email
+from app.email import EmailDispatcher, TokenBucket
+
+class StubProvider:
+    """Local HTTP server standing in for the SendGrid API."""
+    def __init__(self, responses=()):
+        self.requests = []
+        self.responses = list(responses)  # (status, headers) served before falling back to 202
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with stub.lock:
+                    stub.requests.append({
+                        "path": self.path,
+                        "auth": self.headers.get("Authorization"),
+                        "body": json.loads(body),
+                        "port": self.client_address[1],
+                    })
+                    status, headers = stub.responses.pop(0) if stub.responses else (202, {})
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def provider(monkeypatch):
+    stub = StubProvider()
+    monkeypatch.setattr(email.settings, "SENDGRID_API_KEY", "test-key")
+    monkeypatch.setattr(email.settings, "SENDGRID_API_HOST", stub.url)
+    monkeypatch.setattr(email, "_http", None)
+    yield stub
+    stub.close()
+
+def messages(n):
+    return [{"to": f"user{i}@example.com", "subject": "Study Reminder", "body": f"Session {i}"} for i in range(n)]
+
+def test_dispatcher_sends_all_over_reused_connections(provider):
+    """Test every message reaches the provider over a small set of pooled connections."""
+    dispatcher = EmailDispatcher(max_workers=4, rate_per_second=0, burst=1, max_retries=0, backoff_seconds=0)
+
+    results = dispatcher.send_many(messages(20))
+
+    assert results == [True] * 20
+    assert len(provider.requests) == 20
+    assert {r["path"] for r in provider.requests} == {"/v3/mail/send"}
+    assert {r["auth"] for r in provider.requests} == {"Bearer test-key"}
+    recipients = {r["body"]["personalizations"][0]["to"][0]["email"] for r in provider.requests}
+    assert recipients == {f"user{i}@example.com" for i in range(20)}
+    assert len({r["port"] for r in provider.requests}) <= 4  # keep-alive, one connection per worker
+
+def test_dispatcher_retries_retryable_failures(provider):
+    """Test 429/5xx responses are retried (honoring Retry-After) and 4xx are not."""
+    provider.responses = [(429, {"Retry-After": "0"}), (503, {})]
+    dispatcher = EmailDispatcher(max_workers=1, rate_per_second=0, burst=1, max_retries=3, backoff_seconds=0.01)
+
+    assert dispatcher.send_many(messages(1)) == [True]
+    assert len(provider.requests) == 3
+    provider.responses = [(400, {})]
+    assert dispatcher.send_many(messages(1)) == [False]
+    assert len(provider.requests) == 4
+
+def test_dispatcher_gives_up_after_max_retries(provider):
+    """Test a persistently failing provider is tried max_retries + 1 times."""
+    provider.responses = [(500, {})] * 10
+    dispatcher = EmailDispatcher(max_workers=1, rate_per_second=0, burst=1, max_retries=2, backoff_seconds=0.001)
+
+    assert dispatcher.send_many(messages(1)) == [False]
+    assert len(provider.requests) == 3
+
+def test_dispatcher_caps_retry_after(provider, monkeypatch):
+    """Test a long Retry-After is clamped to max_backoff_seconds."""
+    sleeps = []
+    monkeypatch.setattr(email.time, "sleep", sleeps.append)
+    provider.responses = [(429, {"Retry-After": "3600"})]
+    dispatcher = EmailDispatcher(max_workers=1, rate_per_second=0, burst=1, max_retries=1, backoff_seconds=0,
+                                 max_backoff_seconds=5)
+
+    assert dispatcher.send_many(messages(1)) == [True]
+    assert sleeps == [5]
+
+@pytest.mark.parametrize("error, retried", [
+    (requests.ConnectTimeout("connect timed out"), True),
+    (requests.ConnectionError("connection refused"), True),
+    (requests.ReadTimeout("read timed out"), False),
+    (requests.ConnectionError(ProtocolError("Connection aborted.")), False),
+])
+def test_dispatcher_retries_only_sends_that_never_reached_provider(provider, monkeypatch, error, retried):
+    """Test read timeouts and dropped connections aren't retried, since the email may have been accepted."""
+    calls = []
+
+    def post(*args, **kwargs):
+        calls.append(1)
+        raise error
+
+    monkeypatch.setattr(email._http_session(), "post", post)
+    dispatcher = EmailDispatcher(max_workers=1, rate_per_second=0, burst=1, max_retries=2, backoff_seconds=0)
+
+    assert dispatcher.send_many(messages(1)) == [False]
+    assert len(calls) == (3 if retried else 1)
+
+def test_token_bucket_limits_rate():
+    """Test the bucket allows a burst and then paces acquisitions at the configured rate."""
+    bucket = TokenBucket(rate=50, capacity=5)
+    start = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+
+    # 5 from the burst, 10 more at 50/s
+    assert 0.18 <= elapsed < 1.0
@@ -0,0 +1,53 @@
+import json
+from datetime import date
+from app.export import export_user_history
+from app.models import Topic, Session as SessionModel, NotePoint, Comparison, SoloMetric
+
+def create_history(test_db, user_id):
+    """Create one topic with a session, a note, a comparison and a solo metric."""
+    topic = Topic(user_id=user_id, title="Export Topic", mode="automated", compare_engine="lexical",
+                  ease=2.2, interval_days=9, repetitions=3)
+    test_db.add(topic)
+    test_db.flush()
+    session = SessionModel(topic_id=topic.id, day_index=1, scheduled_for=date(2026, 1, 2), status="completed")
+    test_db.add(session)
+    test_db.flush()
+    test_db.add_all([
+        NotePoint(session_id=session.id, point_text="A note", embedding=[0.5] * 384),
+        Comparison(session_id=session.id, recall_score=80.0, engine="lexical", missed_points=[{"text": "x"}]),
+        SoloMetric(session_id=session.id, percent_covered=50.0, percent_remembered=40.0),
+    ])
+    test_db.commit()
+    return topic
+
+def test_export_endpoint_streams_ndjson(authenticated_client, test_db, mock_auth):
+    """Test GET /me/export streams every record type without embeddings by default."""
+    create_history(test_db, mock_auth.id)
+    create_history(test_db, mock_auth.id + 1)  # another user's data must not be exported
+
+    response = authenticated_client.get("/me/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["type"] for r in records] == ["user", "topic", "session", "note_point", "comparison", "solo_metric"]
+    assert records[1]["title"] == "Export Topic"
+    assert records[1]["mode"] == "automated"
+    assert records[1]["compare_engine"] == "lexical"
+    assert (records[1]["ease"], records[1]["interval_days"], records[1]["repetitions"]) == (2.2, 9, 3)
+    assert records[2]["scheduled_for"] == "2026-01-02"
+    assert "embedding" not in records[3]
+    assert records[4]["engine"] == "lexical"
+
+def test_export_with_embeddings(test_db, mock_auth):
+    """Test embeddings are included when requested."""
+    create_history(test_db, mock_auth.id)
+
+    lines = list(export_user_history(test_db, mock_auth.id, include_embeddings=True, batch_size=1))
+
+    note = next(json.loads(l) for l in lines if json.loads(l)["type"] == "note_point")
+    assert len(note["embedding"]) == 384
+
+def test_export_unknown_user(test_db):
+    """Test exporting a missing user yields nothing."""
+    assert list(export_user_history(test_db, 12345)) == []
@@ -0,0 +1,182 @@
+import json
+import pytest
+from app.importer import LineTooLong, TopicRowParser
+from app.models import Topic, Session as SessionModel
+
+def parse_all(fmt, chunks):
+    """Feed byte chunks through the parser and collect every parsed row."""
+    parser = TopicRowParser(fmt)
+    rows = []
+    for chunk in chunks:
+        rows.extend(parser.feed(chunk))
+    rows.extend(parser.close())
+    return rows
+
+def test_parser_csv_rows_split_across_chunks():
+    """Test CSV rows are parsed even when chunk boundaries split lines."""
+    data = b'title,description,mode\nAlgebra,Basics,solo\n"Calculus, I","Limits\nand series",automated\n'
+    chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+
+    rows = parse_all("csv", chunks)
+
+    assert [r[2] for r in rows] == [None, None]
+    assert rows[0][1] == {"title": "Algebra", "description": "Basics", "mode": "solo", "compare_engine": "semantic"}
+    assert rows[1][0] == 3
+    assert rows[1][1]["title"] == "Calculus, I"
+    assert rows[1][1]["description"] == "Limits\nand series"
+
+def test_parser_ndjson_reports_bad_rows():
+    """Test NDJSON parsing reports invalid lines with their line numbers."""
+    lines = [
+        json.dumps({"title": "Ok", "mode": "solo"}),
+        "{not json",
+        json.dumps({"title": "Bad mode", "mode": "weekly"}),
+        json.dumps(["not", "an", "object"]),
+        "",
+        json.dumps({"title": "Last", "mode": "automated"}),
+    ]
+    rows = parse_all("ndjson", ["\n".join(lines).encode()])
+
+    assert [r[0] for r in rows] == [1, 2, 3, 4, 6]
+    assert rows[0][1]["title"] == "Ok"
+    assert "Invalid JSON" in rows[1][2]
+    assert rows[2][2].startswith("mode")
+    assert rows[3][2] == "Expected a JSON object"
+    assert rows[4][1]["title"] == "Last"
+
+def test_parser_csv_bare_quote_in_unquoted_field():
+    """Test a literal quote inside an unquoted CSV field doesn't swallow later rows."""
+    data = b'title,description,mode\n12" ruler,measuring,solo\nAlgebra,"say ""hi""",solo\nLast,,automated\n'
+
+    rows = parse_all("csv", [data])
+
+    assert [(r[0], r[2]) for r in rows] == [(2, None), (3, None), (4, None)]
+    assert rows[0][1]["title"] == '12" ruler'
+    assert rows[1][1]["description"] == 'say "hi"'
+
+def test_parser_csv_unterminated_quote_is_bounded(monkeypatch):
+    """Test a quoted field that never closes is reported once it exceeds MAX_RECORD_CHARS."""
+    monkeypatch.setattr("app.importer.MAX_RECORD_CHARS", 50)
+    data = b'title,description,mode\nA,"open,solo\n' + b"filler text\n" * 10 + b"B,,solo\n"
+
+    rows = parse_all("csv", [data])
+
+    assert rows[0][0] == 2 and "longer than 50" in rows[0][2]
+    assert rows[-1][1]["title"] == "B"
+
+def test_parser_rejects_overlong_line(monkeypatch):
+    """Test a line still without a newline past MAX_RECORD_CHARS stops the parse."""
+    monkeypatch.setattr("app.importer.MAX_RECORD_CHARS", 50)
+    parser = TopicRowParser("ndjson")
+
+    assert len(list(parser.feed(b'{"title": "A", "mode": "solo"}\n{"title": "'))) == 1
+    with pytest.raises(LineTooLong, match="Line 2"):
+        list(parser.feed(b"x" * 60))
+
+def test_parser_rejects_nul_characters():
+    """Test fields containing NUL are reported as row errors."""
+    rows = parse_all("ndjson", [b'{"title": "A\\u0000B", "mode": "solo"}\n{"title": "C", "mode": "solo"}\n'])
+
+    assert rows[0] == (1, None, "title: must not contain NUL characters")
+    assert rows[1][1]["title"] == "C"
+
+def test_import_csv(authenticated_client, test_db, mock_auth):
+    """Test POST /topics/import creates topics and their day 1/3/7 sessions."""
+    body = "title,description,mode\nTopic A,,automated\nTopic B,desc,solo\n,,solo\n"
+
+    response = authenticated_client.post(
+        "/topics/import", content=body.encode(), headers={"Content-Type": "text/csv"}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["imported"] == 2
+    assert data["failed"] == 1
+    assert data["errors"][0]["line"] == 4
+
+    topics = test_db.query(Topic).filter(Topic.user_id == mock_auth.id).order_by(Topic.id).all()
+    assert [t.title for t in topics] == ["Topic A", "Topic B"]
+    for topic in topics:
+        sessions = test_db.query(SessionModel).filter(SessionModel.topic_id == topic.id).all()
+        assert sorted(s.day_index for s in sessions) == [1, 3, 7]
+
+def test_import_ndjson_in_chunks(authenticated_client, test_db, mock_auth):
+    """Test NDJSON import inserts across several batches."""
+    body = "\n".join(json.dumps({"title": f"T{i}", "mode": "solo"}) for i in range(5))
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.importer.settings.IMPORT_CHUNK_SIZE", 2)
+        response = authenticated_client.post(
+            "/topics/import",
+            content=body.encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {"imported": 5, "failed": 0, "errors": []}
+    assert test_db.query(SessionModel).count() == 15
+
+def test_import_reports_only_rows_the_database_rejects(authenticated_client, test_db, mock_auth, monkeypatch):
+    """Test a rejected batch is retried in halves so only the failing row is reported."""
+    from sqlalchemy.exc import IntegrityError
+    from app import crud
+
+    real_bulk_create = crud.bulk_create_topics
+
+    def bulk_create(db, user_id, rows, today=None):
+        if any(row["title"] == "T2" for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("rejected"))
+        return real_bulk_create(db, user_id, rows, today)
+
+    monkeypatch.setattr("app.importer.crud.bulk_create_topics", bulk_create)
+    monkeypatch.setattr("app.importer.settings.IMPORT_CHUNK_SIZE", 4)
+    body = "\n".join(json.dumps({"title": f"T{i}", "mode": "solo"}) for i in range(5))
+
+    response = authenticated_client.post(
+        "/topics/import", content=body.encode(), headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.json() == {
+        "imported": 4, "failed": 1, "errors": [{"line": 3, "error": "Database error while inserting row"}],
+    }
+    titles = [t.title for t in test_db.query(Topic).order_by(Topic.id)]
+    assert sorted(titles) == ["T0", "T1", "T3", "T4"]
+
+def test_import_unsupported_content_type(authenticated_client):
+    """Test POST /topics/import rejects unknown content types."""
+    response = authenticated_client.post(
+        "/topics/import", content=b"{}", headers={"Content-Type": "application/json"}
+    )
+
+    assert response.status_code == 415
+
+def test_import_rejects_overlong_line(authenticated_client, test_db, monkeypatch):
+    """Test an upload with a line longer than MAX_RECORD_CHARS is rejected with 413."""
+    monkeypatch.setattr("app.importer.MAX_RECORD_CHARS", 50)
+    body = json.dumps({"title": "T" * 100, "mode": "solo"}).encode()
+
+    response = authenticated_client.post(
+        "/topics/import", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 413
+    assert test_db.query(Topic).count() == 0
+
+def test_import_aborts_when_database_is_unavailable(authenticated_client, monkeypatch):
+    """Test connection errors abort the import instead of bisecting the batch."""
+    from sqlalchemy.exc import OperationalError
+    calls = []
+
+    def bulk_create(db, user_id, rows, today=None):
+        calls.append(len(rows))
+        raise OperationalError("INSERT", {}, Exception("server closed the connection"))
+
+    monkeypatch.setattr("app.importer.crud.bulk_create_topics", bulk_create)
+    body = "\n".join(json.dumps({"title": f"T{i}", "mode": "solo"}) for i in range(4))
+
+    response = authenticated_client.post(
+        "/topics/import", content=body.encode(), headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 503
+    assert calls == [4]
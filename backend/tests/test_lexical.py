@@ -0,0 +1,59 @@
+import time
+import pytest
+import numpy as np
+from app.ai.lexical import lexical_vectors
+from app.ai.embeddings import CircuitBreaker, CircuitOpenError
+
+def test_lexical_similarity_ranks_paraphrases_above_unrelated():
+    """Test lexical vectors score paraphrases high and unrelated points near zero."""
+    vectors = lexical_vectors([
+        "Python is a programming language",
+        "Python is a language for programming",
+        "The French revolution began in 1789",
+    ])
+
+    assert np.linalg.norm(vectors, axis=1) == pytest.approx([1.0, 1.0, 1.0])
+    assert vectors[0] @ vectors[1] > 0.8
+    assert abs(vectors[0] @ vectors[2]) < 0.2
+
+def test_lexical_vectors_are_independent_of_batch():
+    """Test a point's vector doesn't depend on the other texts it is computed with."""
+    alone = lexical_vectors(["Recursion calls itself"])
+    batched = lexical_vectors(["Something else entirely", "Recursion calls itself"])
+
+    assert np.array_equal(alone[0], batched[1])
+    assert not lexical_vectors([""]).any()
+
+def test_circuit_breaker_opens_and_recovers():
+    """Test the breaker opens after repeated failures and closes after a successful trial."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05, slow_seconds=10)
+
+    def fail():
+        raise RuntimeError("backend down")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+def test_circuit_breaker_counts_slow_calls():
+    """Test calls slower than slow_seconds count as failures."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60, slow_seconds=0)
+
+    assert breaker.call(lambda: time.sleep(0.001) or "ok") == "ok"
+    assert breaker.state == "open"
+
+def test_circuit_breaker_times_out_hung_calls():
+    """Test a call exceeding timeout_seconds raises TimeoutError and counts as a failure."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60, slow_seconds=10, timeout_seconds=0.05)
+
+    with pytest.raises(TimeoutError):
+        breaker.call(lambda: time.sleep(0.5))
+    assert breaker.state == "open"
@@ -0,0 +1,36 @@
+from app import metrics
+from app.ai.compare import compare_notes
+
+def test_histogram_exposition():
+    """Test histograms render cumulative buckets, sum and count with escaped labels."""
+    histogram = metrics.Histogram("test_seconds", "Test latency.", ("route",), buckets=(0.1, 1))
+    histogram.observe(0.05, route='/a"b')
+    histogram.observe(0.5, route='/a"b')
+    histogram.observe(5, route='/a"b')
+    lines = histogram.collect()
+
+    assert lines[:2] == ["# HELP test_seconds Test latency.", "# TYPE test_seconds histogram"]
+    assert 'test_seconds_bucket{route="/a\\"b",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a\\"b",le="1"} 2' in lines
+    assert 'test_seconds_bucket{route="/a\\"b",le="+Inf"} 3' in lines
+    assert 'test_seconds_sum{route="/a\\"b"} 5.55' in lines
+    assert 'test_seconds_count{route="/a\\"b"} 3' in lines
+
+def test_metrics_endpoint(authenticated_client):
+    """Test /metrics exposes route latency, pool gauges and compare timings."""
+    compare_notes(
+        [{"text": "a", "embedding": [1.0, 0.0]}, {"text": "b", "embedding": [0.0, 1.0]}],
+        [{"text": "c", "embedding": [1.0, 0.0]}],
+    )
+    assert authenticated_client.get("/topics").status_code == 200
+    assert authenticated_client.get("/topics/999").status_code == 404
+
+    response = authenticated_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/topics",status="200"}' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/topics/{topic_id}",status="404"}' in body
+    assert 'db_pool_connections{engine="primary",state="checkedout"}' in body
+    assert 'compare_matrix_cells_bucket{mode="exact",le="10"}' in body
+    assert "# TYPE compare_duration_seconds histogram" in body
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from sqlalchemy import event
+from app.config import settings
+from app.models import Notification, ReminderOutbox
+from app.outbox import deliver_batch, drain, enqueue_due_reminders, fail_stale_claims
+from tests.test_scheduler import create_due_sessions
+
+def test_enqueue_is_one_insert_and_idempotent(test_db):
+    """Test due sessions are queued by a single INSERT ... SELECT, once."""
+    create_due_sessions(test_db, 3)
+    create_due_sessions(test_db, 2, email="")
+    statements = []
+    listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+    event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+    try:
+        queued = enqueue_due_reminders(test_db, digest=False)
+    finally:
+        event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+
+    assert queued == 3
+    assert len(statements) == 1 and statements[0].lstrip().upper().startswith("INSERT")
+    rows = test_db.query(ReminderOutbox).all()
+    assert {r.kind for r in rows} == {"reminder"}
+    assert {r.status for r in rows} == {"pending"}
+    assert all(len(r.sessions) == 1 and r.sessions[0]["title"] == "Biology" for r in rows)
+    assert enqueue_due_reminders(test_db, digest=False) == 0
+
+def test_enqueue_digest_queues_one_row_per_user(test_db):
+    """Test digest mode queues one row per user listing all due sessions."""
+    create_due_sessions(test_db, 3)
+    create_due_sessions(test_db, 1, email="other@example.com")
+
+    assert enqueue_due_reminders(test_db, digest=True) == 2
+    rows = {r.recipient: r for r in test_db.query(ReminderOutbox).all()}
+    assert len(rows["student@example.com"].sessions) == 3
+    assert rows["student@example.com"].kind == "digest"
+
+@patch("app.email.send_email")
+def test_drain_sends_and_records_notifications(mock_send, test_db):
+    """Test workers deliver every queued reminder once and record it as sent."""
+    create_due_sessions(test_db, 3)
+    enqueue_due_reminders(test_db, digest=False)
+
+    assert drain(test_db, batch_size=2) == 3
+    assert mock_send.call_count == 3
+    assert "Biology" in mock_send.call_args.kwargs["body"]
+    assert {r.status for r in test_db.query(ReminderOutbox).all()} == {"sent"}
+    assert test_db.query(Notification).filter(Notification.sent_at.isnot(None)).count() == 3
+    # Notified sessions are not queued again
+    assert enqueue_due_reminders(test_db, digest=False) == 0
+    assert drain(test_db) == 0
+
+@patch("app.email.send_email")
+def test_failed_send_is_retried_then_marked_failed(mock_send, test_db):
+    """Test a failed delivery goes back to pending with a delay, up to the max attempts."""
+    create_due_sessions(test_db, 1)
+    enqueue_due_reminders(test_db, digest=False)
+    mock_send.side_effect = RuntimeError("SMTP down")
+
+    assert deliver_batch(test_db) == 1
+    row = test_db.query(ReminderOutbox).one()
+    assert (row.status, row.attempts) == ("pending", 1)
+    assert deliver_batch(test_db) == 0  # not due until the retry delay passes
+
+    for attempt in range(2, settings.OUTBOX_MAX_ATTEMPTS + 1):
+        test_db.query(ReminderOutbox).update({"available_at": datetime.now(timezone.utc)})
+        test_db.commit()
+        assert deliver_batch(test_db) == 1
+    test_db.expire_all()
+    row = test_db.query(ReminderOutbox).one()
+    assert (row.status, row.attempts) == ("failed", settings.OUTBOX_MAX_ATTEMPTS)
+    assert test_db.query(Notification).count() == 0
+
+@patch("app.email.send_email")
+def test_stale_claims_are_failed_not_resent(mock_send, test_db):
+    """Test rows left in sending by a dead worker are never delivered again."""
+    create_due_sessions(test_db, 1)
+    enqueue_due_reminders(test_db, digest=False)
+    test_db.query(ReminderOutbox).update({
+        "status": "sending", "attempts": 1,
+        "claimed_at": datetime.now(timezone.utc) - timedelta(hours=1),
+    })
+    test_db.commit()
+
+    assert fail_stale_claims(test_db, timeout_seconds=60) == 1
+    assert drain(test_db) == 0
+    assert mock_send.call_count == 0
+    test_db.expire_all()
+    assert test_db.query(ReminderOutbox).one().status == "failed"
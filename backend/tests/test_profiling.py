@@ -0,0 +1,62 @@
+import os
+import threading
+import time
+import pytest
+from app import profiling
+from app.config import settings
+
+def _spin(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_sampler_records_busy_threads_only():
+    """Test the sampler records working threads and skips waiting ones."""
+    waiting = threading.Event()
+    idle = threading.Thread(target=waiting.wait, daemon=True)
+    idle.start()
+    with profiling.Sampler(interval=0.001) as sampler:
+        worker = threading.Thread(target=_spin, args=(0.1,))
+        worker.start()
+        worker.join()
+    waiting.set()
+
+    spinning = [stack for stack in sampler.samples if stack.endswith("tests/test_profiling.py:_spin")]
+    assert spinning
+    assert all(":wait" not in stack.rsplit(";", 1)[-1] for stack in sampler.samples)
+    assert sampler.collapsed().count("\n") == len(sampler.samples)
+
+@pytest.fixture
+def profiling_on(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILING_INTERVAL_MS", 1)
+    return tmp_path
+
+def test_request_with_token_is_profiled(authenticated_client, profiling_on):
+    """Test a request with the profiling token writes a profile and names it."""
+    response = authenticated_client.get("/topics", headers={"X-Profile": "secret"})
+
+    assert response.status_code == 200
+    name = response.headers["X-Profile-File"]
+    assert name.endswith("-get-topics.collapsed")
+    assert os.listdir(profiling_on) == [name]
+
+@pytest.mark.parametrize("headers", [{}, {"X-Profile": "wrong"}, {"X-Profile": "s\u00e9cret".encode("latin-1")}])
+def test_request_without_valid_token_is_not_profiled(authenticated_client, profiling_on, headers):
+    """Test requests without a valid token are not profiled."""
+    response = authenticated_client.get("/topics", headers=headers)
+
+    assert response.status_code == 200
+    assert "X-Profile-File" not in response.headers
+    assert os.listdir(profiling_on) == []
+
+def test_profiling_disabled_ignores_token(authenticated_client, profiling_on, monkeypatch):
+    """Test the token is ignored while PROFILING_ENABLED is off."""
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", False)
+
+    response = authenticated_client.get("/topics", headers={"X-Profile": "secret"})
+
+    assert "X-Profile-File" not in response.headers
+    assert os.listdir(profiling_on) == []
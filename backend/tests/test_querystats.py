@@ -0,0 +1,68 @@
+import logging
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import select
+from app import querystats
+from app.config import settings
+from app.models import User
+
+def test_debug_headers_count_request_queries(authenticated_client, assert_max_queries, monkeypatch):
+    """Test X-DB-Query-Count matches the statements the request ran."""
+    monkeypatch.setattr(settings, "QUERY_DEBUG_HEADERS", True)
+    authenticated_client.post("/topics", json={"title": "T", "mode": "solo"})
+
+    with assert_max_queries(10) as statements:
+        response = authenticated_client.get("/topics")
+
+    assert response.headers["X-DB-Query-Count"] == str(len(statements))
+    assert float(response.headers["X-DB-Time-Ms"]) >= 0
+
+def test_debug_headers_off_by_default(authenticated_client):
+    """Test query debug headers are only sent when QUERY_DEBUG_HEADERS is on."""
+    response = authenticated_client.get("/topics")
+
+    assert "X-DB-Query-Count" not in response.headers
+
+def test_repeated_statement_is_reported(test_db, mock_auth, caplog, monkeypatch):
+    """Test a statement repeated QUERY_REPEAT_WARN times is logged as a likely N+1."""
+    monkeypatch.setattr(settings, "QUERY_REPEAT_WARN", 3)
+    with querystats.track() as stats:
+        for user_id in range(3):
+            test_db.execute(select(User.email).where(User.id == user_id))
+        test_db.execute(select(User.id))
+
+    with caplog.at_level(logging.WARNING, logger="app.querystats"):
+        querystats.report("GET /example", 0.01, stats)
+
+    assert stats.count == 4
+    assert [n for _, n in stats.repeated(3)] == [3]
+    assert "Possible N+1 in GET /example: statement ran 3 times" in caplog.text
+    assert "Slow request" not in caplog.text
+
+def test_statements_outside_requests_are_not_counted(test_db, mock_auth):
+    """Test statements run after tracking ends are not counted."""
+    with querystats.track() as stats:
+        pass
+    test_db.execute(select(User.id))
+
+    assert stats.count == 0
+
+@pytest.mark.parametrize("method,path,body,limit", [
+    ("GET", "/topics", None, 1),
+    ("GET", "/topics/{topic_id}/sessions", None, 2),
+    ("GET", "/me/due", None, 1),
+    ("PATCH", "/sessions/{session_id}/reschedule", {"scheduled_for": str(date.today() + timedelta(days=30))}, 5),
+    ("POST", "/sessions/{session_id}/complete", None, 5),
+    ("POST", "/sessions/{session_id}/skip", None, 5),
+])
+def test_endpoint_query_budget(authenticated_client, assert_max_queries, method, path, body, limit):
+    """Test the main endpoints stay within their query budgets."""
+    topic_id = authenticated_client.post("/topics", json={"title": "T", "mode": "solo"}).json()["id"]
+    session_id = authenticated_client.get(f"/topics/{topic_id}/sessions").json()[0]["id"]
+
+    with assert_max_queries(limit):
+        response = authenticated_client.request(
+            method, path.format(topic_id=topic_id, session_id=session_id), json=body
+        )
+
+    assert response.status_code == 200
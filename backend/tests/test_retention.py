@@ -0,0 +1,54 @@
+from datetime import date, datetime, timedelta, timezone
+from app.models import Topic, Session as SessionModel, Comparison
+from app.retention import compact_comparisons
+
+def create_comparisons(test_db, user_id, ages_in_days):
+    """Create a session with one comparison per age (in days before now)."""
+    topic = Topic(user_id=user_id, title="Topic", mode="automated")
+    test_db.add(topic)
+    test_db.flush()
+    session = SessionModel(topic_id=topic.id, day_index=3, scheduled_for=date.today(), status="scheduled")
+    test_db.add(session)
+    test_db.flush()
+    now = datetime.now(timezone.utc)
+    for age in ages_in_days:
+        test_db.add(Comparison(
+            session_id=session.id, recall_score=float(age), missed_points=[],
+            created_at=now - timedelta(days=age),
+        ))
+    test_db.commit()
+    return session
+
+def remaining_scores(test_db, session):
+    rows = test_db.query(Comparison).filter(Comparison.session_id == session.id)\
+        .order_by(Comparison.created_at.desc()).all()
+    return [c.recall_score for c in rows]
+
+def test_keep_latest_per_session(test_db, mock_auth):
+    """Test only the newest N comparisons of each session survive."""
+    s1 = create_comparisons(test_db, mock_auth.id, [0, 1, 2, 3, 4])
+    s2 = create_comparisons(test_db, mock_auth.id, [5, 6])
+
+    deleted = compact_comparisons(test_db, keep_latest=2, max_age_days=0, batch_size=2)
+
+    assert deleted == 3
+    assert remaining_scores(test_db, s1) == [0.0, 1.0]
+    assert remaining_scores(test_db, s2) == [5.0, 6.0]
+
+def test_time_window_keeps_newest(test_db, mock_auth):
+    """Test the age rule never deletes a session's newest comparison."""
+    s1 = create_comparisons(test_db, mock_auth.id, [1, 40, 50])
+    s2 = create_comparisons(test_db, mock_auth.id, [60, 70])
+
+    deleted = compact_comparisons(test_db, keep_latest=0, max_age_days=30)
+
+    assert deleted == 3
+    assert remaining_scores(test_db, s1) == [1.0]
+    assert remaining_scores(test_db, s2) == [60.0]
+
+def test_retention_disabled(test_db, mock_auth):
+    """Test nothing is deleted when both rules are disabled."""
+    create_comparisons(test_db, mock_auth.id, [0, 1, 2])
+
+    assert compact_comparisons(test_db, keep_latest=0, max_age_days=0) == 0
+    assert test_db.query(Comparison).count() == 3
@@ -0,0 +1,80 @@
+import pytest
+from datetime import date
+from app.models import Topic, Session as SessionModel, SoloMetric, SoloTrend
+from app.rollups import backfill_solo_trends
+
+@pytest.fixture
+def solo_session(test_db, mock_auth):
+    """Create a solo topic with one session."""
+    topic = Topic(user_id=mock_auth.id, title="Solo Topic", mode="solo")
+    test_db.add(topic)
+    test_db.flush()
+    session = SessionModel(topic_id=topic.id, day_index=1, scheduled_for=date.today(), status="scheduled")
+    test_db.add(session)
+    test_db.commit()
+    test_db.refresh(session)
+    return session
+
+def post_metric(client, session_id, remembered):
+    response = client.post(
+        f"/sessions/{session_id}/solo",
+        json={"percent_covered": 80.0, "percent_remembered": remembered},
+    )
+    assert response.status_code == 201
+
+def test_add_solo_metric_updates_rollup(authenticated_client, test_db, solo_session, monkeypatch):
+    """Test POST /sessions/{id}/solo maintains count, sums, EWMA and the window."""
+    monkeypatch.setattr("app.rollups.settings.SOLO_TREND_WINDOW", 2)
+    monkeypatch.setattr("app.rollups.settings.SOLO_EWMA_ALPHA", 0.5)
+    for remembered in (40.0, 60.0, 100.0):
+        post_metric(authenticated_client, solo_session.id, remembered)
+
+    trend = test_db.get(SoloTrend, solo_session.topic_id)
+    test_db.refresh(trend)
+    assert trend.metric_count == 3
+    assert trend.sum_remembered == 200.0
+    assert trend.sum_covered == 240.0
+    assert trend.ewma_remembered == pytest.approx(0.5 * 100 + 0.5 * (0.5 * 60 + 0.5 * 40))
+    assert [m["percent_remembered"] for m in trend.recent] == [100.0, 60.0]
+
+def test_trend_reads_from_rollup(authenticated_client, test_db, solo_session):
+    """Test GET /topics/{id}/solo/trend uses the rollup window and reports the EWMA."""
+    for remembered in (90.0, 95.0):
+        post_metric(authenticated_client, solo_session.id, remembered)
+
+    response = authenticated_client.get(f"/topics/{solo_session.topic_id}/solo/trend")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [m["percent_remembered"] for m in data["metrics"]] == [95.0, 90.0]
+    assert data["count"] == 2
+    assert data["ewma_remembered"] is not None
+    assert "Great retention" in data["suggestion"]
+
+def test_rollup_seeded_from_existing_metrics(authenticated_client, test_db, solo_session):
+    """Test the first rollup update folds in metrics recorded before rollups existed."""
+    test_db.add(SoloMetric(session_id=solo_session.id, percent_covered=50.0, percent_remembered=50.0))
+    test_db.commit()
+
+    post_metric(authenticated_client, solo_session.id, 70.0)
+
+    trend = test_db.get(SoloTrend, solo_session.topic_id)
+    test_db.refresh(trend)
+    assert trend.metric_count == 2
+    assert trend.sum_remembered == 120.0
+
+def test_backfill_matches_incremental(authenticated_client, test_db, solo_session):
+    """Test backfilling from raw metrics reproduces the incrementally built rollup."""
+    for remembered in (30.0, 70.0, 50.0):
+        post_metric(authenticated_client, solo_session.id, remembered)
+    trend = test_db.get(SoloTrend, solo_session.topic_id)
+    test_db.refresh(trend)
+    incremental = (trend.metric_count, trend.sum_remembered, trend.ewma_remembered, trend.recent)
+
+    test_db.delete(trend)
+    test_db.commit()
+    assert backfill_solo_trends(test_db) == 1
+
+    trend = test_db.get(SoloTrend, solo_session.topic_id)
+    assert (trend.metric_count, trend.sum_remembered, trend.recent) == (incremental[0], incremental[1], incremental[3])
+    assert trend.ewma_remembered == pytest.approx(incremental[2])
@@ -0,0 +1,164 @@
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+from sqlalchemy import event
+from app.models import User, Topic, Session as SessionModel, Notification
+from app.scheduler import (
+    _slot_end, fail_stale_claims, reminder_slices, send_due_digests, send_due_notifications, send_reminder_slices,
+)
+
+def create_due_sessions(test_db, count, email="student@example.com", tz="UTC", today=None):
+    """Create a user with `count` sessions due today, plus one due tomorrow and one completed."""
+    user = User(auth0_sub=f"auth0|{email}", email=email, timezone=tz)
+    test_db.add(user)
+    test_db.flush()
+    topic = Topic(user_id=user.id, title="Biology", mode="automated")
+    test_db.add(topic)
+    test_db.flush()
+    today = today or date.today()
+    test_db.add_all(
+        [SessionModel(topic_id=topic.id, day_index=i, scheduled_for=today, status="scheduled") for i in range(count)]
+        + [
+            SessionModel(topic_id=topic.id, day_index=90, scheduled_for=today + timedelta(days=1), status="scheduled"),
+            SessionModel(topic_id=topic.id, day_index=91, scheduled_for=today, status="completed"),
+        ]
+    )
+    test_db.commit()
+    return user
+
+@patch("app.email.send_email")
+def test_sends_one_reminder_per_due_session(mock_send, test_db):
+    """Test every due session gets one reminder, in chunked queries without per-row lookups."""
+    create_due_sessions(test_db, 5)
+    create_due_sessions(test_db, 2, email="")
+    statements = []
+    listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+    event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+    try:
+        sent = send_due_notifications(test_db, chunk_size=2)
+    finally:
+        event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+
+    assert sent == 5
+    assert mock_send.call_count == 5
+    assert mock_send.call_args.kwargs["to"] == "student@example.com"
+    assert "Biology" in mock_send.call_args.kwargs["body"]
+    assert test_db.query(Notification).count() == 5
+    # 3 chunks + the empty terminating query, each with one insert
+    assert sum(s.lstrip().upper().startswith("SELECT") for s in statements) == 4
+
+@patch("app.email.send_email")
+def test_rerun_skips_already_notified_sessions(mock_send, test_db):
+    """Test a restarted run only sends reminders that were not recorded yet."""
+    create_due_sessions(test_db, 3)
+    mock_send.side_effect = [None, RuntimeError("SMTP down"), None]
+
+    assert send_due_notifications(test_db, chunk_size=2) == 2
+    mock_send.side_effect = None
+    mock_send.reset_mock()
+
+    assert send_due_notifications(test_db, chunk_size=2) == 1
+    assert mock_send.call_count == 1
+    assert send_due_notifications(test_db, chunk_size=2) == 0
+    assert test_db.query(Notification).count() == 3
+
+@patch("app.email.send_email")
+def test_digest_sends_one_email_per_user(mock_send, test_db):
+    """Test digest mode emails each user once, listing all of their due sessions."""
+    create_due_sessions(test_db, 3)
+    create_due_sessions(test_db, 1, email="other@example.com")
+    statements = []
+    listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+    event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+    try:
+        sent = send_due_digests(test_db, chunk_size=1)
+    finally:
+        event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+
+    assert sent == 2
+    emails = {c.kwargs["to"]: c.kwargs for c in mock_send.call_args_list}
+    assert set(emails) == {"student@example.com", "other@example.com"}
+    assert emails["student@example.com"]["subject"] == "Study Reminder: 3 sessions due today"
+    assert emails["student@example.com"]["body"].count("'Biology'") == 3
+    assert emails["other@example.com"]["subject"] == "Study Reminder: 1 session due today"
+    notifications = test_db.query(Notification).all()
+    assert len(notifications) == 4
+    assert {n.method for n in notifications} == {"email_digest"}
+    # One multi-row insert per user chunk
+    assert sum(s.lstrip().upper().startswith("INSERT") for s in statements) == 2
+
+    assert send_due_digests(test_db) == 0
+    assert send_due_notifications(test_db) == 0
+
+@patch("app.email.send_email")
+def test_claimed_sessions_are_never_resent(mock_send, test_db):
+    """Test sessions claimed by another (or a crashed) run are not sent again."""
+    user = create_due_sessions(test_db, 2)
+    first = test_db.query(SessionModel).filter(SessionModel.day_index == 0).one()
+    test_db.add(Notification(user_id=user.id, topic_id=first.topic_id, session_id=first.id,
+                             reminder_date=date.today()))  # claimed, outcome unknown
+    test_db.commit()
+
+    assert send_due_notifications(test_db) == 1
+    assert send_due_notifications(test_db) == 0
+    assert mock_send.call_count == 1
+    assert test_db.query(Notification).filter(Notification.sent_at.isnot(None)).count() == 1
+
+@patch("app.email.send_email")
+def test_stale_claims_are_failed_not_resent(mock_send, test_db):
+    """Test claims left unsettled by a run that died are marked failed and never resent."""
+    user = create_due_sessions(test_db, 3)
+    stale, fresh = test_db.query(SessionModel).filter(SessionModel.day_index.in_([0, 1]))\
+        .order_by(SessionModel.day_index).all()
+    test_db.add_all([
+        Notification(user_id=user.id, topic_id=stale.topic_id, session_id=stale.id, reminder_date=date.today(),
+                     claimed_at=datetime.now(timezone.utc) - timedelta(hours=2)),
+        Notification(user_id=user.id, topic_id=fresh.topic_id, session_id=fresh.id, reminder_date=date.today(),
+                     claimed_at=datetime.now(timezone.utc)),  # a run still sending it
+    ])
+    test_db.commit()
+
+    assert fail_stale_claims(test_db, timeout_seconds=3600) == 1
+    assert fail_stale_claims(test_db, timeout_seconds=3600) == 0
+    assert send_due_notifications(test_db) == 1
+    assert mock_send.call_count == 1
+    failed = test_db.query(Notification).filter(Notification.failed_at.isnot(None)).one()
+    assert failed.session_id == stale.id and failed.sent_at is None
+
+@patch("app.email.send_email")
+def test_job_stops_when_leadership_is_lost(mock_send, test_db):
+    """Test the job checks leadership before each chunk."""
+    create_due_sessions(test_db, 4)
+    checks = iter([True, False])
+
+    assert send_due_notifications(test_db, chunk_size=2, is_leader=lambda: next(checks)) == 2
+    assert mock_send.call_count == 2
+
+def test_reminder_slices_group_zones_at_local_hour(test_db):
+    """Test only zones at 08:00 local are selected, grouped by their local date."""
+    for tz in ["UTC", "Pacific/Honolulu", "Pacific/Kiritimati", "Asia/Tokyo"]:
+        test_db.add(User(auth0_sub=f"auth0|{tz}", email=f"{tz}@example.com", timezone=tz))
+    test_db.commit()
+
+    # 18:00 UTC: 08:00 on Jan 15 in Honolulu (UTC-10), 08:00 on Jan 16 in Kiritimati (UTC+14)
+    slices = reminder_slices(test_db, datetime(2026, 1, 15, 18, tzinfo=timezone.utc))
+    assert slices == {date(2026, 1, 15): ["Pacific/Honolulu"], date(2026, 1, 16): ["Pacific/Kiritimati"]}
+
+@patch("app.email.send_email")
+def test_hourly_run_only_reminds_users_at_local_hour(mock_send, test_db):
+    """Test each hourly run sends only to users whose local time is 08:00, for their local date."""
+    tokyo_day = date(2026, 1, 16)
+    create_due_sessions(test_db, 2, email="tokyo@example.com", tz="Asia/Tokyo", today=tokyo_day)
+    create_due_sessions(test_db, 1, email="london@example.com", tz="Europe/London", today=tokyo_day)
+
+    # 23:00 UTC on Jan 15 is 08:00 on Jan 16 in Tokyo
+    assert send_reminder_slices(test_db, datetime(2026, 1, 15, 23, tzinfo=timezone.utc)) == 2
+    assert {c.kwargs["to"] for c in mock_send.call_args_list} == {"tokyo@example.com"}
+    # London reaches 08:00 on Jan 16 at 08:00 UTC
+    assert send_reminder_slices(test_db, datetime(2026, 1, 16, 8, tzinfo=timezone.utc)) == 1
+    assert mock_send.call_args.kwargs["to"] == "london@example.com"
+
+def test_slot_end_aligns_to_period():
+    """Test job slots end on the next hour or UTC day boundary."""
+    now = datetime(2026, 1, 15, 8, 0, 30, tzinfo=timezone.utc)
+    assert _slot_end(now, timedelta(hours=1)) == datetime(2026, 1, 15, 9, tzinfo=timezone.utc)
+    assert _slot_end(now, timedelta(days=1)) == datetime(2026, 1, 16, tzinfo=timezone.utc)
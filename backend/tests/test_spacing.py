@@ -0,0 +1,99 @@
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import event
+from app.models import User, Topic, Session as SessionModel, Comparison, SoloMetric
+from app.spacing import reschedule_topics, sm2
+
+TODAY = date(2026, 3, 20)
+
+def create_topic(test_db, user, statuses, mode="automated"):
+    """Create a topic with day 1/3/7 sessions in the given statuses, started 8 days before TODAY."""
+    topic = Topic(user_id=user.id, title="Biology", mode=mode)
+    test_db.add(topic)
+    test_db.flush()
+    start = TODAY - timedelta(days=8)
+    sessions = []
+    for day_index, status in zip((1, 3, 7), statuses):
+        session = SessionModel(
+            topic_id=topic.id, day_index=day_index, scheduled_for=start + timedelta(days=day_index),
+            status=status,
+            completed_at=datetime.combine(start + timedelta(days=day_index), datetime.min.time(), timezone.utc)
+            if status == "completed" else None,
+        )
+        test_db.add(session)
+        sessions.append(session)
+    test_db.flush()
+    return topic, sessions
+
+def test_sm2_steps():
+    """Test SM-2 grows intervals on good recall and restarts on failure."""
+    ease, interval, reps = sm2(
+        np.array([2.5, 2.5, 2.5, 2.5, 1.3]),
+        np.array([4, 4, 0, 1, 10]),
+        np.array([2, 2, 0, 1, 5]),
+        np.array([5, 1, 4, 3, 0]),
+    )
+    np.testing.assert_allclose(ease, [2.6, 1.96, 2.5, 2.36, 1.3])
+    assert interval.tolist() == [10, 1, 1, 6, 1]
+    assert reps.tolist() == [3, 0, 1, 2, 0]
+
+def test_reschedule_topics_schedules_from_latest_review(test_db):
+    """Test topics that ran out of sessions get their next one, in one upsert per chunk."""
+    user = User(auth0_sub="auth0|spacing", email="s@example.com")
+    test_db.add(user)
+    test_db.flush()
+    good, good_sessions = create_topic(test_db, user, ["completed"] * 3)
+    test_db.add(Comparison(session_id=good_sessions[2].id, recall_score=100.0))
+    solo, solo_sessions = create_topic(test_db, user, ["completed"] * 3, mode="solo")
+    test_db.add(SoloMetric(session_id=solo_sessions[2].id, percent_covered=50.0, percent_remembered=20.0))
+    skipped, _ = create_topic(test_db, user, ["completed", "completed", "skipped"])
+    pending, _ = create_topic(test_db, user, ["completed", "completed", "scheduled"])
+    test_db.commit()
+
+    statements = []
+    listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+    event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+    try:
+        assert reschedule_topics(test_db, today=TODAY) == 3
+    finally:
+        event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+    assert sum(s.lstrip().upper().startswith("INSERT INTO SESSIONS") for s in statements) == 1
+
+    def next_session(topic):
+        return test_db.query(SessionModel).filter(
+            SessionModel.topic_id == topic.id, SessionModel.status == "scheduled"
+        ).one()
+
+    reviewed = TODAY - timedelta(days=1)  # the day-7 session
+    assert next_session(good).scheduled_for == reviewed + timedelta(days=10)
+    assert next_session(good).day_index == 17
+    # Poor recall and skips restart at one day (never before today)
+    assert next_session(solo).scheduled_for == TODAY
+    assert next_session(skipped).scheduled_for == TODAY
+    assert test_db.query(SessionModel).filter(SessionModel.topic_id == pending.id).count() == 3
+    test_db.refresh(good)
+    assert (good.repetitions, good.interval_days, good.reviewed_session_id) == (3, 10, good_sessions[2].id)
+    assert good.ease == 2.6
+
+    # Nothing new until those sessions are reviewed
+    assert reschedule_topics(test_db, today=TODAY) == 0
+
+def test_reschedule_topics_uses_each_users_local_date(test_db):
+    """Test sessions are never scheduled before the user's local today, per timezone."""
+    from app.timezones import local_today
+
+    topics = {}
+    for zone in ("Pacific/Kiritimati", "Pacific/Pago_Pago"):  # UTC+14 and UTC-11
+        user = User(auth0_sub=f"auth0|{zone}", email=f"{zone}@example.com", timezone=zone)
+        test_db.add(user)
+        test_db.flush()
+        topics[zone], _ = create_topic(test_db, user, ["completed", "completed", "skipped"])
+    test_db.commit()
+
+    assert reschedule_topics(test_db) == 2
+
+    for zone, topic in topics.items():
+        session = test_db.query(SessionModel).filter(
+            SessionModel.topic_id == topic.id, SessionModel.status == "scheduled"
+        ).one()
+        assert session.scheduled_for == local_today(zone)